@@ -4,12 +4,15 @@ from __future__ import annotations
 
 from fastapi import APIRouter
 
-from .routes import drafts, notes, organize, tags
+from .routes import admin, drafts, graph, notes, organize, tables, tags
 
 router = APIRouter()
 router.include_router(notes.router, prefix="/notes", tags=["notes"])
+router.include_router(tables.router, prefix="/notes", tags=["tables"])
 router.include_router(drafts.router, prefix="/drafts", tags=["drafts"])
 router.include_router(tags.router, prefix="/tags", tags=["tags"])
+router.include_router(graph.router, prefix="/graph", tags=["graph"])
 router.include_router(organize.router, prefix="/organize", tags=["organize"])
+router.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 __all__ = ["router"]
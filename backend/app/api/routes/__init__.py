@@ -1,5 +1,5 @@
 """Route modules for the public API."""
 
-from . import drafts, notes, organize, tags
+from . import admin, drafts, graph, notes, organize, tables, tags
 
-__all__ = ["drafts", "notes", "organize", "tags"]
+__all__ = ["admin", "drafts", "graph", "notes", "organize", "tables", "tags"]
@@ -0,0 +1,65 @@
+"""Operational endpoints exposing in-process caches and diagnostics."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Query
+
+from ...db.session import pool_metrics
+from ...repositories import tag_id_cache
+from ...services.cache import note_cache
+from ...services.graph import link_graph
+from ...services.slow_queries import slow_query_log
+from ...services.tables import columnar_cache
+
+router = APIRouter()
+
+
+@router.get("/cache")
+async def cache_stats() -> Dict[str, float]:
+    """Hit/miss/eviction counters for the note payload cache."""
+
+    return note_cache.stats()
+
+
+@router.get("/columnar")
+async def columnar_stats() -> Dict[str, float]:
+    """Size and hit/miss/patch counters for the table-note columnar cache."""
+
+    return columnar_cache.stats()
+
+
+@router.get("/graph")
+async def graph_stats() -> Dict[str, float]:
+    """Size, version and pending changes of the in-memory link graph."""
+
+    return link_graph.stats()
+
+
+@router.get("/pool")
+async def pool_stats() -> Dict[str, float]:
+    """Connection pool occupancy, saturation and checkout wait times."""
+
+    return pool_metrics.stats()
+
+
+@router.get("/slow-queries")
+async def slow_queries(limit: int = Query(default=50, ge=1, le=1000)) -> List[Dict[str, Any]]:
+    """Most recent statements slower than ``SLOW_QUERY_MS``, with their plans."""
+
+    return slow_query_log.entries(limit)
+
+
+@router.get("/slow-queries/stats")
+async def slow_query_stats() -> Dict[str, float]:
+    """Threshold and counters of the slow-query log."""
+
+    return slow_query_log.stats()
+
+
+@router.get("/tags")
+async def tag_cache_stats() -> Dict[str, float]:
+    """Size and hit/miss counters for the tag name to id cache."""
+
+    return tag_id_cache.stats()
@@ -11,17 +11,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ...db.models import DraftSchema
 from ...db.session import get_db
 from ...repositories import DraftRepository
-from ..schemas import to_schema
+from ..schemas import dump_json_bytes, to_schema
 from .schemas import DraftCreate
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[DraftSchema])
-async def list_drafts(session: AsyncSession = Depends(get_db)) -> List[DraftSchema]:
+async def list_drafts(session: AsyncSession = Depends(get_db)) -> Response:
     repo = DraftRepository(session)
-    drafts = await repo.list()
-    return [to_schema(DraftSchema, draft) for draft in drafts]
+    drafts = await repo.list_rows()
+    return Response(content=dump_json_bytes(drafts), media_type="application/json")
 
 
 @router.get("/{draft_id}", response_model=DraftSchema)
@@ -0,0 +1,95 @@
+"""HTTP routes for whole-graph link analytics served from the in-memory CSR cache."""
+
+from __future__ import annotations
+
+from typing import List, Literal, Optional
+from uuid import UUID
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.models import NoteLinkType
+from ...db.session import get_db
+from ...repositories import NoteRepository
+from ...services.graph import link_graph
+from .schemas import GraphComponents, GraphNode, GraphPath, RankedNote
+
+router = APIRouter()
+
+
+@router.get("/rank", response_model=List[RankedNote])
+async def rank_notes(
+    metric: Literal["pagerank", "in_degree", "out_degree"] = Query(default="pagerank"),
+    link_type: Optional[NoteLinkType] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=500),
+    session: AsyncSession = Depends(get_db),
+) -> List[RankedNote]:
+    """The most central notes by PageRank or link degree."""
+
+    if metric == "pagerank":
+        graph, scores = await link_graph.pagerank(session, link_type)
+    else:
+        graph, (in_degree, out_degree) = await link_graph.degrees(session, link_type)
+        scores = in_degree if metric == "in_degree" else out_degree
+    scores = np.where(graph.alive, scores, -1)
+    count = min(limit, int(graph.alive.sum()))
+    top = np.argpartition(-scores, count - 1)[:count] if count else np.empty(0, np.int64)
+    top = top[np.argsort(-scores[top], kind="stable")]
+
+    repo = NoteRepository(session)
+    notes = {note.id: note for note in await repo.get_many(graph.ids[i] for i in top)}
+    ranked = []
+    for i in top:
+        note = notes.get(graph.ids[i])
+        if note is not None:
+            ranked.append(RankedNote(id=note.id, title=note.title, score=float(scores[i])))
+    return ranked
+
+
+@router.get("/components", response_model=GraphComponents)
+async def graph_components(
+    link_type: Optional[NoteLinkType] = Query(default=None),
+    top: int = Query(default=10, ge=1, le=100),
+    session: AsyncSession = Depends(get_db),
+) -> GraphComponents:
+    """Weakly connected components among linked notes, largest first.
+
+    Notes without any link (of ``link_type``, when given) are not part of the
+    graph and are not counted.
+    """
+
+    graph, labels = await link_graph.components(session, link_type)
+    sources, targets = graph.edges(link_type)
+    size = len(graph.ids)
+    degree = np.bincount(sources, minlength=size) + np.bincount(targets, minlength=size)
+    linked = graph.alive & (degree > 0)
+    sizes = np.bincount(labels[linked], minlength=len(graph.ids))
+    sizes = np.sort(sizes[sizes > 0])[::-1]
+    return GraphComponents(
+        count=int(sizes.size),
+        largest=[int(size) for size in sizes[:top]],
+        singletons=int((sizes == 1).sum()),
+    )
+
+
+@router.get("/path", response_model=GraphPath)
+async def shortest_path(
+    source: UUID,
+    target: UUID,
+    direction: Literal["out", "in", "both"] = Query(default="out"),
+    session: AsyncSession = Depends(get_db),
+) -> GraphPath:
+    """Fewest-link path between two notes."""
+
+    graph = await link_graph.graph(session)
+    path = graph.shortest_path(source, target, direction=direction)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No path found")
+    repo = NoteRepository(session)
+    titles = {note.id: note.title for note in await repo.get_many(path)}
+    nodes = [
+        GraphNode(id=node_id, title=titles.get(node_id, ""), depth=depth)
+        for depth, node_id in enumerate(path)
+    ]
+    return GraphPath(hops=len(path) - 1, nodes=nodes)
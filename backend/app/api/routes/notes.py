@@ -2,40 +2,262 @@
 
 from __future__ import annotations
 
-from typing import List
+import json
+import tarfile
+import tempfile
+import zipfile
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...db.models import NoteSchema
-from ...db.session import get_db
-from ...repositories import NoteRepository
-from ..schemas import to_schema
-from .schemas import NoteCreate, NoteUpdate
+from ...db.models import NoteLinkType, NoteSchema
+from ...db.session import SessionLocal, get_db
+from ...repositories import LinkRepository, NoteRepository
+from ...repositories.links import MAX_GRAPH_DEPTH
+from ...repositories.pagination import InvalidCursorError
+from ...services.cache import etag_matches, note_cache
+from ...services.export import compress, export_notes, zstd_available
+from ...services.graph import link_graph
+from ...services.importer import (
+    NoteImporter,
+    iterate_in_thread,
+    ndjson_records,
+    tar_records,
+    zip_records,
+)
+from ...services.similarity import note_index
+from ...services.tables import columnar_cache, table_index_advisor
+from ..schemas import dump_json_bytes, to_json_bytes, to_schema
+from .schemas import (
+    BacklinkPage,
+    BulkNoteItemResult,
+    BulkNoteResult,
+    NoteCreate,
+    NoteGraphResult,
+    NoteImportResult,
+    NotePage,
+    NoteSearchHit,
+    NoteSearchPage,
+    NoteUpdate,
+    SimilarNote,
+)
 
 router = APIRouter()
 
+MAX_BULK_NOTES = 5000
 
-@router.get("/", response_model=List[NoteSchema])
+# Archives are spooled to disk past this size before their members are read.
+IMPORT_SPOOL_BYTES = 16 * 1024 * 1024
+
+_IMPORT_CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-tar": "tar",
+    "application/x-gtar": "tar",
+    "application/gzip": "tar",
+    "application/x-gzip": "tar",
+    "application/zip": "zip",
+}
+
+_EXPORT_MEDIA_TYPES = {
+    "none": ("application/x-ndjson", "notes.ndjson"),
+    "gzip": ("application/gzip", "notes.ndjson.gz"),
+    "zstd": ("application/zstd", "notes.ndjson.zst"),
+}
+
+
+@router.get("/", response_model=NotePage)
 async def list_notes(
     limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None),
+    tag: List[str] = Query(default=[], max_length=20),
+    match: Literal["all", "any"] = Query(default="all"),
     session: AsyncSession = Depends(get_db),
-) -> List[NoteSchema]:
+) -> Response:
+    """List notes newest first, optionally only those tagged ``tag``.
+
+    Repeat ``tag`` to filter on several tags; ``match`` selects whether a
+    note needs all of them or any one. Rows are encoded straight to JSON;
+    ``response_model`` only documents the shape.
+    """
+
     repo = NoteRepository(session)
-    notes = await repo.list(limit=limit)
-    return [to_schema(NoteSchema, note) for note in notes]
+    try:
+        page = await repo.list_rows(
+            limit=limit, cursor=cursor, tags=tag, match_all=match == "all"
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+    return Response(
+        content=dump_json_bytes({"items": page.items, "next_cursor": page.next_cursor}),
+        media_type="application/json",
+    )
 
 
-@router.get("/{note_id}", response_model=NoteSchema)
-async def get_note(
-    note_id: UUID, session: AsyncSession = Depends(get_db)
-) -> NoteSchema:
+@router.get("/search", response_model=NoteSearchPage)
+async def search_notes(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
+    session: AsyncSession = Depends(get_db),
+) -> NoteSearchPage:
     repo = NoteRepository(session)
-    note = await repo.get(note_id)
-    if note is None:
+    try:
+        page = await repo.search(q, limit=limit, cursor=cursor)
+    except InvalidCursorError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+    return NoteSearchPage(
+        items=[NoteSearchHit(**hit) for hit in page.items],
+        next_cursor=page.next_cursor,
+    )
+
+
+@router.get("/export")
+async def export_all_notes(
+    compression: Literal["none", "gzip", "zstd"] = Query(default="none"),
+) -> StreamingResponse:
+    """Stream every note and table row as NDJSON, optionally compressed."""
+
+    if compression == "zstd" and not zstd_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="zstd compression is not available on this server",
+        )
+
+    async def body() -> AsyncIterator[bytes]:
+        # The stream outlives the request scope, so it owns its session.
+        async with SessionLocal() as session:
+            async for chunk in compress(export_notes(session), compression):
+                yield chunk
+
+    media_type, filename = _EXPORT_MEDIA_TYPES[compression]
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    "/{note_id}",
+    response_model=NoteSchema,
+    responses={304: {"description": "Note unchanged since the supplied ETag"}},
+)
+async def get_note(
+    note_id: UUID,
+    if_none_match: Optional[str] = Header(default=None),
+    session: AsyncSession = Depends(get_db),
+) -> Response:
+    entry = note_cache.get(note_id)
+    if entry is None:
+        # Taken before the load: an update committed meanwhile must not be
+        # overwritten by this (possibly older) payload.
+        version = note_cache.version()
+        repo = NoteRepository(session)
+        note = await repo.get(note_id)
+        if note is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
+        payload = to_json_bytes(to_schema(NoteSchema, note))
+        entry = note_cache.put(note.id, note.updated_at, payload, version=version)
+
+    headers = {"ETag": entry.etag}
+    if if_none_match is not None and etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.payload, media_type="application/json", headers=headers)
+
+
+@router.get("/{note_id}/backlinks", response_model=BacklinkPage)
+async def note_backlinks(
+    note_id: UUID,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None),
+    link_type: Optional[NoteLinkType] = Query(default=None),
+    session: AsyncSession = Depends(get_db),
+) -> BacklinkPage:
+    """Links pointing at this note, newest first."""
+
+    repo = LinkRepository(session)
+    try:
+        page = await repo.backlinks(note_id, limit=limit, cursor=cursor, link_type=link_type)
+    except InvalidCursorError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+    if page is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
-    return to_schema(NoteSchema, note)
+    return BacklinkPage(items=page.items, next_cursor=page.next_cursor)
+
+
+@router.get("/{note_id}/graph", response_model=NoteGraphResult)
+async def note_graph(
+    note_id: UUID,
+    depth: int = Query(default=1, ge=1, le=MAX_GRAPH_DEPTH),
+    link_type: Optional[NoteLinkType] = Query(default=None),
+    direction: Literal["out", "in", "both"] = Query(default="both"),
+    max_nodes: int = Query(default=500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_db),
+) -> NoteGraphResult:
+    """Notes within ``depth`` links of this note, and the links among them."""
+
+    repo = LinkRepository(session)
+    graph = await repo.neighbourhood(
+        note_id, depth=depth, link_type=link_type, direction=direction, max_nodes=max_nodes
+    )
+    if graph is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
+    return NoteGraphResult(nodes=graph.nodes, edges=graph.edges, truncated=graph.truncated)
+
+
+@router.get("/{note_id}/similar", response_model=List[SimilarNote])
+async def similar_notes(
+    note_id: UUID,
+    k: int = Query(default=10, ge=1, le=100),
+    session: AsyncSession = Depends(get_db),
+) -> List[SimilarNote]:
+    if not note_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Similarity index is still loading",
+        )
+    vector = note_index.vector(note_id)
+    if vector is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Note has no embedding"
+        )
+
+    # Over-fetch slightly: ids deleted since the index last saw them are dropped.
+    hits = note_index.search(vector, k=k + 5, exclude=[note_id])
+    repo = NoteRepository(session)
+    notes = {note.id: note for note in await repo.get_many(hit_id for hit_id, _ in hits)}
+    similar = [
+        SimilarNote(
+            id=hit_id,
+            title=notes[hit_id].title,
+            content_type=notes[hit_id].content_type,
+            score=score,
+        )
+        for hit_id, score in hits
+        if hit_id in notes
+    ]
+    return similar[:k]
 
 
 @router.post("/", response_model=NoteSchema, status_code=status.HTTP_201_CREATED)
@@ -51,6 +273,91 @@ async def create_note(
     return to_schema(NoteSchema, note)
 
 
+@router.post("/bulk", response_model=BulkNoteResult, status_code=status.HTTP_201_CREATED)
+async def create_notes_bulk(
+    response: Response,
+    payload: List[Dict[str, Any]] = Body(...),
+    session: AsyncSession = Depends(get_db),
+) -> BulkNoteResult:
+    """Create many notes in one transaction, reporting success per item.
+
+    Responds ``201`` when every item was created and ``207`` otherwise.
+    """
+
+    if len(payload) > MAX_BULK_NOTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_NOTES} notes per request",
+        )
+
+    results = [BulkNoteItemResult(index=index) for index in range(len(payload))]
+    valid: List[Dict[str, Any]] = []
+    positions: List[int] = []
+    for index, item in enumerate(payload):
+        try:
+            note = NoteCreate(**item)
+        except ValidationError as exc:
+            results[index].error = json.loads(exc.json())
+            continue
+        valid.append(note.dict())
+        positions.append(index)
+
+    repo = NoteRepository(session)
+    for index, outcome in zip(positions, await repo.create_many(valid)):
+        if isinstance(outcome, UUID):
+            results[index].id = outcome
+        else:
+            results[index].error = outcome
+
+    failed = sum(1 for result in results if result.id is None)
+    if failed:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return BulkNoteResult(created=len(results) - failed, failed=failed, results=results)
+
+
+@router.post("/import", response_model=NoteImportResult)
+async def import_notes(
+    request: Request,
+    fmt: Optional[Literal["ndjson", "tar", "zip"]] = Query(default=None, alias="format"),
+    source: str = Query(default="", max_length=255),
+    skip: int = Query(default=0, ge=0),
+    session: AsyncSession = Depends(get_db),
+) -> NoteImportResult:
+    """Import markdown notes from an NDJSON body or a tar/zip of Markdown files.
+
+    Each batch is committed as it is loaded. Re-sending the same body with
+    the same ``source`` skips notes that were already imported, and ``skip``
+    resumes after the ``records`` count of an earlier, interrupted response.
+    """
+
+    if fmt is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        fmt = _IMPORT_CONTENT_TYPES.get(content_type.lower())
+        if fmt is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Send NDJSON, tar or zip, or pass ?format=",
+            )
+
+    importer = NoteImporter(session)
+    if fmt == "ndjson":
+        report = await importer.run(ndjson_records(request.stream(), source), skip=skip)
+        return NoteImportResult(**report.as_dict())
+
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        reader = tar_records if fmt == "tar" else zip_records
+        try:
+            report = await importer.run(iterate_in_thread(reader(spool, source)), skip=skip)
+        except (tarfile.TarError, zipfile.BadZipFile) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unreadable archive: {exc}"
+            ) from exc
+    return NoteImportResult(**report.as_dict())
+
+
 @router.patch("/{note_id}", response_model=NoteSchema)
 async def update_note(
     note_id: UUID, payload: NoteUpdate, session: AsyncSession = Depends(get_db)
@@ -58,6 +365,7 @@ async def update_note(
     repo = NoteRepository(session)
     data = payload.dict(exclude_unset=True)
     note = await repo.update(note_id, **data)
+    note_cache.invalidate(note_id)
     if note is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
     return to_schema(NoteSchema, note)
@@ -71,4 +379,9 @@ async def delete_note(
     deleted = await repo.delete(note_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
+    note_cache.invalidate(note_id)
+    note_index.remove(note_id)
+    table_index_advisor.forget(session.bind, note_id)
+    columnar_cache.invalidate(note_id)
+    link_graph.remove_note(note_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
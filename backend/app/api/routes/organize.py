@@ -2,18 +2,44 @@
 
 from __future__ import annotations
 
+import json
+from typing import AsyncIterator
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...db.models import NoteSchema
-from ...db.session import get_db
+from ...db.session import SessionLocal, get_db
 from ...services.ai import organize_draft as organize_draft_service
+from ...services.ai import organize_drafts
+from .schemas import OrganizeBatchRequest
 
 router = APIRouter()
 
 
+@router.post("/batch")
+async def organize_batch(payload: OrganizeBatchRequest) -> StreamingResponse:
+    """Organize many drafts, streaming one NDJSON progress record per chunk."""
+
+    if payload.all_drafts == (payload.draft_ids is not None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Provide either draft_ids or all_drafts=true",
+        )
+
+    async def progress() -> AsyncIterator[bytes]:
+        # The stream outlives the request scope, so it owns its session.
+        async with SessionLocal() as session:
+            async for record in organize_drafts(
+                session, draft_ids=payload.draft_ids, chunk_size=payload.chunk_size
+            ):
+                yield (json.dumps(record, default=str) + "\n").encode("utf-8")
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
 @router.post("/{draft_id}", response_model=NoteSchema)
 async def organize_draft(
     draft_id: UUID, session: AsyncSession = Depends(get_db)
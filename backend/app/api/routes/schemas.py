@@ -1,12 +1,14 @@
-"""Request payload schemas for API routes."""
+"""Request and response payload schemas for API routes."""
 
 from __future__ import annotations
 
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, constr
 
-from ...db.models import NoteContentType
+from ...db.models import NoteContentType, NoteLinkType, NoteSchema
 
 
 class NoteCreate(BaseModel):
@@ -35,3 +37,213 @@ class TagCreate(BaseModel):
 
     class Config:
         extra = "forbid"
+
+
+class TagAssignment(BaseModel):
+    note_ids: List[UUID] = Field(..., min_items=1, max_items=10_000)
+    tags: List[constr(min_length=1, max_length=100)] = Field(  # type: ignore[valid-type]
+        ..., min_items=1, max_items=100
+    )
+
+    class Config:
+        extra = "forbid"
+
+
+class TagAssignmentResult(BaseModel):
+    changed: int
+
+
+class NotePage(BaseModel):
+    items: List[NoteSchema]
+    next_cursor: Optional[str] = None
+
+
+class NoteSearchHit(BaseModel):
+    id: UUID
+    title: str
+    content_type: NoteContentType
+    archived: bool
+    created_at: datetime
+    updated_at: datetime
+    rank: float
+    title_headline: str
+    headline: str
+
+
+class NoteSearchPage(BaseModel):
+    items: List[NoteSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class SimilarNote(BaseModel):
+    id: UUID
+    title: str
+    content_type: NoteContentType
+    score: float
+
+
+class Backlink(BaseModel):
+    id: UUID
+    source_id: UUID
+    source_title: str
+    link_type: NoteLinkType
+    context_excerpt: Optional[str] = None
+    created_at: datetime
+
+
+class BacklinkPage(BaseModel):
+    items: List[Backlink]
+    next_cursor: Optional[str] = None
+
+
+class GraphNode(BaseModel):
+    id: UUID
+    title: str
+    depth: int
+
+
+class GraphEdge(BaseModel):
+    id: UUID
+    source_id: UUID
+    target_id: UUID
+    link_type: NoteLinkType
+
+
+class NoteGraphResult(BaseModel):
+    nodes: List[GraphNode]
+    edges: List[GraphEdge]
+    truncated: bool = False
+
+
+class RankedNote(BaseModel):
+    id: UUID
+    title: str
+    score: float
+
+
+class GraphComponents(BaseModel):
+    count: int
+    largest: List[int]
+    singletons: int
+
+
+class GraphPath(BaseModel):
+    hops: int
+    nodes: List[GraphNode]
+
+
+class BulkNoteItemResult(BaseModel):
+    index: int
+    id: Optional[UUID] = None
+    error: Optional[Any] = None
+
+
+class BulkNoteResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkNoteItemResult]
+
+
+class NoteImportResult(BaseModel):
+    records: int
+    imported: int
+    duplicates: int
+    skipped: int
+    batches: int
+    seconds: float
+    notes_per_second: float
+    errors: List[str]
+
+
+class TableIngestResult(BaseModel):
+    note_id: UUID
+    rows: int
+    row_count: int
+    batches: int
+    seconds: float
+    rows_per_second: float
+    schema_json: Dict[str, Any]
+
+
+class TableRowItem(BaseModel):
+    id: UUID
+    data: Dict[str, Any]
+
+
+class TableRowPage(BaseModel):
+    columns: List[str]
+    items: List[TableRowItem]
+    next_cursor: Optional[str] = None
+
+
+class RowFilter(BaseModel):
+    column: str
+    op: Literal[
+        "eq", "ne", "lt", "lte", "gt", "gte", "in", "contains", "is_null", "not_null"
+    ] = "eq"
+    value: Any = None
+
+    class Config:
+        extra = "forbid"
+
+
+class RowSort(BaseModel):
+    column: str
+    direction: Literal["asc", "desc"] = "asc"
+
+    class Config:
+        extra = "forbid"
+
+
+class RowAggregate(BaseModel):
+    fn: Literal["count", "count_distinct", "sum", "avg", "min", "max"]
+    column: Optional[str] = None
+    alias: Optional[str] = Field(default=None, min_length=1, max_length=100)
+
+    class Config:
+        extra = "forbid"
+
+
+class RowQueryRequest(BaseModel):
+    filters: List[RowFilter] = Field(default_factory=list, max_items=50)
+    sort: List[RowSort] = Field(default_factory=list, max_items=10)
+    group_by: List[str] = Field(default_factory=list, max_items=10)
+    aggregates: List[RowAggregate] = Field(default_factory=list, max_items=20)
+    columns: Optional[List[str]] = None
+    limit: int = Field(default=100, ge=1, le=1000)
+    offset: int = Field(default=0, ge=0, le=100_000)
+    # "auto" answers group_by/aggregate queries from the columnar cache.
+    engine: Literal["auto", "sql", "columnar"] = "auto"
+
+    class Config:
+        extra = "forbid"
+
+
+class RowQueryResult(BaseModel):
+    columns: List[str]
+    rows: List[List[Any]]
+    engine: Literal["sql", "columnar"] = "sql"
+
+
+class RowHistogramRequest(BaseModel):
+    column: str
+    bins: int = Field(default=20, ge=1, le=1000)
+    filters: List[RowFilter] = Field(default_factory=list, max_items=50)
+
+    class Config:
+        extra = "forbid"
+
+
+class RowHistogramResult(BaseModel):
+    column: str
+    edges: List[Any]
+    counts: List[int]
+
+
+class OrganizeBatchRequest(BaseModel):
+    draft_ids: Optional[List[UUID]] = None
+    all_drafts: bool = False
+    chunk_size: int = Field(default=500, ge=1, le=5000)
+
+    class Config:
+        extra = "forbid"
@@ -0,0 +1,305 @@
+"""HTTP routes for loading and querying the rows of table notes."""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import tempfile
+from typing import IO, Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.session import get_db
+from ...repositories import TableRowRepository
+from ...repositories.pagination import InvalidCursorError
+from ...services.cache import note_cache
+from ...services.tables import (
+    QueryError,
+    QueryTimeoutError,
+    SchemaError,
+    TableIngestor,
+    TableNotFoundError,
+    TableSource,
+    columnar_cache,
+    csv_source,
+    evaluate,
+    histogram,
+    load_table_schema,
+    parquet_available,
+    parquet_source,
+    parse_schema,
+    query_rows,
+    table_index_advisor,
+)
+from .schemas import (
+    RowHistogramRequest,
+    RowHistogramResult,
+    RowQueryRequest,
+    RowQueryResult,
+    TableIngestResult,
+    TableRowItem,
+    TableRowPage,
+)
+
+router = APIRouter()
+
+# Uploads are spooled to disk past this size before they are parsed.
+INGEST_SPOOL_BYTES = 16 * 1024 * 1024
+
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+TableFormat = Optional[Literal["csv", "parquet"]]
+
+
+def _resolve_format(request: Request, fmt: TableFormat) -> str:
+    if fmt is not None:
+        resolved = fmt
+    else:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        resolved = _CONTENT_TYPES.get(content_type.lower())
+        if resolved is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Send CSV or Parquet, or pass ?format=",
+            )
+    if resolved == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet ingestion is not available on this server",
+        )
+    return resolved
+
+
+async def _spool(request: Request) -> IO[bytes]:
+    spool = tempfile.SpooledTemporaryFile(max_size=INGEST_SPOOL_BYTES)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def _open_source(handle: IO[bytes], fmt: str, delimiter: str) -> TableSource:
+    if fmt == "parquet":
+        return parquet_source(handle)
+    return csv_source(handle, delimiter=delimiter)
+
+
+async def _ingest(
+    ingestor: TableIngestor,
+    note_id: Optional[UUID],
+    title: Optional[str],
+    handle: IO[bytes],
+    fmt: str,
+    delimiter: str,
+    schema: Optional[str],
+) -> TableIngestResult:
+    try:
+        columns = parse_schema(json.loads(schema)) if schema is not None else None
+        source = _open_source(handle, fmt, delimiter)
+        if note_id is None:
+            note_id = await ingestor.create_table(title or "")
+        report = await ingestor.ingest(note_id, source, schema=columns)
+    except TableNotFoundError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Note not found"
+        ) from exc
+    except SchemaError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        ) from exc
+    except (csv.Error, ValueError) as exc:
+        # Malformed CSV, bad UTF-8, an invalid schema parameter or unreadable Parquet.
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unreadable input: {exc}"
+        ) from exc
+    note_cache.invalidate(note_id)
+    return TableIngestResult(**report.as_dict())
+
+
+@router.post("/tables", response_model=TableIngestResult, status_code=status.HTTP_201_CREATED)
+async def create_table_note(
+    request: Request,
+    title: str = Query(..., min_length=1, max_length=255),
+    fmt: TableFormat = Query(default=None, alias="format"),
+    schema: Optional[str] = Query(default=None, description="JSON table schema"),
+    delimiter: str = Query(default=",", min_length=1, max_length=1),
+    session: AsyncSession = Depends(get_db),
+) -> TableIngestResult:
+    """Create a table note from a CSV or Parquet body.
+
+    Without ``schema`` the column types are inferred from the data.
+    """
+
+    resolved = _resolve_format(request, fmt)
+    with await _spool(request) as handle:
+        return await _ingest(
+            TableIngestor(session), None, title, handle, resolved, delimiter, schema
+        )
+
+
+@router.post("/{note_id}/rows", response_model=TableIngestResult)
+async def append_table_rows(
+    note_id: UUID,
+    request: Request,
+    fmt: TableFormat = Query(default=None, alias="format"),
+    delimiter: str = Query(default=",", min_length=1, max_length=1),
+    session: AsyncSession = Depends(get_db),
+) -> TableIngestResult:
+    """Append the rows of a CSV or Parquet body to an existing table note.
+
+    Columns must match the table's schema; the load is all-or-nothing.
+    """
+
+    resolved = _resolve_format(request, fmt)
+    with await _spool(request) as handle:
+        return await _ingest(
+            TableIngestor(session), note_id, None, handle, resolved, delimiter, None
+        )
+
+
+@router.get("/{note_id}/rows", response_model=TableRowPage)
+async def list_table_rows(
+    note_id: UUID,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None),
+    columns: Optional[str] = Query(
+        default=None, description="Comma-separated column names to return"
+    ),
+    session: AsyncSession = Depends(get_db),
+) -> TableRowPage:
+    """Page through a table note's rows in insertion order."""
+
+    table = await load_table_schema(session, note_id)
+    if table is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
+    known = [column.name for column in table[0]]
+    selected = None
+    if columns is not None:
+        selected = [name.strip() for name in columns.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in known]
+        if unknown or not selected:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown columns: {', '.join(unknown)}" if unknown else "No columns",
+            )
+
+    try:
+        page = await TableRowRepository(session).page(
+            note_id, limit=limit, cursor=cursor, columns=selected
+        )
+    except InvalidCursorError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+    return TableRowPage(
+        columns=selected or known,
+        items=[TableRowItem(**item) for item in page.items],
+        next_cursor=page.next_cursor,
+    )
+
+
+def _unprocessable(exc: QueryError) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+
+@router.post("/{note_id}/rows/query", response_model=RowQueryResult)
+async def query_table_rows(
+    note_id: UUID, payload: RowQueryRequest, session: AsyncSession = Depends(get_db)
+) -> RowQueryResult:
+    """Filter, sort, group and aggregate a table note's rows.
+
+    Group-by/aggregate queries are answered from the in-memory columnar
+    snapshot when the table fits the cache (``engine="auto"``); everything
+    else, or ``engine="sql"``, runs in Postgres.
+    """
+
+    table = await load_table_schema(session, note_id)
+    if table is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
+    columns, row_count = table
+    filters = [item.dict() for item in payload.filters]
+    sort = [item.dict() for item in payload.sort]
+    aggregates = [item.dict() for item in payload.aggregates]
+
+    grouped = bool(payload.group_by or payload.aggregates)
+    if payload.engine == "columnar" and not grouped:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="The columnar engine only answers group_by/aggregate queries",
+        )
+    if payload.engine == "columnar" or (
+        payload.engine == "auto"
+        and grouped
+        and not payload.columns
+        and columnar_cache.fits(row_count, len(columns))
+    ):
+        snapshot = await columnar_cache.get(session, note_id)
+        if snapshot is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
+        try:
+            labels, rows = await asyncio.to_thread(
+                evaluate,
+                snapshot,
+                filters=filters,
+                group_by=payload.group_by,
+                aggregates=aggregates,
+                sort=sort,
+                limit=payload.limit,
+                offset=payload.offset,
+            )
+        except QueryError as exc:
+            raise _unprocessable(exc) from exc
+        return RowQueryResult(columns=labels, rows=rows, engine="columnar")
+
+    try:
+        result = await query_rows(
+            session,
+            note_id,
+            columns,
+            filters=filters,
+            sort=sort,
+            group_by=payload.group_by,
+            aggregates=aggregates,
+            select_columns=payload.columns,
+            limit=payload.limit,
+            offset=payload.offset,
+        )
+    except QueryError as exc:
+        raise _unprocessable(exc) from exc
+    except QueryTimeoutError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(exc)
+        ) from exc
+
+    table_index_advisor.record(session.bind, note_id, row_count, result.indexable)
+    return RowQueryResult(columns=result.columns, rows=result.rows, engine="sql")
+
+
+@router.post("/{note_id}/rows/histogram", response_model=RowHistogramResult)
+async def table_rows_histogram(
+    note_id: UUID, payload: RowHistogramRequest, session: AsyncSession = Depends(get_db)
+) -> RowHistogramResult:
+    """Equal-width histogram of a numeric or temporal column, computed in memory."""
+
+    snapshot = await columnar_cache.get(session, note_id)
+    if snapshot is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
+    try:
+        edges, counts = await asyncio.to_thread(
+            histogram,
+            snapshot,
+            payload.column,
+            bins=payload.bins,
+            filters=[item.dict() for item in payload.filters],
+        )
+    except QueryError as exc:
+        raise _unprocessable(exc) from exc
+    return RowHistogramResult(column=payload.column, edges=edges, counts=counts)
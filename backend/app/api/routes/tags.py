@@ -4,23 +4,23 @@ from __future__ import annotations
 
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...db.models import TagSchema
 from ...db.session import get_db
 from ...repositories import TagRepository
-from ..schemas import to_schema
-from .schemas import TagCreate
+from ..schemas import dump_json_bytes, to_schema
+from .schemas import TagAssignment, TagAssignmentResult, TagCreate
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[TagSchema])
-async def list_tags(session: AsyncSession = Depends(get_db)) -> List[TagSchema]:
+async def list_tags(session: AsyncSession = Depends(get_db)) -> Response:
     repo = TagRepository(session)
-    tags = await repo.list_all()
-    return [to_schema(TagSchema, tag) for tag in tags]
+    tags = await repo.list_rows()
+    return Response(content=dump_json_bytes(tags), media_type="application/json")
 
 
 @router.post("/", response_model=TagSchema)
@@ -30,3 +30,28 @@ async def create_tag(
     repo = TagRepository(session)
     tag = await repo.get_or_create(payload.name)
     return to_schema(TagSchema, tag)
+
+
+@router.post("/attach", response_model=TagAssignmentResult)
+async def attach_tags(
+    payload: TagAssignment, session: AsyncSession = Depends(get_db)
+) -> TagAssignmentResult:
+    """Add every tag in ``tags`` to every note in ``note_ids``, creating missing tags.
+
+    Pairs that already exist and ids that are not notes are skipped.
+    """
+
+    repo = TagRepository(session)
+    changed = await repo.attach(payload.note_ids, payload.tags)
+    return TagAssignmentResult(changed=changed)
+
+
+@router.post("/detach", response_model=TagAssignmentResult)
+async def detach_tags(
+    payload: TagAssignment, session: AsyncSession = Depends(get_db)
+) -> TagAssignmentResult:
+    """Remove every tag in ``tags`` from every note in ``note_ids``."""
+
+    repo = TagRepository(session)
+    changed = await repo.detach(payload.note_ids, payload.tags)
+    return TagAssignmentResult(changed=changed)
@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
+import json
+from datetime import datetime
+from enum import Enum
 from typing import Any, Callable, Type, TypeVar
+from uuid import UUID
 
 T = TypeVar("T")
 
@@ -19,3 +23,40 @@ def to_schema(schema_cls: Type[T], entity: Any) -> T:
         return fallback(entity)
 
     raise TypeError(f"Schema {schema_cls!r} does not support ORM conversion")
+
+
+def to_json_bytes(model: Any) -> bytes:
+    """Serialize a Pydantic model instance to UTF-8 JSON bytes."""
+
+    dump: Callable[..., str] | None = getattr(model, "model_dump_json", None)
+    if callable(dump):
+        return dump().encode("utf-8")
+    return model.json().encode("utf-8")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json_bytes(value: Any) -> bytes:
+    """Serialize plain rows (dicts, lists, UUIDs, datetimes) to UTF-8 JSON bytes.
+
+    The output decodes to what ``to_json_bytes`` produces for the equivalent
+    schema, so list endpoints can encode column rows directly instead of
+    building a model per item. orjson is used when it is installed.
+    """
+
+    try:
+        import orjson
+    except ImportError:
+        text = json.dumps(value, default=_json_default, separators=(",", ":"), ensure_ascii=False)
+        return text.encode("utf-8")
+    # asyncpg returns its own UUID subclass, which orjson hands to ``default``.
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_UTC_Z)
@@ -1,13 +1,13 @@
 """Database package initialization."""
 
 from . import models
-from .session import SessionLocal, engine, get_db, get_engine, get_session
+from .session import SessionLocal, get_db, get_engine, get_session, init_engine
 
 __all__ = [
     "SessionLocal",
-    "engine",
     "get_db",
     "get_engine",
     "get_session",
+    "init_engine",
     "models",
 ]
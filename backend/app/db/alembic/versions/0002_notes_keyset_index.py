@@ -0,0 +1,24 @@
+"""notes keyset index
+
+Revision ID: 0002_notes_keyset_index
+Revises: 0001_init
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_notes_keyset_index"
+down_revision = "0001_init"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_notes_created_at_id", "notes", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notes_created_at_id", table_name="notes")
@@ -0,0 +1,50 @@
+"""notes search vector
+
+Revision ID: 0003_notes_search_vector
+Revises: 0002_notes_keyset_index
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_notes_search_vector"
+down_revision = "0002_notes_keyset_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("notes", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True))
+    op.execute(
+        """
+        UPDATE notes
+        SET search_vector =
+            setweight(to_tsvector('english'::regconfig, coalesce(notes.title, '')), 'A')
+            || setweight(
+                to_tsvector(
+                    'english'::regconfig,
+                    coalesce(
+                        (SELECT body FROM text_contents WHERE text_contents.note_id = notes.id),
+                        ''
+                    )
+                ),
+                'B'
+            )
+        """
+    )
+    op.create_index(
+        "ix_notes_search_vector",
+        "notes",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notes_search_vector", table_name="notes")
+    op.drop_column("notes", "search_vector")
@@ -0,0 +1,42 @@
+"""embedding dirty flags
+
+Revision ID: 0004_embedding_dirty_flags
+Revises: 0003_notes_search_vector
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_embedding_dirty_flags"
+down_revision = "0003_notes_search_vector"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ("text_contents", "table_rows"):
+        op.add_column(
+            table,
+            sa.Column(
+                "embedding_dirty",
+                sa.Boolean(),
+                server_default=sa.text("true"),
+                nullable=False,
+            ),
+        )
+        op.create_index(
+            f"ix_{table}_embedding_dirty",
+            table,
+            ["id"],
+            postgresql_where=sa.text("embedding_dirty"),
+        )
+
+
+def downgrade() -> None:
+    for table in ("table_rows", "text_contents"):
+        op.drop_index(f"ix_{table}_embedding_dirty", table_name=table)
+        op.drop_column(table, "embedding_dirty")
@@ -0,0 +1,32 @@
+"""table rows query indexes
+
+Revision ID: 0005_table_rows_query_indexes
+Revises: 0004_embedding_dirty_flags
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0005_table_rows_query_indexes"
+down_revision = "0004_embedding_dirty_flags"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_table_rows_table_note_id", "table_rows", ["table_note_id"])
+    op.create_index(
+        "ix_table_rows_row_data",
+        "table_rows",
+        ["row_data"],
+        postgresql_using="gin",
+        postgresql_ops={"row_data": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_table_rows_row_data", table_name="table_rows")
+    op.drop_index("ix_table_rows_table_note_id", table_name="table_rows")
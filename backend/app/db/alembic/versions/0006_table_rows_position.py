@@ -0,0 +1,35 @@
+"""table rows position
+
+Revision ID: 0006_table_rows_position
+Revises: 0005_table_rows_query_indexes
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_table_rows_position"
+down_revision = "0005_table_rows_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows are numbered in physical order while the table is rewritten.
+    op.add_column(
+        "table_rows",
+        sa.Column("position", sa.BigInteger(), sa.Identity(), nullable=False),
+    )
+    op.create_index(
+        "ix_table_rows_table_note_id_position", "table_rows", ["table_note_id", "position"]
+    )
+    op.drop_index("ix_table_rows_table_note_id", table_name="table_rows")
+
+
+def downgrade() -> None:
+    op.create_index("ix_table_rows_table_note_id", "table_rows", ["table_note_id"])
+    op.drop_index("ix_table_rows_table_note_id_position", table_name="table_rows")
+    op.drop_column("table_rows", "position")
@@ -0,0 +1,24 @@
+"""note tags tag index
+
+Revision ID: 0007_note_tags_tag_index
+Revises: 0006_table_rows_position
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_note_tags_tag_index"
+down_revision = "0006_table_rows_position"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_note_tags_tag_id_note_id", "note_tags", ["tag_id", "note_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_note_tags_tag_id_note_id", table_name="note_tags")
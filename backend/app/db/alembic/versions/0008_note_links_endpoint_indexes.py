@@ -0,0 +1,30 @@
+"""note links endpoint indexes
+
+Revision ID: 0008_note_links_endpoint_indexes
+Revises: 0007_note_tags_tag_index
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_note_links_endpoint_indexes"
+down_revision = "0007_note_tags_tag_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_note_links_source_id_target_id", "note_links", ["source_id", "target_id"]
+    )
+    op.create_index(
+        "ix_note_links_target_id_source_id", "note_links", ["target_id", "source_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_note_links_target_id_source_id", table_name="note_links")
+    op.drop_index("ix_note_links_source_id_target_id", table_name="note_links")
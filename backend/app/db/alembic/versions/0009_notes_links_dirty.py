@@ -0,0 +1,32 @@
+"""notes links dirty flag
+
+Revision ID: 0009_notes_links_dirty
+Revises: 0008_note_links_endpoint_indexes
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_notes_links_dirty"
+down_revision = "0008_note_links_endpoint_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "notes",
+        sa.Column("links_dirty", sa.Boolean(), server_default=sa.text("true"), nullable=False),
+    )
+    op.create_index(
+        "ix_notes_links_dirty", "notes", ["id"], postgresql_where=sa.text("links_dirty")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notes_links_dirty", table_name="notes")
+    op.drop_column("notes", "links_dirty")
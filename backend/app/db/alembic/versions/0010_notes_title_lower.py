@@ -0,0 +1,25 @@
+"""notes lower title index
+
+Revision ID: 0010_notes_title_lower
+Revises: 0009_notes_links_dirty
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0010_notes_title_lower"
+down_revision = "0009_notes_links_dirty"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_notes_title_lower", "notes", [sa.text("lower(title)")])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notes_title_lower", table_name="notes")
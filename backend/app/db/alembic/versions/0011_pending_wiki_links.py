@@ -0,0 +1,48 @@
+"""pending wiki links
+
+Revision ID: 0011_pending_wiki_links
+Revises: 0010_notes_title_lower
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0011_pending_wiki_links"
+down_revision = "0010_notes_title_lower"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pending_wiki_links",
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("source_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("title_key", sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(["source_id"], ["notes.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("source_id", "title_key", name="pk_pending_wiki_link"),
+    )
+    op.create_index(
+        "ix_pending_wiki_links_title_key", "pending_wiki_links", ["title_key"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pending_wiki_links_title_key", table_name="pending_wiki_links")
+    op.drop_table("pending_wiki_links")
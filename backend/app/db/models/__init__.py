@@ -13,6 +13,7 @@ from .table_content import TableContent, TableContentSchema
 from .table_row import TableRow, TableRowSchema
 from .tag import Tag, TagSchema
 from .text_content import TextContent, TextContentSchema
+from .wiki_link import PendingWikiLink
 
 
 def _rebuild_schema_models(models: Iterable[type]) -> None:
@@ -64,6 +65,7 @@ __all__ = [
     "NoteLinkType",
     "NoteTag",
     "NoteTagSchema",
+    "PendingWikiLink",
     "TableContent",
     "TableContentSchema",
     "TableRow",
@@ -8,7 +8,7 @@ from typing import Optional
 from uuid import UUID as UUIDType
 
 from pydantic import BaseModel
-from sqlalchemy import Enum as SAEnum, ForeignKey, Text
+from sqlalchemy import Enum as SAEnum, ForeignKey, Index, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin, UUIDMixin
@@ -21,6 +21,11 @@ class NoteLinkType(str, Enum):
 
 class NoteLink(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "note_links"
+    __table_args__ = (
+        # One index per edge direction for outgoing walks and backlinks.
+        Index("ix_note_links_source_id_target_id", "source_id", "target_id"),
+        Index("ix_note_links_target_id_source_id", "target_id", "source_id"),
+    )
 
     source_id: Mapped[UUIDType] = mapped_column(
         ForeignKey("notes.id", ondelete="CASCADE"), nullable=False
@@ -8,7 +8,9 @@ from typing import List, Optional
 from uuid import UUID as UUIDType
 
 from pydantic import BaseModel
-from sqlalchemy import Boolean, Enum as SAEnum, String
+from sqlalchemy import Boolean, Enum as SAEnum, Index, String, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.sql import func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin, UUIDMixin
@@ -21,18 +23,42 @@ class NoteContentType(str, Enum):
 
 class Note(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        Index("ix_notes_created_at_id", "created_at", "id"),
+        Index("ix_notes_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_notes_links_dirty", "id", postgresql_where=text("links_dirty")),
+        # Resolves ``[[Title]]`` references case-insensitively.
+        Index("ix_notes_title_lower", func.lower(text("title"))),
+    )
 
     title: Mapped[str] = mapped_column(String(length=255), nullable=False)
     content_type: Mapped[NoteContentType] = mapped_column(
         SAEnum(NoteContentType, name="note_content_type"), nullable=False
     )
     archived: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Set when the note's embedding changes; cleared by the link inference job.
+    links_dirty: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=True, server_default=text("true")
+    )
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, nullable=True, deferred=True
+    )
 
+    # NoteSchema serializes both contents, so they are always loaded with the
+    # note: one extra SELECT per query rather than one per note.
     text_content: Mapped["TextContent"] = relationship(
-        "TextContent", back_populates="note", uselist=False, cascade="all, delete-orphan"
+        "TextContent",
+        back_populates="note",
+        uselist=False,
+        cascade="all, delete-orphan",
+        lazy="selectin",
     )
     table_content: Mapped["TableContent"] = relationship(
-        "TableContent", back_populates="note", uselist=False, cascade="all, delete-orphan"
+        "TableContent",
+        back_populates="note",
+        uselist=False,
+        cascade="all, delete-orphan",
+        lazy="selectin",
     )
     note_tags: Mapped[List["NoteTag"]] = relationship(
         "NoteTag", back_populates="note", cascade="all, delete-orphan"
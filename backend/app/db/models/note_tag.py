@@ -6,7 +6,7 @@ from datetime import datetime
 from uuid import UUID as UUIDType
 
 from pydantic import BaseModel
-from sqlalchemy import ForeignKey, PrimaryKeyConstraint
+from sqlalchemy import ForeignKey, Index, PrimaryKeyConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -16,6 +16,8 @@ class NoteTag(TimestampMixin, Base):
     __tablename__ = "note_tags"
     __table_args__ = (
         PrimaryKeyConstraint("note_id", "tag_id", name="pk_note_tag"),
+        # Lookups by tag; the primary key only serves lookups by note.
+        Index("ix_note_tags_tag_id_note_id", "tag_id", "note_id"),
     )
 
     note_id: Mapped[UUIDType] = mapped_column(
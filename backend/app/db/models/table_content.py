@@ -23,10 +23,15 @@ class TableContent(UUIDMixin, TimestampMixin, Base):
     row_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     note: Mapped["Note"] = relationship("Note", back_populates="table_content")
+    # Tables can hold millions of rows: never load them through the ORM. Read
+    # them a page at a time with TableRowRepository; deletes cascade in SQL.
     rows: Mapped[list["TableRow"]] = relationship(
         "TableRow",
         back_populates="table_content",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
+        order_by="TableRow.position",
         primaryjoin="TableContent.note_id==TableRow.table_note_id",
         foreign_keys="TableRow.table_note_id",
     )
@@ -7,7 +7,7 @@ from typing import Optional
 from uuid import UUID as UUIDType
 
 from pydantic import BaseModel
-from sqlalchemy import ForeignKey
+from sqlalchemy import BigInteger, Boolean, ForeignKey, Identity, Index, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -16,12 +16,31 @@ from .base import Base, TimestampMixin, UUIDMixin
 
 class TableRow(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "table_rows"
+    __table_args__ = (
+        Index("ix_table_rows_table_note_id_position", "table_note_id", "position"),
+        Index(
+            "ix_table_rows_row_data",
+            "row_data",
+            postgresql_using="gin",
+            postgresql_ops={"row_data": "jsonb_path_ops"},
+        ),
+        Index(
+            "ix_table_rows_embedding_dirty",
+            "id",
+            postgresql_where=text("embedding_dirty"),
+        ),
+    )
 
     table_note_id: Mapped[UUIDType] = mapped_column(
         ForeignKey("table_contents.note_id", ondelete="CASCADE"), nullable=False
     )
+    # Insertion order; rows are listed and paginated by (table_note_id, position).
+    position: Mapped[int] = mapped_column(BigInteger, Identity(), nullable=False)
     row_data: Mapped[dict] = mapped_column(JSONB, nullable=False)
     embedding: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    embedding_dirty: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=True, server_default=text("true")
+    )
 
     table_content: Mapped["TableContent"] = relationship(
         "TableContent",
@@ -34,6 +53,7 @@ class TableRow(UUIDMixin, TimestampMixin, Base):
 class TableRowSchema(BaseModel):
     id: UUIDType
     table_note_id: UUIDType
+    position: int
     row_data: dict
     embedding: Optional[dict]
     created_at: datetime
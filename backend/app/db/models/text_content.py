@@ -7,7 +7,7 @@ from typing import Optional
 from uuid import UUID as UUIDType
 
 from pydantic import BaseModel
-from sqlalchemy import ForeignKey, Text
+from sqlalchemy import Boolean, ForeignKey, Index, Text, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -16,12 +16,22 @@ from .base import Base, TimestampMixin, UUIDMixin
 
 class TextContent(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "text_contents"
+    __table_args__ = (
+        Index(
+            "ix_text_contents_embedding_dirty",
+            "id",
+            postgresql_where=text("embedding_dirty"),
+        ),
+    )
 
     note_id: Mapped[UUIDType] = mapped_column(
         ForeignKey("notes.id", ondelete="CASCADE"), unique=True, nullable=False
     )
     body: Mapped[str] = mapped_column(Text, nullable=False)
     embedding: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    embedding_dirty: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=True, server_default=text("true")
+    )
 
     note: Mapped["Note"] = relationship("Note", back_populates="text_content")
 
@@ -0,0 +1,33 @@
+"""SQLAlchemy model for ``[[Title]]`` references that no note matched yet."""
+
+from __future__ import annotations
+
+from uuid import UUID as UUIDType
+
+from sqlalchemy import ForeignKey, Index, PrimaryKeyConstraint, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+class PendingWikiLink(TimestampMixin, Base):
+    """A wiki link from ``source_id`` to a title no note had when it was saved.
+
+    Creating or renaming a note to ``title_key`` re-syncs the waiting sources,
+    which turns these rows into ``EXPLICIT`` links.
+    """
+
+    __tablename__ = "pending_wiki_links"
+    __table_args__ = (
+        PrimaryKeyConstraint("source_id", "title_key", name="pk_pending_wiki_link"),
+        # Lookups by the title of a newly created or renamed note.
+        Index("ix_pending_wiki_links_title_key", "title_key"),
+    )
+
+    source_id: Mapped[UUIDType] = mapped_column(
+        ForeignKey("notes.id", ondelete="CASCADE"), nullable=False
+    )
+    title_key: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+__all__ = ["PendingWikiLink"]
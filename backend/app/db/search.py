@@ -0,0 +1,43 @@
+"""SQL expressions shared by the full-text search index and its queries."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.sql.elements import ColumnElement
+
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+_WEIGHT_A = literal_column("'A'::\"char\"")
+_WEIGHT_B = literal_column("'B'::\"char\"")
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MinWords=5, MaxWords=25"
+
+
+def search_document(title: Any, body: Any) -> ColumnElement:
+    """Return the weighted ``tsvector`` stored in ``notes.search_vector``.
+
+    Titles are weighted ``A`` and bodies ``B`` so title matches rank first.
+    """
+
+    return func.setweight(
+        func.to_tsvector(SEARCH_CONFIG, func.coalesce(title, "")), _WEIGHT_A
+    ).op("||")(
+        func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(body, "")), _WEIGHT_B)
+    )
+
+
+def search_query(query: str) -> ColumnElement:
+    """Parse user input with ``websearch_to_tsquery`` (quotes, ``or``, ``-``)."""
+
+    return func.websearch_to_tsquery(SEARCH_CONFIG, query)
+
+
+def headline(document: Any, tsquery: ColumnElement) -> ColumnElement:
+    """Return ``document`` with matched terms wrapped in ``<mark>`` tags."""
+
+    return func.ts_headline(
+        SEARCH_CONFIG, func.coalesce(document, ""), tsquery, HEADLINE_OPTIONS
+    )
+
+
+__all__ = ["HEADLINE_OPTIONS", "SEARCH_CONFIG", "headline", "search_document", "search_query"]
@@ -2,18 +2,74 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-from typing import List
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from .api import router as api_router
+from .db.session import SessionLocal, dispose_engine, init_engine
+from .repositories import TagRepository
+from .services.embeddings import EmbeddingWorker
+from .services.metrics import MetricsMiddleware, request_metrics
+from .services.similarity import note_index
+from .services.slow_queries import slow_query_log
 
 load_dotenv()
 
-app = FastAPI(title="Bobo Notes API")
+logger = logging.getLogger(__name__)
+
+SIMILARITY_INDEX_ENABLED = os.getenv("SIMILARITY_INDEX_ENABLED", "1") == "1"
+EMBEDDING_WORKER_ENABLED = os.getenv("EMBEDDING_WORKER_ENABLED", "0") == "1"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Open the database pool and load in-process indexes; undo both on shutdown."""
+
+    engine = init_engine()
+    try:
+        async with SessionLocal() as session:
+            await TagRepository(session).warm_cache()
+    except Exception:  # tags are then resolved from the database on first use
+        logger.exception("Failed to warm the tag cache")
+
+    if SIMILARITY_INDEX_ENABLED:
+        try:
+            async with SessionLocal() as session:
+                await note_index.load(session)
+        except Exception:  # keep serving the rest of the API without it
+            logger.exception("Failed to load the similarity index")
+
+    tasks = []
+    if note_index.ready:
+        tasks.append(asyncio.create_task(note_index.run(SessionLocal)))
+    if EMBEDDING_WORKER_ENABLED:
+        tasks.append(asyncio.create_task(EmbeddingWorker(SessionLocal).run_forever()))
+    if slow_query_log.enabled:
+        tasks.append(asyncio.create_task(slow_query_log.run(engine)))
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    if note_index.ready:
+        await note_index.compact()
+    await dispose_engine()
+
+
+app = FastAPI(title="Bobo Notes API", lifespan=lifespan)
 
 allowed_origins: List[str] = [
     os.getenv("FRONTEND_ORIGIN", "http://localhost:3000"),
@@ -28,6 +84,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router)
 
 
@@ -38,6 +97,13 @@ async def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Per-route latency and SQL metrics in the Prometheus text format."""
+
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -2,14 +2,30 @@
 
 from .base import BaseRepository
 from .drafts import DraftRepository
-from .links import LinkRepository
+from .links import (
+    LinkEdge,
+    LinkRepository,
+    NewLink,
+    NoteGraph,
+    add_link_listener,
+    notify_links_changed,
+)
 from .notes import NoteRepository
-from .tags import TagRepository
+from .table_rows import TableRowRepository
+from .tags import TagIdCache, TagRepository, tag_id_cache
 
 __all__ = [
     "BaseRepository",
     "DraftRepository",
+    "LinkEdge",
     "LinkRepository",
+    "NewLink",
+    "NoteGraph",
     "NoteRepository",
+    "TableRowRepository",
+    "TagIdCache",
     "TagRepository",
+    "add_link_listener",
+    "notify_links_changed",
+    "tag_id_cache",
 ]
@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import delete, select
 
 from ..db.models import Draft
 from .base import BaseRepository
 
+# Keys of DraftSchema, in order; ``metadata`` is read by column name.
+_DRAFT_FIELDS = ("id", "title", "body", "editor_state", "metadata", "created_at", "updated_at")
+
 
 class DraftRepository(BaseRepository):
     """CRUD helpers for :class:`Draft`."""
@@ -19,6 +22,18 @@ class DraftRepository(BaseRepository):
         result = await self.session.execute(stmt)
         return list(result.scalars().unique())
 
+    async def list_rows(self) -> List[Dict[str, Any]]:
+        """The drafts :meth:`list` returns, as plain dicts shaped like ``DraftSchema``."""
+
+        columns = Draft.__table__.c
+        stmt = select(*(columns[name] for name in _DRAFT_FIELDS)).order_by(
+            columns.created_at.desc()
+        )
+        result = await self.session.execute(stmt)
+        # Keyed by the plain strings above: the ``metadata`` column's own key is a
+        # ``quoted_name``, which strict JSON encoders reject.
+        return [dict(zip(_DRAFT_FIELDS, row)) for row in result]
+
     async def get(self, draft_id: UUID) -> Optional[Draft]:
         stmt = select(Draft).where(Draft.id == draft_id)
         result = await self.session.execute(stmt)
@@ -37,3 +52,39 @@ class DraftRepository(BaseRepository):
         await self.session.delete(draft)
         await self.session.commit()
         return True
+
+    async def claim_chunk(
+        self,
+        limit: int,
+        after: Optional[UUID] = None,
+        draft_ids: Optional[Iterable[UUID]] = None,
+    ) -> List[Draft]:
+        """Lock and return up to ``limit`` drafts ordered by id, after ``after``.
+
+        Rows already locked by a concurrent batch are skipped rather than waited
+        on. The locks are held until the caller commits.
+        """
+
+        stmt = (
+            select(Draft)
+            .order_by(Draft.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        if after is not None:
+            stmt = stmt.where(Draft.id > after)
+        if draft_ids is not None:
+            stmt = stmt.where(Draft.id.in_(list(draft_ids)))
+        result = await self.session.execute(stmt)
+        return list(result.scalars())
+
+    async def delete_many(self, draft_ids: Iterable[UUID]) -> int:
+        """Delete drafts by id without committing; returns the number removed."""
+
+        ids = list(draft_ids)
+        if not ids:
+            return 0
+        result = await self.session.execute(
+            delete(Draft).where(Draft.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
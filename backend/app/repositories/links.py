@@ -1,16 +1,132 @@
-"""Repository helpers for creating links between notes."""
+"""Repository helpers for creating and traversing links between notes."""
 
 from __future__ import annotations
 
-from typing import Optional
+import re
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 from uuid import UUID
 
-from ..db.models import NoteLink, NoteLinkType
+from sqlalchemy import (
+    Text,
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID
+
+from ..db.models import Note, NoteLink, NoteLinkType, PendingWikiLink, TextContent
 from .base import BaseRepository
+from .pagination import Page, decode_cursor, encode_cursor
+
+MAX_GRAPH_DEPTH = 5
+WIKI_EXCERPT_CHARS = 80
+
+# ``[[Title]]``, ``[[Title|label]]`` and ``[[Title#Heading]]`` all link to ``Title``.
+_WIKI_LINK = re.compile(r"\[\[([^\[\]|#\n]+)(?:#[^\[\]|\n]*)?(?:\|[^\[\]\n]*)?\]\]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class NoteGraph(NamedTuple):
+    """Notes within ``depth`` hops of a root note and the links between them."""
+
+    nodes: List[Dict[str, Any]]
+    edges: List[Dict[str, Any]]
+    truncated: bool
+
+
+class LinkEdge(NamedTuple):
+    source_id: UUID
+    target_id: UUID
+    link_type: NoteLinkType
+
+
+class NewLink(NamedTuple):
+    source_id: UUID
+    target_id: UUID
+    link_type: NoteLinkType
+    context_excerpt: Optional[str] = None
+
+    @property
+    def edge(self) -> LinkEdge:
+        return LinkEdge(self.source_id, self.target_id, self.link_type)
+
+
+# ``(added, removed)`` edges, as returned by the sync methods below.
+LinkChanges = Tuple[List[LinkEdge], List[LinkEdge]]
+LinkListener = Callable[[Sequence[LinkEdge], Sequence[LinkEdge]], None]
+_listeners: List[LinkListener] = []
+
+
+def add_link_listener(listener: LinkListener) -> None:
+    """Call ``listener(added, removed)`` after link changes are committed.
+
+    This lets in-memory views of the link graph stay current without the
+    repository layer depending on them.
+    """
+
+    _listeners.append(listener)
+
+
+def notify_links_changed(
+    added: Sequence[LinkEdge] = (), removed: Sequence[LinkEdge] = ()
+) -> None:
+    if not added and not removed:
+        return
+    for listener in _listeners:
+        listener(added, removed)
+
+
+def wiki_link_key(title: str) -> str:
+    """Normalised form of a note title, as matched by ``ix_notes_title_lower``."""
+
+    return _WHITESPACE.sub(" ", title).strip().lower()
+
+
+def extract_wiki_links(body: Optional[str]) -> Dict[str, str]:
+    """Map each ``[[...]]`` target in ``body`` to the text around its first use."""
+
+    links: Dict[str, str] = {}
+    for match in _WIKI_LINK.finditer(body or ""):
+        key = wiki_link_key(match.group(1))
+        if not key or key in links:
+            continue
+        start = max(match.start() - WIKI_EXCERPT_CHARS, 0)
+        end = match.end() + WIKI_EXCERPT_CHARS
+        links[key] = _WHITESPACE.sub(" ", body[start:end]).strip()  # type: ignore[index]
+    return links
+
+
+def _uuid_array(values: Sequence[UUID], key: str) -> Any:
+    return bindparam(key, list(values), type_=ARRAY(PGUUID(as_uuid=True)))
+
+
+def _link_type(link_type: Optional[str | NoteLinkType]) -> Optional[NoteLinkType]:
+    if link_type is None or isinstance(link_type, NoteLinkType):
+        return link_type
+    return NoteLinkType(link_type)
 
 
 class LinkRepository(BaseRepository):
-    """Persistence helpers for :class:`NoteLink`."""
+    """Persistence and traversal helpers for :class:`NoteLink`."""
 
     async def create_link(
         self,
@@ -29,4 +145,305 @@ class LinkRepository(BaseRepository):
             context_excerpt=context_excerpt,
         )
         self.session.add(link)
-        return await self.commit_and_refresh(link)
+        link = await self.commit_and_refresh(link)
+        notify_links_changed(added=[LinkEdge(source_id, target_id, link_type)])
+        return link
+
+    async def create_links(self, links: Sequence[NewLink]) -> int:
+        """Bulk :meth:`create_link`: one multi-row ``INSERT`` and one commit."""
+
+        await self._insert(links)
+        await self.session.commit()
+        notify_links_changed(added=[link.edge for link in links])
+        return len(links)
+
+    async def sync_links(
+        self,
+        source_ids: Sequence[UUID],
+        link_type: str | NoteLinkType,
+        links: Sequence[NewLink],
+    ) -> LinkChanges:
+        """Make ``links`` the only ``link_type`` links leaving ``source_ids``.
+
+        Existing links are diffed against ``links``. Only new edges are
+        inserted and only edges that disappeared are deleted. Unchanged links
+        keep their row and excerpt. Runs in the caller's transaction without
+        committing. Returns ``(added, removed)``; pass them to
+        :func:`notify_links_changed` once committed.
+        """
+
+        kind = _link_type(link_type)
+        if not source_ids:
+            return [], []
+        ids = _uuid_array(source_ids, "source_ids")
+        existing = await self.session.execute(
+            select(NoteLink.id, NoteLink.source_id, NoteLink.target_id).where(
+                NoteLink.source_id == any_(ids), NoteLink.link_type == kind
+            )
+        )
+        current: Dict[LinkEdge, List[UUID]] = {}
+        for link_id, source_id, target_id in existing:
+            current.setdefault(LinkEdge(source_id, target_id, kind), []).append(link_id)
+
+        wanted: Dict[LinkEdge, NewLink] = {}
+        for link in links:
+            wanted.setdefault(link.edge, link)
+        added = [link for edge, link in wanted.items() if edge not in current]
+        removed = [edge for edge in current if edge not in wanted]
+
+        stale = [link_id for edge in removed for link_id in current[edge]]
+        if stale:
+            await self.session.execute(
+                delete(NoteLink)
+                .where(NoteLink.id == any_(_uuid_array(stale, "stale_ids")))
+                .execution_options(synchronize_session=False)
+            )
+        await self._insert(added)
+        return [link.edge for link in added], removed
+
+    async def sync_wiki_links(
+        self, note_id: UUID, body: Optional[str]
+    ) -> LinkChanges:
+        """Make the note's ``EXPLICIT`` links match the ``[[...]]`` links in ``body``.
+
+        See :meth:`sync_wiki_links_many`. Does not commit.
+        """
+
+        return await self.sync_wiki_links_many({note_id: body})
+
+    async def sync_wiki_links_many(
+        self, bodies: Mapping[UUID, Optional[str]]
+    ) -> LinkChanges:
+        """Sync the ``EXPLICIT`` links of every note in ``bodies`` with its body.
+
+        Targets for all notes are resolved in one query on ``lower(title)``.
+        When several notes share a title, the oldest wins. Links to the note
+        itself are ignored. Titles that match no note are kept in
+        ``pending_wiki_links`` so :meth:`resolve_pending_wiki_links` can link
+        them once such a note exists. Only edges that changed are written (see
+        :meth:`sync_links`). Does not commit.
+        """
+
+        if not bodies:
+            return [], []
+        wanted = {note_id: extract_wiki_links(body) for note_id, body in bodies.items()}
+        keys = sorted({key for refs in wanted.values() for key in refs})
+        targets: Dict[str, UUID] = {}
+        if keys:
+            title = func.lower(Note.title)
+            rows = await self.session.execute(
+                select(title, Note.id)
+                .where(title == any_(bindparam("titles", keys, type_=ARRAY(Text))))
+                .order_by(title, Note.created_at, Note.id)
+                .distinct(title)
+            )
+            targets = {key: target_id for key, target_id in rows}
+
+        links: List[NewLink] = []
+        pending: List[Dict[str, Any]] = []
+        for note_id, refs in wanted.items():
+            for key, excerpt in refs.items():
+                target_id = targets.get(key)
+                if target_id is None:
+                    pending.append({"source_id": note_id, "title_key": key})
+                elif target_id != note_id:
+                    links.append(NewLink(note_id, target_id, NoteLinkType.EXPLICIT, excerpt))
+
+        await self.session.execute(
+            delete(PendingWikiLink)
+            .where(PendingWikiLink.source_id == any_(_uuid_array(list(bodies), "source_ids")))
+            .execution_options(synchronize_session=False)
+        )
+        if pending:
+            await self.session.execute(insert(PendingWikiLink), pending)
+        return await self.sync_links(list(bodies), NoteLinkType.EXPLICIT, links)
+
+    async def resolve_pending_wiki_links(
+        self, titles: Iterable[str]
+    ) -> LinkChanges:
+        """Link notes that were waiting for a note called one of ``titles``.
+
+        Call this after notes are created or renamed, in the same transaction.
+        The waiting notes are re-synced from their current bodies. Does not
+        commit.
+        """
+
+        keys = sorted({wiki_link_key(title) for title in titles} - {""})
+        if not keys:
+            return [], []
+        waiting = (
+            select(PendingWikiLink.source_id)
+            .where(PendingWikiLink.title_key == any_(bindparam("keys", keys, type_=ARRAY(Text))))
+            .distinct()
+        )
+        rows = await self.session.execute(
+            select(TextContent.note_id, TextContent.body).where(
+                TextContent.note_id.in_(waiting)
+            )
+        )
+        return await self.sync_wiki_links_many(dict(rows.all()))
+
+    async def wiki_referrers(self, note_id: UUID) -> Dict[UUID, str]:
+        """Bodies of the notes whose ``[[Title]]`` references link to ``note_id``.
+
+        Read them before ``note_id`` is renamed or deleted, then pass them to
+        :meth:`sync_wiki_links_many` once the change is flushed, so those
+        references resolve again or go back to ``pending_wiki_links``.
+        """
+
+        sources = select(NoteLink.source_id).where(
+            NoteLink.target_id == note_id,
+            NoteLink.source_id != note_id,
+            NoteLink.link_type == NoteLinkType.EXPLICIT,
+        )
+        rows = await self.session.execute(
+            select(TextContent.note_id, TextContent.body).where(TextContent.note_id.in_(sources))
+        )
+        return {source_id: body for source_id, body in rows if extract_wiki_links(body)}
+
+    async def _insert(self, links: Sequence[NewLink]) -> None:
+        if links:
+            await self.session.execute(insert(NoteLink), [link._asdict() for link in links])
+
+    async def backlinks(
+        self,
+        note_id: UUID,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        link_type: Optional[str | NoteLinkType] = None,
+    ) -> Optional[Page]:
+        """Return links pointing at ``note_id``, newest first, with source titles.
+
+        Pages are keyed on ``(created_at, id)`` and read through
+        ``ix_note_links_target_id_source_id``. Returns ``None`` if the note
+        does not exist.
+        """
+
+        stmt = (
+            select(
+                NoteLink.id,
+                NoteLink.source_id,
+                Note.title.label("source_title"),
+                NoteLink.link_type,
+                NoteLink.context_excerpt,
+                NoteLink.created_at,
+            )
+            .join(Note, Note.id == NoteLink.source_id)
+            .where(NoteLink.target_id == note_id)
+            .order_by(NoteLink.created_at.desc(), NoteLink.id.desc())
+            .limit(limit + 1)
+        )
+        kind = _link_type(link_type)
+        if kind is not None:
+            stmt = stmt.where(NoteLink.link_type == kind)
+        if cursor is not None:
+            created_at, link_id = decode_cursor(cursor, datetime.fromisoformat, UUID)
+            stmt = stmt.where(
+                tuple_(NoteLink.created_at, NoteLink.id) < tuple_(created_at, link_id)
+            )
+
+        rows = [dict(row._mapping) for row in await self.session.execute(stmt)]
+        if not rows and cursor is None and not await self._exists(note_id):
+            return None
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return Page(rows, next_cursor)
+
+    async def neighbourhood(
+        self,
+        note_id: UUID,
+        depth: int = 1,
+        link_type: Optional[str | NoteLinkType] = None,
+        direction: str = "both",
+        max_nodes: int = 500,
+    ) -> Optional[NoteGraph]:
+        """Return the notes within ``depth`` hops of ``note_id`` and their links.
+
+        The walk is one recursive CTE. Each step follows outgoing links
+        through ``ix_note_links_source_id_target_id`` and/or incoming links
+        through ``ix_note_links_target_id_source_id``. Cycles are cut by
+        ``UNION``'s duplicate elimination on ``(note, depth)``, so a note is
+        expanded at most once per level instead of once per path reaching it.
+        Nodes carry their shortest hop count. ``direction`` is ``"out"``,
+        ``"in"`` or ``"both"``. Returns ``None`` if the note does not exist.
+        """
+
+        depth = max(0, min(depth, MAX_GRAPH_DEPTH))
+        kind = _link_type(link_type)
+        root = literal(note_id, PGUUID(as_uuid=True))
+
+        walk = select(root.label("note_id"), literal(0).label("depth")).cte(
+            "walk", recursive=True
+        )
+        branches = []
+        if direction in ("out", "both"):
+            branches.append(
+                select(NoteLink.target_id.label("next_id")).where(
+                    NoteLink.source_id == walk.c.note_id
+                )
+            )
+        if direction in ("in", "both"):
+            branches.append(
+                select(NoteLink.source_id.label("next_id")).where(
+                    NoteLink.target_id == walk.c.note_id
+                )
+            )
+        if not branches:
+            raise ValueError(f"unknown direction {direction!r}")
+        if kind is not None:
+            branches = [branch.where(NoteLink.link_type == kind) for branch in branches]
+        step = (union_all(*branches) if len(branches) > 1 else branches[0]).lateral("step")
+        walk = walk.union(
+            select(step.c.next_id, walk.c.depth + 1)
+            .select_from(walk)
+            .join(step, true())
+            .where(walk.c.depth < depth)
+        )
+
+        reached = (
+            select(walk.c.note_id, func.min(walk.c.depth).label("depth"))
+            .group_by(walk.c.note_id)
+            .subquery("reached")
+        )
+        stmt = (
+            select(Note.id, Note.title, reached.c.depth)
+            .join(reached, reached.c.note_id == Note.id)
+            .order_by(reached.c.depth, Note.id)
+            .limit(max_nodes + 1)
+        )
+        nodes = [dict(row._mapping) for row in await self.session.execute(stmt)]
+        if not nodes:
+            return None
+        truncated = len(nodes) > max_nodes
+        nodes = nodes[:max_nodes]
+
+        ids = _uuid_array([node["id"] for node in nodes], "ids")
+        edges_stmt = select(
+            NoteLink.id, NoteLink.source_id, NoteLink.target_id, NoteLink.link_type
+        ).where(NoteLink.source_id == any_(ids), NoteLink.target_id == any_(ids))
+        if kind is not None:
+            edges_stmt = edges_stmt.where(NoteLink.link_type == kind)
+        edges = [dict(row._mapping) for row in await self.session.execute(edges_stmt)]
+        return NoteGraph(nodes, edges, truncated)
+
+    async def _exists(self, note_id: UUID) -> bool:
+        found = await self.session.scalar(select(Note.id).where(Note.id == note_id))
+        return found is not None
+
+
+__all__ = [
+    "LinkChanges",
+    "LinkEdge",
+    "LinkRepository",
+    "MAX_GRAPH_DEPTH",
+    "NewLink",
+    "NoteGraph",
+    "WIKI_EXCERPT_CHARS",
+    "add_link_listener",
+    "extract_wiki_links",
+    "notify_links_changed",
+    "wiki_link_key",
+]
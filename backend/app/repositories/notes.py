@@ -2,30 +2,198 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
 from uuid import UUID
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import any_, bindparam, func, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import raiseload, selectinload
 
-from ..db.models import Note, NoteContentType, TextContent
+from ..db.models import Note, NoteContentType, NoteTag, TableContent, Tag, TextContent
+from ..db.search import headline, search_document, search_query
 from .base import BaseRepository
+from .links import (
+    LinkChanges,
+    LinkRepository,
+    extract_wiki_links,
+    notify_links_changed,
+    wiki_link_key,
+)
+from .pagination import Page, decode_cursor, encode_cursor
+
+
+def _tagged(names: Sequence[str]) -> Any:
+    return (
+        select(NoteTag.note_id)
+        .join(Tag, Tag.id == NoteTag.tag_id)
+        .where(NoteTag.note_id == Note.id, Tag.name.in_(names))
+        .exists()
+    )
+
+
+def _listing(
+    stmt: Any,
+    limit: int,
+    cursor: Optional[str],
+    tags: Sequence[str],
+    match_all: bool,
+) -> Any:
+    """Apply the newest-first order, tag filters and keyset cursor of a listing."""
+
+    stmt = stmt.order_by(Note.created_at.desc(), Note.id.desc()).limit(limit + 1)
+    if tags:
+        names = sorted(set(tags))
+        if match_all:
+            stmt = stmt.where(*(_tagged([name]) for name in names))
+        else:
+            stmt = stmt.where(_tagged(names))
+    if cursor is not None:
+        created_at, note_id = decode_cursor(cursor, datetime.fromisoformat, UUID)
+        stmt = stmt.where(tuple_(Note.created_at, Note.id) < tuple_(created_at, note_id))
+    return stmt
+
+
+# Keys of NoteSchema, TextContentSchema and TableContentSchema, in order.
+_NOTE_FIELDS = ("id", "title", "content_type", "archived", "created_at", "updated_at")
+_TEXT_FIELDS = ("id", "note_id", "body", "embedding", "created_at", "updated_at")
+_TABLE_FIELDS = ("id", "note_id", "schema_json", "row_count", "created_at", "updated_at")
 
 
 class NoteRepository(BaseRepository):
     """CRUD helpers for :class:`Note`."""
 
-    async def list(self, limit: int = 50) -> List[Note]:
-        """Return the newest notes up to ``limit`` records."""
+    async def list(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        tags: Sequence[str] = (),
+        match_all: bool = True,
+    ) -> Page:
+        """Return a page of notes, newest first, starting after ``cursor``.
+
+        Pages are keyed on ``(created_at, id)`` so each page is a bounded range
+        scan of ``ix_notes_created_at_id`` no matter how deep the client is.
+        With ``tags`` only notes carrying all of them (or any, if
+        ``match_all`` is false) are returned. Each tag is an ``EXISTS`` probe
+        on ``note_tags``, which Postgres answers from either of its indexes.
+        """
+
+        stmt = _listing(
+            select(Note).options(selectinload(Note.text_content)),
+            limit,
+            cursor,
+            tags,
+            match_all,
+        )
+        result = await self.session.execute(stmt)
+        notes = list(result.scalars().unique())
+
+        next_cursor = None
+        if len(notes) > limit:
+            notes = notes[:limit]
+            last = notes[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return Page(notes, next_cursor)
+
+    async def list_rows(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        tags: Sequence[str] = (),
+        match_all: bool = True,
+    ) -> Page:
+        """The page :meth:`list` returns, as plain dicts shaped like ``NoteSchema``.
+
+        Columns are read with one Core ``SELECT`` joined to both content
+        tables, so no ORM entity is built. Routes encode the dicts straight to
+        JSON.
+        """
+
+        text, table = TextContent.__table__.c, TableContent.__table__.c
+        columns = [
+            *(Note.__table__.c[name] for name in _NOTE_FIELDS),
+            *(text[name].label(f"text_{name}") for name in _TEXT_FIELDS),
+            *(table[name].label(f"table_{name}") for name in _TABLE_FIELDS),
+        ]
+        stmt = _listing(
+            select(*columns)
+            .outerjoin(TextContent, TextContent.note_id == Note.id)
+            .outerjoin(TableContent, TableContent.note_id == Note.id),
+            limit,
+            cursor,
+            tags,
+            match_all,
+        )
+        rows = list((await self.session.execute(stmt)).mappings())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        notes = []
+        for row in rows:
+            note = {name: row[name] for name in _NOTE_FIELDS}
+            note["text_content"] = (
+                {name: row[f"text_{name}"] for name in _TEXT_FIELDS}
+                if row["text_id"] is not None
+                else None
+            )
+            note["table_content"] = (
+                {name: row[f"table_{name}"] for name in _TABLE_FIELDS}
+                if row["table_id"] is not None
+                else None
+            )
+            notes.append(note)
+        return Page(notes, next_cursor)
+
+    async def search(
+        self, query: str, limit: int = 20, cursor: Optional[str] = None
+    ) -> Page:
+        """Return notes matching ``query`` ordered by relevance.
+
+        Pages are keyed on ``(rank, id)``. Only the rows on the returned page
+        are joined to their bodies for highlighting, so ``ts_headline`` never
+        runs over the whole match set.
+        """
+
+        tsquery = search_query(query)
+        rank = func.ts_rank_cd(Note.search_vector, tsquery)
+        matches = select(Note.id.label("id"), rank.label("rank")).where(
+            Note.search_vector.op("@@")(tsquery)
+        )
+        if cursor is not None:
+            last_rank, last_id = decode_cursor(cursor, float, UUID)
+            matches = matches.where(tuple_(rank, Note.id) < tuple_(last_rank, last_id))
+        matches = (
+            matches.order_by(rank.desc(), Note.id.desc()).limit(limit + 1).subquery()
+        )
 
         stmt = (
-            select(Note)
-            .options(selectinload(Note.text_content))
-            .order_by(Note.created_at.desc())
-            .limit(limit)
+            select(
+                Note.id,
+                Note.title,
+                Note.content_type,
+                Note.archived,
+                Note.created_at,
+                Note.updated_at,
+                matches.c.rank,
+                headline(Note.title, tsquery).label("title_headline"),
+                headline(TextContent.body, tsquery).label("headline"),
+            )
+            .join(matches, matches.c.id == Note.id)
+            .outerjoin(TextContent, TextContent.note_id == Note.id)
+            .order_by(matches.c.rank.desc(), Note.id.desc())
         )
         result = await self.session.execute(stmt)
-        return list(result.scalars().unique())
+        hits = list(result.mappings())
+
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            next_cursor = encode_cursor(hits[-1]["rank"], hits[-1]["id"])
+        return Page(hits, next_cursor)
 
     async def get(self, note_id: UUID) -> Optional[Note]:
         """Return a single note by its identifier."""
@@ -38,10 +206,27 @@ class NoteRepository(BaseRepository):
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_many(self, note_ids: Iterable[UUID]) -> List[Note]:
+        """Return the notes with the given ids (no content is loaded)."""
+
+        ids = list(note_ids)
+        if not ids:
+            return []
+        stmt = (
+            select(Note)
+            .options(raiseload(Note.text_content), raiseload(Note.table_content))
+            .where(Note.id.in_(ids))
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars())
+
     async def create(
         self, title: str, content_type: str | NoteContentType, body: Optional[str] = None
     ) -> Note:
-        """Create a new note and optional text content."""
+        """Create a new note and optional text content.
+
+        ``[[Title]]`` references in ``body`` become ``EXPLICIT`` links.
+        """
 
         if not isinstance(content_type, NoteContentType):
             content_type = NoteContentType(content_type)
@@ -53,11 +238,114 @@ class NoteRepository(BaseRepository):
         if content_type == NoteContentType.MARKDOWN:
             text_content = TextContent(note_id=note.id, body=body or "")
             self.session.add(text_content)
+        changes = await self.link_inserted([note.id], [{"title": title, "body": body}])
 
-        return await self.commit_and_refresh(note)
+        await self.refresh_search_vectors([note.id])
+        note = await self.commit_and_refresh(note)
+        notify_links_changed(*changes)
+        return note
+
+    async def insert_many(self, notes: Sequence[Mapping[str, Any]]) -> List[UUID]:
+        """Insert ``notes`` with multi-row ``INSERT ... RETURNING`` without committing.
+
+        Each mapping carries ``title``, ``content_type`` and optional ``body``.
+        Ids are returned in input order. Wiki links are not touched; callers
+        pass the ids to :meth:`link_inserted` before committing.
+        """
+
+        if not notes:
+            return []
+
+        rows = []
+        for item in notes:
+            content_type = item["content_type"]
+            if not isinstance(content_type, NoteContentType):
+                content_type = NoteContentType(content_type)
+            rows.append({"title": item["title"], "content_type": content_type, "archived": False})
+
+        result = await self.session.execute(
+            insert(Note).returning(Note.id, sort_by_parameter_order=True), rows
+        )
+        ids = list(result.scalars())
+
+        text_rows = [
+            {"note_id": note_id, "body": item.get("body") or ""}
+            for note_id, row, item in zip(ids, rows, notes)
+            if row["content_type"] == NoteContentType.MARKDOWN
+        ]
+        if text_rows:
+            await self.session.execute(insert(TextContent), text_rows)
+
+        await self.refresh_search_vectors(ids)
+        return ids
+
+    async def link_inserted(
+        self, note_ids: Sequence[UUID], notes: Sequence[Mapping[str, Any]]
+    ) -> LinkChanges:
+        """Sync wiki links for notes just inserted, without committing.
+
+        ``[[Title]]`` references in the new bodies become ``EXPLICIT`` links,
+        and notes that were waiting for one of the new titles are linked to
+        it. Returns ``(added, removed)`` for :func:`notify_links_changed`.
+        """
+
+        links = LinkRepository(self.session)
+        bodies = {
+            note_id: item.get("body")
+            for note_id, item in zip(note_ids, notes)
+            if extract_wiki_links(item.get("body"))
+        }
+        added, removed = await links.sync_wiki_links_many(bodies)
+        resolved = await links.resolve_pending_wiki_links(item["title"] for item in notes)
+        return added + resolved[0], removed + resolved[1]
+
+    async def create_many(
+        self, notes: Sequence[Mapping[str, Any]]
+    ) -> List[Union[UUID, str]]:
+        """Create ``notes`` in one transaction, isolating rows the database rejects.
+
+        The whole batch is attempted inside a savepoint; if it fails it is split
+        in half and retried, so a single bad row costs ``O(log n)`` extra
+        statements and every other row is still created. The result holds, per
+        input position, either the new note id or the database error message.
+        """
+
+        results: List[Union[UUID, str]] = [""] * len(notes)
+
+        async def attempt(offset: int, items: Sequence[Mapping[str, Any]]) -> None:
+            try:
+                async with self.session.begin_nested():
+                    ids = await self.insert_many(items)
+            except DBAPIError as exc:
+                if len(items) == 1:
+                    results[offset] = str(exc.orig) if exc.orig is not None else str(exc)
+                    return
+                middle = len(items) // 2
+                await attempt(offset, items[:middle])
+                await attempt(offset + middle, items[middle:])
+                return
+            results[offset : offset + len(ids)] = ids
+
+        if notes:
+            await attempt(0, notes)
+        created = [
+            (result, item) for result, item in zip(results, notes) if isinstance(result, UUID)
+        ]
+        changes = await self.link_inserted(
+            [note_id for note_id, _ in created], [item for _, item in created]
+        )
+        await self.session.commit()
+        notify_links_changed(*changes)
+        return results
 
     async def update(self, note_id: UUID, **fields: object) -> Optional[Note]:
-        """Update the provided fields on a note."""
+        """Update the provided fields on a note.
+
+        ``None`` leaves a field unchanged. A new ``body`` re-syncs the note's
+        ``EXPLICIT`` links with its ``[[Title]]`` references; only links that
+        were added or removed are written. A new ``title`` re-resolves the
+        references to the old title and links notes waiting for the new one.
+        """
 
         note = await self.get(note_id)
         if note is None:
@@ -70,34 +358,87 @@ class NoteRepository(BaseRepository):
             note.content_type = content_type
 
         title = fields.pop("title", None)
+        body = fields.pop("body", None)
+        reindex = title is not None or body is not None
+        referrers: Dict[UUID, str] = {}
         if title is not None:
+            if wiki_link_key(str(title)) != wiki_link_key(note.title):
+                referrers = await LinkRepository(self.session).wiki_referrers(note.id)
             note.title = str(title)
 
         archived = fields.pop("archived", None)
         if archived is not None:
             note.archived = bool(archived)
 
-        if "body" in fields:
-            body = fields.pop("body")
-            if body is not None:
-                text = note.text_content
-                if text is None:
-                    text = TextContent(note_id=note.id, body=str(body))
-                    self.session.add(text)
-                else:
-                    text.body = str(body)
-            elif note.text_content is not None:
-                note.text_content.body = ""
+        changes: LinkChanges = ([], [])
+        if body is not None:
+            new_body = str(body)
+            previous = note.text_content.body if note.text_content is not None else None
+            if extract_wiki_links(new_body) or extract_wiki_links(previous):
+                links = LinkRepository(self.session)
+                changes = await links.sync_wiki_links(note.id, new_body)
+            text = note.text_content
+            if text is None:
+                text = TextContent(note_id=note.id, body=new_body)
+                self.session.add(text)
+            else:
+                text.body = new_body
+                text.embedding_dirty = True
+        if title is not None:
+            links = LinkRepository(self.session)
+            for found in (
+                await links.sync_wiki_links_many(referrers),
+                await links.resolve_pending_wiki_links([note.title]),
+            ):
+                changes = (changes[0] + found[0], changes[1] + found[1])
+
+        if reindex:
+            await self.refresh_search_vectors([note.id])
+        note = await self.commit_and_refresh(note)
+        notify_links_changed(*changes)
+        return note
+
+    async def refresh_search_vectors(self, note_ids: Iterable[UUID]) -> None:
+        """Recompute ``search_vector`` for ``note_ids`` without committing.
 
-        return await self.commit_and_refresh(note)
+        Pending title/body changes are autoflushed first, so the vector always
+        reflects what the surrounding transaction is about to commit.
+        """
+
+        ids = list(note_ids)
+        if not ids:
+            return
+
+        id_array = bindparam("note_ids", ids, type_=ARRAY(PGUUID(as_uuid=True)))
+        body = (
+            select(TextContent.body)
+            .where(TextContent.note_id == Note.id)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(Note)
+            .where(Note.id == any_(id_array))
+            .values(search_vector=search_document(Note.title, body))
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
 
     async def delete(self, note_id: UUID) -> bool:
-        """Delete a note by id. Returns ``True`` if it existed."""
+        """Delete a note by id. Returns ``True`` if it existed.
+
+        ``[[Title]]`` references that linked to the note are resolved again,
+        so they wait in ``pending_wiki_links`` unless another note matches.
+        """
 
         note = await self.get(note_id)
         if note is None:
             return False
 
+        links = LinkRepository(self.session)
+        referrers = await links.wiki_referrers(note_id)
         await self.session.delete(note)
+        await self.session.flush()
+        changes = await links.sync_wiki_links_many(referrers)
         await self.session.commit()
+        notify_links_changed(*changes)
         return True
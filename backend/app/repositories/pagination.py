@@ -0,0 +1,61 @@
+"""Opaque cursor helpers for keyset pagination."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class Page(NamedTuple):
+    """A single page of results plus the cursor for the following page."""
+
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the keyset position ``values`` as an opaque URL-safe token."""
+
+    raw = json.dumps([_dump(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> Tuple[Any, ...]:
+    """Decode a token produced by :func:`encode_cursor`.
+
+    ``types`` converts each position back into its Python value, e.g.
+    ``decode_cursor(token, datetime.fromisoformat, UUID)``.
+    """
+
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise InvalidCursorError("Malformed cursor") from exc
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursorError("Malformed cursor")
+
+    try:
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursorError("Malformed cursor") from exc
+
+
+__all__ = ["InvalidCursorError", "Page", "decode_cursor", "encode_cursor"]
@@ -0,0 +1,60 @@
+"""Repository helpers for :class:`~app.db.models.TableRow`."""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+
+from ..db.models import TableRow
+from .base import BaseRepository
+from .pagination import Page, decode_cursor, encode_cursor
+
+
+class TableRowRepository(BaseRepository):
+    """Paginated reads over the rows of a table note."""
+
+    async def page(
+        self,
+        note_id: UUID,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Page:
+        """Return rows of ``note_id`` in insertion order, starting after ``cursor``.
+
+        Pages are keyed on ``position``, so each page is a bounded range scan of
+        ``ix_table_rows_table_note_id_position`` no matter how deep the client
+        is. With ``columns`` only those keys are read out of ``row_data``
+        (``row_data -> 'key'``) instead of shipping whole rows.
+        """
+
+        if columns is None:
+            values = [TableRow.row_data]
+        else:
+            values = [TableRow.row_data[name].label(f"c{i}") for i, name in enumerate(columns)]
+        stmt = (
+            select(TableRow.id, TableRow.position, *values)
+            .where(TableRow.table_note_id == note_id)
+            .order_by(TableRow.position.asc())
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            (position,) = decode_cursor(cursor, int)
+            stmt = stmt.where(TableRow.position > position)
+
+        rows = (await self.session.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].position)
+
+        if columns is None:
+            items = [{"id": row[0], "data": row[2]} for row in rows]
+        else:
+            items = [{"id": row[0], "data": dict(zip(columns, row[2:]))} for row in rows]
+        return Page(items, next_cursor)
+
+
+__all__ = ["TableRowRepository"]
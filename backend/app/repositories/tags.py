@@ -1,37 +1,291 @@
-"""Repository helpers for :class:`~app.db.models.Tag`."""
+"""Repository helpers for :class:`~app.db.models.Tag`.
+
+Tag names are resolved to ids through :data:`tag_id_cache`, a bounded
+in-process LRU warmed at startup. Names it does not know are resolved or
+created together in one statement::
+
+    WITH inserted AS (
+        INSERT INTO tags (id, name) SELECT * FROM unnest(:ids, :names)
+        ON CONFLICT (name) DO NOTHING RETURNING id, name, ...
+    )
+    SELECT ... FROM inserted UNION ALL SELECT ... FROM tags WHERE name IN (...)
+
+A tag's id never changes, so a name cached by one worker is valid in every
+other worker. The only way an entry goes stale is a tag row being deleted
+(or a transaction that created it being rolled back). Writes that use cached
+ids run inside a savepoint; a foreign-key violation drops those entries and
+the write is retried once with ids read from the database.
+"""
 
 from __future__ import annotations
 
-from typing import List
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import String, any_, bindparam, delete, func, select, true, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID, insert as pg_insert
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
 
-from ..db.models import Tag
+from ..db.models import Note, NoteTag, Tag
 from .base import BaseRepository
 
+TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", "50000"))
+
+# Keys of TagSchema, in order.
+_TAG_FIELDS = ("id", "name", "created_at", "updated_at")
+
+
+class TagIdCache:
+    """Bounded LRU mapping tag names to ids."""
+
+    def __init__(self, max_entries: int = TAG_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[str, UUID]" = OrderedDict()
+        self.hits = self.misses = 0
+
+    def lookup(self, names: Iterable[str]) -> Tuple[Dict[str, UUID], List[str]]:
+        """Split ``names`` into cached ``{name: id}`` and the names still missing."""
+
+        found: Dict[str, UUID] = {}
+        missing: List[str] = []
+        for name in names:
+            tag_id = self._ids.get(name)
+            if tag_id is None:
+                missing.append(name)
+            else:
+                self._ids.move_to_end(name)
+                found[name] = tag_id
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def store(self, ids: Dict[str, UUID]) -> None:
+        if self.max_entries <= 0:
+            return
+        for name, tag_id in ids.items():
+            self._ids[name] = tag_id
+            self._ids.move_to_end(name)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def discard(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._ids.pop(name, None)
+
+    def clear(self) -> None:
+        self._ids.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._ids),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+tag_id_cache = TagIdCache()
+
+
+def _uuid_array(values: Iterable[UUID], key: str = "note_ids") -> object:
+    return bindparam(key, list(values), type_=ARRAY(PGUUID(as_uuid=True)))
+
+
+def _upsert(names: Sequence[str]) -> Executable:
+    """One statement returning the ``tags`` rows for ``names``, creating missing ones."""
+
+    wanted = func.unnest(
+        _uuid_array([uuid.uuid4() for _ in names], "tag_ids"),
+        bindparam("tag_names", list(names), type_=ARRAY(String)),
+    ).table_valued("id", "name").render_derived()
+    columns = Tag.__table__.c
+    inserted = (
+        pg_insert(Tag.__table__)
+        .from_select(["id", "name"], select(wanted.c.id, wanted.c.name))
+        .on_conflict_do_nothing(index_elements=["name"])
+        .returning(*columns)
+        .cte("inserted")
+    )
+    # Both branches read the statement's snapshot, so a row is never returned twice.
+    return union_all(
+        select(*inserted.c),
+        select(*columns).where(Tag.name.in_(list(names))),
+    )
+
 
 class TagRepository(BaseRepository):
-    """Simple CRUD helpers for :class:`Tag`."""
+    """Tag lookup, creation and note assignment."""
+
+    def __init__(self, session: AsyncSession, cache: Optional[TagIdCache] = None) -> None:
+        super().__init__(session)
+        self.cache = tag_id_cache if cache is None else cache
 
     async def get_or_create(self, name: str) -> Tag:
-        stmt = select(Tag).where(Tag.name == name)
-        result = await self.session.execute(stmt)
-        tag = result.scalar_one_or_none()
-        if tag is not None:
-            return tag
-
-        tag = Tag(name=name)
-        self.session.add(tag)
-        try:
-            return await self.commit_and_refresh(tag)
-        except IntegrityError:
-            await self.session.rollback()
-            result = await self.session.execute(stmt)
-            existing = result.scalar_one()
-            return existing
+        """Return the tag called ``name``, creating it if needed, in one query."""
+
+        stmt = select(Tag).from_statement(_upsert([name]))
+        tag = (await self.session.execute(stmt)).scalars().first()
+        if tag is None:
+            # A concurrent transaction committed the same name after our snapshot.
+            result = await self.session.execute(select(Tag).where(Tag.name == name))
+            tag = result.scalar_one()
+        await self.session.commit()
+        self.cache.store({tag.name: tag.id})
+        return tag
+
+    async def get_or_create_many(self, names: Iterable[str]) -> Dict[str, UUID]:
+        """Resolve ``names`` to ids, creating missing tags.
+
+        Cached names cost nothing; the rest are resolved together in a single
+        query. Runs in the caller's transaction without committing.
+        """
+
+        ids, _ = await self._resolve(names)
+        return ids
+
+    async def _resolve(
+        self, names: Iterable[str], use_cache: bool = True
+    ) -> Tuple[Dict[str, UUID], bool]:
+        unique = sorted(set(names))
+        if use_cache:
+            ids, missing = self.cache.lookup(unique)
+        else:
+            ids, missing = {}, unique
+        from_cache = bool(ids)
+        if missing:
+            fresh = await self._fetch(missing)
+            leftover = [name for name in missing if name not in fresh]
+            if leftover:
+                # Committed concurrently after our snapshot; they are visible now.
+                fresh.update(await self._fetch(leftover))
+            self.cache.store(fresh)
+            ids.update(fresh)
+        return ids, from_cache
+
+    async def _fetch(self, names: Sequence[str]) -> Dict[str, UUID]:
+        rows = await self.session.execute(_upsert(names))
+        return {row.name: row.id for row in rows}
+
+    async def warm_cache(self) -> int:
+        """Load the most recently created tags into the cache; returns how many."""
+
+        stmt = select(Tag.id, Tag.name).order_by(Tag.created_at.desc()).limit(
+            self.cache.max_entries
+        )
+        rows = (await self.session.execute(stmt)).all()
+        self.cache.store({name: tag_id for tag_id, name in reversed(rows)})
+        return len(rows)
 
     async def list_all(self) -> List[Tag]:
         stmt = select(Tag).order_by(Tag.name.asc())
         result = await self.session.execute(stmt)
         return list(result.scalars().unique())
+
+    async def list_rows(self) -> List[Dict[str, Any]]:
+        """The tags :meth:`list_all` returns, as plain dicts shaped like ``TagSchema``."""
+
+        columns = Tag.__table__.c
+        stmt = select(*(columns[name] for name in _TAG_FIELDS)).order_by(columns.name.asc())
+        result = await self.session.execute(stmt)
+        return [dict(zip(_TAG_FIELDS, row)) for row in result]
+
+    async def _write_with_tags(
+        self, names: Sequence[str], build: Callable[[Dict[str, UUID]], Executable]
+    ) -> int:
+        """Run ``build(ids)`` for the tags ``names``, retrying once on stale cached ids."""
+
+        ids, from_cache = await self._resolve(names)
+        if from_cache:
+            try:
+                async with self.session.begin_nested():
+                    return len((await self.session.execute(build(ids))).all())
+            except IntegrityError:
+                self.cache.discard(names)
+                ids, _ = await self._resolve(names, use_cache=False)
+        return len((await self.session.execute(build(ids))).all())
+
+    async def add_to_notes(self, pairs: Sequence[Tuple[UUID, str]]) -> int:
+        """Insert ``(note_id, tag_name)`` pairs, creating missing tags.
+
+        The notes must exist. Runs in the caller's transaction without
+        committing and returns the number of new assignments.
+        """
+
+        if not pairs:
+            return 0
+
+        def build(ids: Dict[str, UUID]) -> Executable:
+            rows = func.unnest(
+                _uuid_array([note_id for note_id, _ in pairs]),
+                _uuid_array([ids[name] for _, name in pairs], "tag_ids"),
+            ).table_valued("note_id", "tag_id").render_derived()
+            return (
+                pg_insert(NoteTag.__table__)
+                .from_select(["note_id", "tag_id"], select(rows.c.note_id, rows.c.tag_id))
+                .on_conflict_do_nothing()
+                .returning(NoteTag.note_id)
+            )
+
+        return await self._write_with_tags([name for _, name in pairs], build)
+
+    async def attach(self, note_ids: Sequence[UUID], names: Sequence[str]) -> int:
+        """Tag every note in ``note_ids`` with every tag in ``names``.
+
+        Missing tags are created. All pairs go in as one
+        ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``; ids that are not notes
+        are skipped. Returns the number of new assignments.
+        """
+
+        names = sorted(set(names))
+        if not note_ids or not names:
+            return 0
+
+        def build(ids: Dict[str, UUID]) -> Executable:
+            tags = (
+                func.unnest(_uuid_array(ids.values(), "tag_ids"))
+                .table_valued("tag_id")
+                .render_derived()
+            )
+            return (
+                pg_insert(NoteTag.__table__)
+                .from_select(
+                    ["note_id", "tag_id"],
+                    select(Note.id, tags.c.tag_id)
+                    .join(tags, true())
+                    .where(Note.id == any_(_uuid_array(note_ids))),
+                )
+                .on_conflict_do_nothing()
+                .returning(NoteTag.note_id)
+            )
+
+        attached = await self._write_with_tags(names, build)
+        await self.session.commit()
+        return attached
+
+    async def detach(self, note_ids: Sequence[UUID], names: Sequence[str]) -> int:
+        """Remove the tags ``names`` from the notes ``note_ids`` in one statement.
+
+        Returns the number of assignments removed.
+        """
+
+        if not note_ids or not names:
+            return 0
+        stmt = (
+            delete(NoteTag)
+            .where(
+                NoteTag.note_id == any_(_uuid_array(note_ids)),
+                NoteTag.tag_id.in_(select(Tag.id).where(Tag.name.in_(sorted(set(names))))),
+            )
+            .returning(NoteTag.note_id)
+        )
+        detached = len((await self.session.execute(stmt)).all())
+        await self.session.commit()
+        return detached
+
+
+__all__ = ["TAG_CACHE_SIZE", "TagIdCache", "TagRepository", "tag_id_cache"]
@@ -1,5 +1,5 @@
 """Service layer exports."""
 
-from .ai.organize import organize_draft
+from .ai.organize import organize_draft, organize_drafts
 
-__all__ = ["organize_draft"]
+__all__ = ["organize_draft", "organize_drafts"]
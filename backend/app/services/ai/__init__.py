@@ -1,5 +1,6 @@
 """AI service utilities."""
 
-from .organize import organize_draft
+from .links import LinkInferenceJob
+from .organize import organize_draft, organize_drafts
 
-__all__ = ["organize_draft"]
+__all__ = ["LinkInferenceJob", "organize_draft", "organize_drafts"]
@@ -0,0 +1,55 @@
+"""Command line entrypoint: ``python -m backend.app.services.ai`` (inferred links)."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+
+from ...db.session import SessionLocal, with_engine
+from ..similarity import NoteSimilarityIndex
+from ..similarity.store import INDEX_DIR
+from .links import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_K,
+    DEFAULT_MIN_SCORE,
+    LinkInferenceJob,
+    summarize,
+)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    job = LinkInferenceJob(
+        SessionLocal,
+        # The API process owns INDEX_DIR; this process keeps its own copy.
+        index=NoteSimilarityIndex(path=args.index_dir),
+        k=args.k,
+        min_score=args.min_score,
+        batch_size=args.batch_size,
+    )
+    if args.watch:
+        await job.run_forever(interval=args.interval)
+    else:
+        reports = await job.run_once()
+        await job.index.compact()
+        print(summarize(reports))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Link semantically close notes with AI_INFERRED links."
+    )
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="links per note at most")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--index-dir", default=f"{INDEX_DIR}-links")
+    parser.add_argument("--watch", action="store_true", help="keep polling for changed notes")
+    parser.add_argument("--interval", type=float, default=60.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-5.5s [%(name)s] %(message)s")
+    asyncio.run(with_engine(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Batch job that links semantically close notes with ``AI_INFERRED`` links.
+
+The embedding worker sets ``notes.links_dirty`` whenever it writes a new
+vector for a note. This job claims dirty notes in keyset-ordered batches
+(``FOR UPDATE SKIP LOCKED``). It searches the neighbours of the whole batch
+with one :meth:`~app.services.similarity.IVFIndex.search_many` call. Each
+note's outgoing inferred links are then replaced with
+:meth:`LinkRepository.sync_links`, so only new and removed edges are written.
+
+The first run covers every note, because the flag defaults to true. After
+that, a pass costs O(changed notes x probed lists), not O(corpus^2).
+Inferred links are outgoing only. A note's neighbours do not get links back
+to it until they change themselves.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ...db.models import Note, NoteLink, NoteLinkType, TextContent
+from ...repositories.links import LinkRepository, NewLink, notify_links_changed
+from ..similarity import NoteSimilarityIndex, note_index
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_K = 5
+DEFAULT_MIN_SCORE = 0.75
+EXCERPT_CHARS = 200
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class InferenceReport(NamedTuple):
+    """Outcome of one link inference batch."""
+
+    notes: int
+    searched: int
+    added: int
+    removed: int
+    seconds: float
+
+
+def _excerpt(title: str, body: Optional[str], score: float) -> str:
+    text = _WHITESPACE.sub(" ", body or "").strip()
+    if len(text) > EXCERPT_CHARS:
+        text = text[: EXCERPT_CHARS - 3].rstrip() + "..."
+    return f'{score:.2f} similar to "{title}"' + (f": {text}" if text else "")
+
+
+class LinkInferenceJob:
+    """Propose ``AI_INFERRED`` links for notes whose embedding changed."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        index: Optional[NoteSimilarityIndex] = None,
+        k: int = DEFAULT_K,
+        min_score: float = DEFAULT_MIN_SCORE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.session_factory = session_factory
+        self.index = note_index if index is None else index
+        self.k = k
+        self.min_score = min_score
+        self.batch_size = batch_size
+
+    async def run_once(self) -> List[InferenceReport]:
+        """Process every dirty note once and return one report per batch."""
+
+        if not self.index.ready:
+            async with self.session_factory() as session:
+                await self.index.load(session)
+
+        reports: List[InferenceReport] = []
+        last_id: Optional[UUID] = None
+        while True:
+            report, last_id = await self._run_batch(last_id)
+            if report is None:
+                break
+            reports.append(report)
+            logger.info(
+                "inferred links for %d notes (%d with vectors): +%d -%d in %.2fs",
+                report.notes,
+                report.searched,
+                report.added,
+                report.removed,
+                report.seconds,
+            )
+        return reports
+
+    async def run_forever(self, interval: float = 60.0) -> None:
+        """Run a pass every ``interval`` seconds until cancelled."""
+
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Link inference pass failed")
+            await asyncio.sleep(interval)
+
+    async def _run_batch(
+        self, after: Optional[UUID]
+    ) -> Tuple[Optional[InferenceReport], Optional[UUID]]:
+        started = time.perf_counter()
+
+        async with self.session_factory() as session:
+            stmt = (
+                select(Note.id)
+                .where(Note.links_dirty.is_(True))
+                .order_by(Note.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            if after is not None:
+                stmt = stmt.where(Note.id > after)
+            note_ids = list((await session.execute(stmt)).scalars())
+            if not note_ids:
+                return None, after
+
+            # Re-read the claimed vectors so the index matches the rows we locked.
+            await self.index.refresh(session, note_ids)
+            sources, vectors = [], []
+            for note_id in note_ids:
+                vector = self.index.vector(note_id)
+                if vector is not None:
+                    sources.append(note_id)
+                    vectors.append(vector)
+
+            proposals: Dict[UUID, List[Tuple[UUID, float]]] = {}
+            if sources:
+                hits = await asyncio.to_thread(
+                    self.index.search_many, np.stack(vectors), self.k, sources
+                )
+                for source_id, found in zip(sources, hits):
+                    proposals[source_id] = [hit for hit in found if hit[1] >= self.min_score]
+
+            links = await self._links(session, proposals)
+            repo = LinkRepository(session)
+            added, removed = await repo.sync_links(note_ids, NoteLinkType.AI_INFERRED, links)
+            await session.execute(
+                update(Note)
+                .where(Note.id.in_(note_ids))
+                .values(links_dirty=False, updated_at=Note.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        notify_links_changed(added, removed)
+
+        report = InferenceReport(
+            notes=len(note_ids),
+            searched=len(sources),
+            added=len(added),
+            removed=len(removed),
+            seconds=time.perf_counter() - started,
+        )
+        return report, note_ids[-1]
+
+    async def _links(
+        self, session: AsyncSession, proposals: Dict[UUID, List[Tuple[UUID, float]]]
+    ) -> List[NewLink]:
+        """Turn neighbour proposals into links with excerpts of their targets.
+
+        Targets deleted since the index last saw them are dropped, as are
+        pairs already joined by an explicit link.
+        """
+
+        targets: Set[UUID] = {target for found in proposals.values() for target, _ in found}
+        if not targets:
+            return []
+        rows = await session.execute(
+            select(Note.id, Note.title, func.left(TextContent.body, EXCERPT_CHARS * 2))
+            .outerjoin(TextContent, TextContent.note_id == Note.id)
+            .where(Note.id.in_(targets))
+        )
+        previews = {note_id: (title, body) for note_id, title, body in rows}
+        linked = await session.execute(
+            select(NoteLink.source_id, NoteLink.target_id).where(
+                NoteLink.source_id.in_(list(proposals)),
+                NoteLink.link_type == NoteLinkType.EXPLICIT,
+            )
+        )
+        explicit = {(source_id, target_id) for source_id, target_id in linked}
+
+        links: List[NewLink] = []
+        for source_id, found in proposals.items():
+            for target_id, score in found:
+                preview = previews.get(target_id)
+                if preview is None or (source_id, target_id) in explicit:
+                    continue
+                excerpt = _excerpt(preview[0], preview[1], score)
+                links.append(NewLink(source_id, target_id, NoteLinkType.AI_INFERRED, excerpt))
+        return links
+
+
+def summarize(reports: Sequence[InferenceReport]) -> str:
+    """One-line summary over several batch reports."""
+
+    notes = sum(report.notes for report in reports)
+    added = sum(report.added for report in reports)
+    removed = sum(report.removed for report in reports)
+    seconds = sum(report.seconds for report in reports)
+    return f"{notes} notes in {len(reports)} batches: +{added} -{removed} links ({seconds:.1f}s)"
+
+
+__all__ = [
+    "DEFAULT_BATCH_SIZE",
+    "DEFAULT_K",
+    "DEFAULT_MIN_SCORE",
+    "InferenceReport",
+    "LinkInferenceJob",
+    "summarize",
+]
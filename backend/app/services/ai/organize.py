@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
-from typing import Callable
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
 from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...db.models import NoteContentType, NoteSchema
+from ...db.models import Draft, NoteContentType, NoteSchema
 from ...repositories import DraftRepository, NoteRepository
+from ...repositories.links import notify_links_changed
+from ..cache import note_cache
+
+DEFAULT_CHUNK_SIZE = 500
 
 
 def _note_to_schema(note) -> NoteSchema:
@@ -23,23 +27,108 @@ def _note_to_schema(note) -> NoteSchema:
     raise TypeError("NoteSchema cannot be constructed from ORM object")
 
 
+def _note_fields(draft: Draft) -> Dict[str, Any]:
+    return {
+        "title": draft.title or "Untitled Draft",
+        "content_type": NoteContentType.MARKDOWN,
+        "body": draft.body or "",
+    }
+
+
 async def organize_draft(session: AsyncSession, draft_id: UUID) -> NoteSchema:
-    """Convert a draft into a persisted note and delete the draft."""
+    """Convert a draft into a persisted note and delete the draft.
+
+    The note insert and the draft delete commit together, so a failure can
+    never leave both (or neither) behind.
+    """
 
     draft_repo = DraftRepository(session)
-    draft = await draft_repo.get(draft_id)
-    if draft is None:
+    drafts = await draft_repo.claim_chunk(limit=1, draft_ids=[draft_id])
+    if not drafts:
         raise ValueError("Draft not found")
 
-    title = draft.title or "Untitled Draft"
-    body = draft.body or ""
-
     note_repo = NoteRepository(session)
-    note = await note_repo.create(
-        title=title,
-        content_type=NoteContentType.MARKDOWN,
-        body=body,
-    )
+    fields = [_note_fields(drafts[0])]
+    (note_id,) = await note_repo.insert_many(fields)
+    changes = await note_repo.link_inserted([note_id], fields)
+    await draft_repo.delete_many([draft_id])
+    await session.commit()
+    notify_links_changed(*changes)
+    note_cache.invalidate(note_id)
 
-    await draft_repo.delete(draft_id)
+    note = await note_repo.get(note_id)
     return _note_to_schema(note)
+
+
+async def organize_drafts(
+    session: AsyncSession,
+    draft_ids: Optional[Sequence[UUID]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Organize ``draft_ids`` (or every draft when ``None``) chunk by chunk.
+
+    Each chunk locks its drafts, bulk-inserts the notes, bulk-deletes the
+    drafts and commits as one transaction. A progress record is yielded after
+    every chunk and a summary record at the end.
+    """
+
+    draft_repo = DraftRepository(session)
+    note_repo = NoteRepository(session)
+    organized = 0
+    missing: List[UUID] = []
+
+    if draft_ids is not None:
+        requested = list(dict.fromkeys(draft_ids))
+        chunks = (
+            requested[start : start + chunk_size]
+            for start in range(0, len(requested), chunk_size)
+        )
+    else:
+        chunks = None
+
+    chunk_index = 0
+    after: Optional[UUID] = None
+    while True:
+        if chunks is not None:
+            wanted = next(chunks, None)
+            if wanted is None:
+                break
+            drafts = await draft_repo.claim_chunk(limit=len(wanted), draft_ids=wanted)
+            found = {draft.id for draft in drafts}
+            chunk_missing = [draft_id for draft_id in wanted if draft_id not in found]
+        else:
+            drafts = await draft_repo.claim_chunk(limit=chunk_size, after=after)
+            if not drafts:
+                break
+            after = drafts[-1].id
+            chunk_missing = []
+
+        try:
+            fields = [_note_fields(draft) for draft in drafts]
+            note_ids = await note_repo.insert_many(fields)
+            changes = await note_repo.link_inserted(note_ids, fields)
+            await draft_repo.delete_many(draft.id for draft in drafts)
+            await session.commit()
+        except Exception as exc:
+            await session.rollback()
+            yield {"chunk": chunk_index, "error": str(exc), "organized": organized}
+            return
+
+        notify_links_changed(*changes)
+
+        for note_id in note_ids:
+            note_cache.invalidate(note_id)
+        organized += len(note_ids)
+        missing.extend(chunk_missing)
+        yield {
+            "chunk": chunk_index,
+            "organized": organized,
+            "notes": [
+                {"draft_id": draft.id, "note_id": note_id}
+                for draft, note_id in zip(drafts, note_ids)
+            ],
+            "missing": chunk_missing,
+        }
+        chunk_index += 1
+
+    yield {"done": True, "organized": organized, "missing": missing}
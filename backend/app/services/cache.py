@@ -0,0 +1,177 @@
+"""Bounded in-process cache of serialized note payloads."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+from uuid import UUID
+
+
+class CachedNote(NamedTuple):
+    updated_at: datetime
+    etag: str
+    payload: bytes
+    expires_at: float
+
+
+def strong_etag(payload: bytes) -> str:
+    """Return a quoted strong ETag derived from the payload bytes."""
+
+    return '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Evaluate an ``If-None-Match`` header against ``etag`` (weak comparison)."""
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class NoteCache:
+    """LRU cache bounded by entry count, total payload bytes and a TTL.
+
+    Entries are keyed by note id and remember the ``updated_at`` they were
+    serialized from; :meth:`put` never replaces a newer entry with an older
+    one. Each process has its own cache, so the TTL bounds how long another
+    worker's write can go unseen.
+
+    A reader takes :meth:`version` before loading a note and passes it to
+    :meth:`put`. If the note was invalidated in between, the payload may be
+    stale and is not cached. Invalidations are remembered for the last
+    ``max_entries`` ids. Past that, any version older than the forgotten
+    invalidations is refused.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 300.0,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[UUID, CachedNote]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._invalidated: "OrderedDict[UUID, int]" = OrderedDict()
+        self._forgotten = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, note_id: UUID) -> Optional[CachedNote]:
+        with self._lock:
+            entry = self._entries.get(note_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._drop(note_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(note_id)
+            self.hits += 1
+            return entry
+
+    def version(self) -> int:
+        """Token to pass to :meth:`put` for a note loaded after this call."""
+
+        return self._generation
+
+    def put(
+        self,
+        note_id: UUID,
+        updated_at: datetime,
+        payload: bytes,
+        version: Optional[int] = None,
+    ) -> CachedNote:
+        entry = CachedNote(
+            updated_at=updated_at,
+            etag=strong_etag(payload),
+            payload=payload,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        if len(payload) > self.max_bytes:
+            return entry
+
+        with self._lock:
+            if version is not None:
+                invalidated = self._invalidated.get(note_id, 0)
+                if max(invalidated, self._forgotten) > version:
+                    return entry
+            current = self._entries.get(note_id)
+            if current is not None:
+                if current.updated_at > updated_at:
+                    return current
+                self._drop(note_id)
+            self._entries[note_id] = entry
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, note_id: UUID) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidated[note_id] = self._generation
+            self._invalidated.move_to_end(note_id)
+            while len(self._invalidated) > max(self.max_entries, 1):
+                _, generation = self._invalidated.popitem(last=False)
+                self._forgotten = max(self._forgotten, generation)
+            if note_id in self._entries:
+                self._drop(note_id)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, note_id: UUID) -> None:
+        entry = self._entries.pop(note_id)
+        self._bytes -= len(entry.payload)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+note_cache = NoteCache(
+    max_entries=int(os.getenv("NOTE_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("NOTE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("NOTE_CACHE_TTL_SECONDS", "300")),
+)
+
+__all__ = ["CachedNote", "NoteCache", "etag_matches", "note_cache", "strong_etag"]
@@ -0,0 +1,12 @@
+"""Batched background embedding of note content."""
+
+from .embedders import Embedder, HashingEmbedder, load_embedder
+from .worker import BatchReport, EmbeddingWorker
+
+__all__ = [
+    "BatchReport",
+    "Embedder",
+    "EmbeddingWorker",
+    "HashingEmbedder",
+    "load_embedder",
+]
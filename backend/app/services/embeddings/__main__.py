@@ -0,0 +1,38 @@
+"""Command line entrypoint: ``python -m backend.app.services.embeddings``."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+
+from ...db.session import SessionLocal, with_engine
+from .embedders import load_embedder
+from .worker import DEFAULT_BATCH_SIZE, EmbeddingWorker, summarize
+
+
+async def _main(args: argparse.Namespace) -> None:
+    worker = EmbeddingWorker(
+        SessionLocal, embedder=load_embedder(args.embedder), batch_size=args.batch_size
+    )
+    if args.watch:
+        await worker.run_forever(interval=args.interval)
+    else:
+        reports = await worker.run_once()
+        print(summarize(reports))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embed dirty note content in batches.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--embedder", default=None, help="'module:factory' (default: hashing)")
+    parser.add_argument("--watch", action="store_true", help="keep polling for dirty rows")
+    parser.add_argument("--interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-5.5s [%(name)s] %(message)s")
+    asyncio.run(with_engine(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
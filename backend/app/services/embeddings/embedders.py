@@ -0,0 +1,82 @@
+"""Pluggable text embedders used by the background embedding worker."""
+
+from __future__ import annotations
+
+import importlib
+import os
+import re
+import zlib
+from typing import List, Protocol, Sequence
+
+import numpy as np
+
+from ..similarity.ivf import normalize
+
+_TOKEN_RE = re.compile(r"[\w']+", re.UNICODE)
+
+
+class Embedder(Protocol):
+    """Anything that maps a batch of texts to a ``(len(texts), dim)`` matrix."""
+
+    name: str
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder:
+    """Offline embedder based on signed feature hashing of unigrams and bigrams.
+
+    Each token is hashed with CRC32 (stable across processes, unlike ``hash``)
+    into ``dim`` buckets with a sign bit to cancel collisions on average. Term
+    counts are damped with ``log1p`` and rows are L2-normalised, so the cosine
+    similarity approximates TF-weighted term overlap.
+    """
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[int]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(gram.encode("utf-8")) for gram in grams]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        hashes = [np.asarray(self._features(text), dtype=np.uint32) for text in texts]
+        all_hashes = np.concatenate(hashes)
+        all_rows = np.repeat(np.arange(len(texts), dtype=np.int64), [len(h) for h in hashes])
+        buckets = (all_hashes % self.dim).astype(np.int64)
+        signs = np.where(all_hashes & 0x80000000, -1.0, 1.0)
+
+        counts = np.bincount(
+            all_rows * self.dim + buckets,
+            weights=signs,
+            minlength=len(texts) * self.dim,
+        ).reshape(len(texts), self.dim)
+        return normalize(np.sign(counts) * np.log1p(np.abs(counts)))
+
+
+def load_embedder(spec: str | None = None) -> Embedder:
+    """Return the embedder named by ``spec`` (or ``$EMBEDDER``).
+
+    ``spec`` is either empty for the default :class:`HashingEmbedder` or a
+    ``"package.module:factory"`` path whose factory takes no arguments.
+    """
+
+    spec = spec if spec is not None else os.getenv("EMBEDDER", "")
+    if not spec:
+        return HashingEmbedder(dim=int(os.getenv("EMBEDDING_DIM", "256")))
+
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Embedder spec {spec!r} must look like 'module:factory'")
+    factory = getattr(importlib.import_module(module_name), attr)
+    return factory()
+
+
+__all__ = ["Embedder", "HashingEmbedder", "load_embedder"]
@@ -0,0 +1,230 @@
+"""Background worker that fills ``embedding`` for dirty text contents and table rows.
+
+Writers only flip ``embedding_dirty``; this worker picks dirty rows up in
+keyset-ordered batches, embeds each batch with one vectorised call and writes
+the results back with a single ``executemany`` UPDATE. Every write is guarded
+by ``md5(content) = :content_hash`` so a row edited while its batch was being
+embedded stays dirty and is picked up again on the next pass. Notes whose
+vector changed are flagged ``links_dirty`` in the same transaction, which is
+what the inferred-link job (:mod:`app.services.ai.links`) works from.
+
+The worker usually runs as its own process, so it keeps no in-memory state of
+the API up to date. The API's similarity index re-reads changed vectors on its
+periodic catch-up, and its cached note payloads expire with the cache TTL.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import String, Text, bindparam, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ...db.models import Note, TableRow, TextContent
+from ..similarity import encode_embedding
+from .embedders import Embedder, load_embedder
+
+DEFAULT_BATCH_SIZE = 512
+
+logger = logging.getLogger(__name__)
+
+
+class BatchReport(NamedTuple):
+    """Outcome of one embedding batch."""
+
+    kind: str
+    rows: int
+    embedded: int
+    skipped: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+def _row_text(row_data: Any) -> str:
+    """Flatten a table row into ``column: value`` text for the embedder."""
+
+    if not isinstance(row_data, dict):
+        return str(row_data)
+    return "; ".join(f"{key}: {value}" for key, value in row_data.items() if value is not None)
+
+
+class _Source(NamedTuple):
+    kind: str
+    model: Any
+    content: Any
+    note_id: Any
+    to_text: Callable[[Any], str]
+
+
+_SOURCES: Tuple[_Source, ...] = (
+    _Source("text", TextContent, TextContent.body, TextContent.note_id, lambda body: body or ""),
+    _Source(
+        "table_row",
+        TableRow,
+        TableRow.row_data,
+        TableRow.table_note_id,
+        _row_text,
+    ),
+)
+
+
+def _content_hash(kind: str, content: Any) -> Any:
+    """``md5`` of the embedded content, computed by Postgres on both read and write."""
+
+    return func.md5(cast(content, Text) if kind == "table_row" else content)
+
+
+class EmbeddingWorker:
+    """Embed dirty rows in batches using ``embedder``."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        embedder: Optional[Embedder] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.session_factory = session_factory
+        self.embedder = embedder or load_embedder()
+        self.batch_size = batch_size
+
+    async def run_once(self) -> List[BatchReport]:
+        """Drain every dirty row once and return one report per batch."""
+
+        reports: List[BatchReport] = []
+        for source in _SOURCES:
+            last_id: Optional[UUID] = None
+            while True:
+                report, last_id = await self._run_batch(source, last_id)
+                if report is None:
+                    break
+                reports.append(report)
+                logger.info(
+                    "embedded %s batch: %d rows (%d embedded, %d unchanged) at %.0f rows/s",
+                    report.kind,
+                    report.rows,
+                    report.embedded,
+                    report.skipped,
+                    report.rows_per_second,
+                )
+        return reports
+
+    async def run_forever(self, interval: float = 5.0) -> None:
+        """Poll for dirty rows every ``interval`` seconds until cancelled."""
+
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Embedding pass failed")
+            await asyncio.sleep(interval)
+
+    async def _run_batch(
+        self, source: _Source, after: Optional[UUID]
+    ) -> Tuple[Optional[BatchReport], Optional[UUID]]:
+        model = source.model
+        started = time.perf_counter()
+
+        async with self.session_factory() as session:
+            content_hash = _content_hash(source.kind, source.content).label("content_hash")
+            stmt = (
+                select(
+                    model.id,
+                    source.note_id.label("note_id"),
+                    source.content.label("content"),
+                    content_hash,
+                    model.embedding["content_hash"].astext.label("stored_hash"),
+                    model.embedding["model"].astext.label("stored_model"),
+                )
+                .where(model.embedding_dirty.is_(True))
+                .order_by(model.id)
+                .limit(self.batch_size)
+            )
+            if after is not None:
+                stmt = stmt.where(model.id > after)
+            rows = (await session.execute(stmt)).all()
+            if not rows:
+                return None, after
+
+            changed, unchanged = [], []
+            for row in rows:
+                fresh = row.stored_hash == row.content_hash
+                if fresh and row.stored_model == self.embedder.name:
+                    unchanged.append(row)
+                else:
+                    changed.append(row)
+
+            vectors = await asyncio.to_thread(
+                self.embedder.embed, [source.to_text(row.content) for row in changed]
+            )
+
+            table = model.__table__
+            guard = _content_hash(source.kind, table.c[source.content.key]) == bindparam(
+                "b_hash", type_=String
+            )
+            if changed:
+                write = (
+                    update(table)
+                    .where(table.c.id == bindparam("b_id"), guard)
+                    .values(
+                        embedding=bindparam("b_embedding", type_=table.c.embedding.type),
+                        embedding_dirty=False,
+                    )
+                )
+                params: List[Dict[str, Any]] = [
+                    {
+                        "b_id": row.id,
+                        "b_hash": row.content_hash,
+                        "b_embedding": encode_embedding(
+                            vector, self.embedder.name, row.content_hash
+                        ),
+                    }
+                    for row, vector in zip(changed, vectors)
+                ]
+                await session.execute(write, params)
+                # Neighbours change with the vector; keep notes.updated_at as it is.
+                await session.execute(
+                    update(Note)
+                    .where(Note.id.in_({row.note_id for row in changed}))
+                    .values(links_dirty=True, updated_at=Note.updated_at)
+                    .execution_options(synchronize_session=False)
+                )
+            if unchanged:
+                clear = (
+                    update(table)
+                    .where(table.c.id == bindparam("b_id"), guard)
+                    .values(embedding_dirty=False)
+                )
+                await session.execute(
+                    clear, [{"b_id": row.id, "b_hash": row.content_hash} for row in unchanged]
+                )
+            await session.commit()
+
+        report = BatchReport(
+            kind=source.kind,
+            rows=len(rows),
+            embedded=len(changed),
+            skipped=len(unchanged),
+            seconds=time.perf_counter() - started,
+        )
+        return report, rows[-1].id
+
+
+def summarize(reports: Sequence[BatchReport]) -> str:
+    """One-line throughput summary over several batch reports."""
+
+    rows = sum(report.rows for report in reports)
+    seconds = sum(report.seconds for report in reports)
+    rate = rows / seconds if seconds else 0.0
+    return f"{rows} rows in {len(reports)} batches ({rate:.0f} rows/s)"
+
+
+__all__ = ["BatchReport", "DEFAULT_BATCH_SIZE", "EmbeddingWorker", "summarize"]
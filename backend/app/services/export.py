@@ -0,0 +1,153 @@
+"""Streaming NDJSON export of the whole notes corpus.
+
+The stream holds one JSON object per line. Every note comes first, as
+``{"kind": "note", ...}`` records carrying its markdown body or its table
+schema and tag names. Table rows follow as ``{"kind": "table_row", ...}``
+records. Both passes read through server-side cursors, so memory use does not
+depend on corpus size.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import Note, NoteTag, TableContent, TableRow, Tag, TextContent
+
+EXPORT_BATCH = 1000
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _line(record: Dict[str, Any]) -> str:
+    return json.dumps(record, default=_default, separators=(",", ":"), ensure_ascii=False)
+
+
+async def export_notes(session: AsyncSession) -> AsyncIterator[bytes]:
+    """Yield NDJSON chunks (one per fetched batch) for every note and table row."""
+
+    # One REPEATABLE READ snapshot keeps notes and rows consistent with each other.
+    await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    tags = (
+        select(func.array_agg(aggregate_order_by(Tag.name, Tag.name)))
+        .select_from(NoteTag)
+        .join(Tag, Tag.id == NoteTag.tag_id)
+        .where(NoteTag.note_id == Note.id)
+        .scalar_subquery()
+    )
+    notes = (
+        select(
+            Note.id,
+            Note.title,
+            Note.content_type,
+            Note.archived,
+            Note.created_at,
+            Note.updated_at,
+            TextContent.body,
+            TableContent.schema_json,
+            TableContent.row_count,
+            tags.label("tags"),
+        )
+        .outerjoin(TextContent, TextContent.note_id == Note.id)
+        .outerjoin(TableContent, TableContent.note_id == Note.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    result = await session.stream(notes)
+    async for partition in result.mappings().partitions():
+        lines = []
+        for row in partition:
+            table = None
+            if row["schema_json"] is not None:
+                table = {"schema_json": row["schema_json"], "row_count": row["row_count"]}
+            lines.append(
+                _line(
+                    {
+                        "kind": "note",
+                        "id": row["id"],
+                        "title": row["title"],
+                        "content_type": row["content_type"],
+                        "archived": row["archived"],
+                        "created_at": row["created_at"],
+                        "updated_at": row["updated_at"],
+                        "body": row["body"],
+                        "table": table,
+                        "tags": row["tags"] or [],
+                    }
+                )
+            )
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    rows = select(TableRow.id, TableRow.table_note_id, TableRow.row_data).execution_options(
+        yield_per=EXPORT_BATCH
+    )
+    result = await session.stream(rows)
+    async for partition in result.partitions():
+        lines = [
+            _line(
+                {
+                    "kind": "table_row",
+                    "id": row_id,
+                    "note_id": note_id,
+                    "row_data": row_data,
+                }
+            )
+            for row_id, note_id, row_data in partition
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def compress(chunks: AsyncIterator[bytes], compression: str) -> AsyncIterator[bytes]:
+    """Re-yield ``chunks`` compressed with ``gzip`` or ``zstd`` (or untouched)."""
+
+    if compression == "none":
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    if compression == "gzip":
+        compressor: Any = zlib.compressobj(6, zlib.DEFLATED, 31)
+    elif compression == "zstd":
+        compressor = _zstd_compressor()
+        if compressor is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+    else:
+        raise ValueError(f"Unsupported compression {compression!r}")
+
+    async for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _zstd_compressor() -> Optional[Any]:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor(level=3).compressobj()
+
+
+def zstd_available() -> bool:
+    return _zstd_compressor() is not None
+
+
+__all__ = ["COMPRESSIONS", "compress", "export_notes", "zstd_available"]
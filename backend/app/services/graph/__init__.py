@@ -0,0 +1,6 @@
+"""In-memory link graph analytics: centrality, components and shortest paths."""
+
+from .csr import LINK_KINDS, LinkGraph, kind_code
+from .store import LinkGraphStore, link_graph
+
+__all__ = ["LINK_KINDS", "LinkGraph", "LinkGraphStore", "kind_code", "link_graph"]
@@ -0,0 +1,232 @@
+"""Compressed-sparse-row snapshot of the note link graph and its analytics.
+
+Notes are mapped to dense ``int32`` node numbers. Edges are stored twice,
+sorted by source (outgoing CSR) and by target (incoming CSR), so walks in
+either direction read a contiguous slice of one array.
+
+Memory per edge, in bytes:
+
+======================  =====
+``out_indices`` int32       4
+``out_sources`` int32       4
+``out_kinds``   int8        1
+``in_indices``  int32       4
+======================  =====
+
+That is 13 bytes per edge. Each node adds 16 bytes of ``indptr`` plus
+about 140 bytes for its UUID in the id map. ``benchmarks/link_graph.py``
+measures both.
+
+Every algorithm here is a NumPy loop over whole edge arrays. There is no
+per-edge Python code.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from ...db.models import NoteLinkType
+
+LINK_KINDS: Tuple[NoteLinkType, ...] = tuple(NoteLinkType)
+_KIND_CODES = {kind: code for code, kind in enumerate(LINK_KINDS)}
+
+
+def kind_code(link_type: NoteLinkType) -> int:
+    return _KIND_CODES[link_type]
+
+
+def _csr(
+    keys: np.ndarray, values: np.ndarray, size: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Group ``values`` by ``keys``; returns ``(indptr, sorted values, order)``."""
+
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=indptr[1:])
+    return indptr, values[order], order
+
+
+class LinkGraph:
+    """Immutable CSR view of a set of directed, typed edges."""
+
+    def __init__(
+        self,
+        ids: Sequence[UUID],
+        sources: np.ndarray,
+        targets: np.ndarray,
+        kinds: np.ndarray,
+        alive: Optional[np.ndarray] = None,
+    ) -> None:
+        self.ids: List[UUID] = list(ids)
+        self.index: Dict[UUID, int] = {node_id: i for i, node_id in enumerate(self.ids)}
+        size = len(self.ids)
+        self.alive = np.ones(size, dtype=np.bool_) if alive is None else alive
+
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+        kinds = np.asarray(kinds, dtype=np.int8)
+        self.out_indptr, self.out_indices, order = _csr(sources, targets, size)
+        self.out_sources = sources[order]
+        self.out_kinds = kinds[order]
+        self.in_indptr, self.in_indices, _ = _csr(targets, sources, size)
+
+    @classmethod
+    def empty(cls) -> "LinkGraph":
+        none = np.empty(0, dtype=np.int32)
+        return cls([], none, none, none.astype(np.int8))
+
+    @property
+    def node_count(self) -> int:
+        return int(self.alive.sum())
+
+    @property
+    def edge_count(self) -> int:
+        return int(self.out_indices.size)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (
+            self.out_indptr,
+            self.out_indices,
+            self.out_sources,
+            self.out_kinds,
+            self.in_indptr,
+            self.in_indices,
+            self.alive,
+        )
+        return sum(array.nbytes for array in arrays)
+
+    def edges(self, link_type: Optional[NoteLinkType] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """``(sources, targets)`` of every edge, optionally of one link type."""
+
+        if link_type is None:
+            return self.out_sources, self.out_indices
+        mask = self.out_kinds == kind_code(link_type)
+        return self.out_sources[mask], self.out_indices[mask]
+
+    # ---------------------------------------------------------------- metrics
+
+    def degrees(self, link_type: Optional[NoteLinkType] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """``(in_degree, out_degree)`` per node."""
+
+        sources, targets = self.edges(link_type)
+        size = len(self.ids)
+        return (
+            np.bincount(targets, minlength=size),
+            np.bincount(sources, minlength=size),
+        )
+
+    def pagerank(
+        self,
+        link_type: Optional[NoteLinkType] = None,
+        damping: float = 0.85,
+        tol: float = 1e-6,
+        max_iter: int = 100,
+    ) -> np.ndarray:
+        """PageRank by power iteration; dangling nodes spread their rank evenly."""
+
+        size = len(self.ids)
+        if size == 0:
+            return np.empty(0, dtype=np.float64)
+        sources, targets = self.edges(link_type)
+        alive = self.alive
+        count = max(int(alive.sum()), 1)
+        out_degree = np.bincount(sources, minlength=size).astype(np.float64)
+        dangling = alive & (out_degree == 0)
+        share = np.divide(1.0, out_degree, out=np.zeros(size), where=out_degree > 0)
+
+        rank = np.where(alive, 1.0 / count, 0.0)
+        for _ in range(max_iter):
+            spread = np.bincount(targets, weights=(rank * share)[sources], minlength=size)
+            base = (1.0 - damping + damping * rank[dangling].sum()) / count
+            updated = np.where(alive, base + damping * spread, 0.0)
+            delta = np.abs(updated - rank).sum()
+            rank = updated
+            if delta < tol:
+                break
+        return rank
+
+    def components(self, link_type: Optional[NoteLinkType] = None) -> np.ndarray:
+        """Weakly connected component label (its smallest node number) per node.
+
+        Uses hooking and pointer jumping: every round links each edge's two
+        roots, then compresses paths until every node points at its root.
+        The number of rounds grows with the log of the component diameter.
+        """
+
+        parent = np.arange(len(self.ids), dtype=np.int64)
+        sources, targets = self.edges(link_type)
+        while sources.size:
+            left, right = parent[sources], parent[targets]
+            low, high = np.minimum(left, right), np.maximum(left, right)
+            pending = low != high
+            if not pending.any():
+                break
+            np.minimum.at(parent, high[pending], low[pending])
+            while True:
+                grand = parent[parent]
+                if np.array_equal(grand, parent):
+                    break
+                parent = grand
+            sources, targets = sources[pending], targets[pending]
+        return parent
+
+    def _neighbours(self, frontier: np.ndarray, direction: str) -> Tuple[np.ndarray, np.ndarray]:
+        """All ``(owner, neighbour)`` pairs leaving ``frontier``."""
+
+        owners: List[np.ndarray] = []
+        found: List[np.ndarray] = []
+        csrs = []
+        if direction in ("out", "both"):
+            csrs.append((self.out_indptr, self.out_indices))
+        if direction in ("in", "both"):
+            csrs.append((self.in_indptr, self.in_indices))
+        for indptr, indices in csrs:
+            starts, ends = indptr[frontier], indptr[frontier + 1]
+            counts = ends - starts
+            total = int(counts.sum())
+            if not total:
+                continue
+            shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+            found.append(indices[shift + np.arange(total)])
+            owners.append(np.repeat(frontier, counts))
+        if not found:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(owners), np.concatenate(found).astype(np.int64)
+
+    def shortest_path(
+        self, source: UUID, target: UUID, direction: str = "out", max_depth: int = 64
+    ) -> Optional[List[UUID]]:
+        """Fewest-hop path from ``source`` to ``target`` by breadth-first search.
+
+        Each BFS level expands the whole frontier with array operations.
+        Returns ``None`` if either note is unknown or no path exists.
+        """
+
+        start, goal = self.index.get(source), self.index.get(target)
+        if start is None or goal is None or not (self.alive[start] and self.alive[goal]):
+            return None
+        parent = np.full(len(self.ids), -1, dtype=np.int64)
+        parent[start] = start
+        frontier = np.array([start], dtype=np.int64)
+        for _ in range(max_depth):
+            if parent[goal] >= 0 or not frontier.size:
+                break
+            owners, found = self._neighbours(frontier, direction)
+            fresh = (parent[found] < 0) & self.alive[found]
+            nodes, first = np.unique(found[fresh], return_index=True)
+            parent[nodes] = owners[fresh][first]
+            frontier = nodes
+        if parent[goal] < 0:
+            return None
+        path = [goal]
+        while path[-1] != start:
+            path.append(int(parent[path[-1]]))
+        return [self.ids[node] for node in reversed(path)]
+
+
+__all__ = ["LINK_KINDS", "LinkGraph", "kind_code"]
@@ -0,0 +1,316 @@
+"""Process-wide link graph snapshot with cached analytics.
+
+The snapshot is built from ``note_links`` on first use. After that it is
+kept current in three ways:
+
+* links written through :class:`~app.repositories.LinkRepository` are
+  applied as soon as they commit;
+* note deletions are applied by the route that deletes the note;
+* links added by other workers are picked up by re-reading rows created since
+  the watermark, at most every ``GRAPH_CATCH_UP_SECONDS``.
+
+Deletions made by other workers are only seen on the full rebuild that runs
+every ``GRAPH_REBUILD_SECONDS``.
+
+Changes are queued and folded into a new CSR snapshot the next time the
+graph is read. Metrics are cached per snapshot version.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.models import NoteLink, NoteLinkType
+from ...repositories.links import LinkEdge, add_link_listener
+from .csr import LinkGraph, kind_code
+
+GRAPH_CATCH_UP_SECONDS = float(os.getenv("GRAPH_CATCH_UP_SECONDS", "30"))
+GRAPH_REBUILD_SECONDS = float(os.getenv("GRAPH_REBUILD_SECONDS", "3600"))
+_LOAD_BATCH = 20_000
+# Links committed slightly out of ``created_at`` order are re-read on catch-up.
+_CATCH_UP_MARGIN = timedelta(minutes=5)
+
+logger = logging.getLogger(__name__)
+
+_Edge = Tuple[UUID, UUID, int]
+
+
+class LinkGraphStore:
+    """Holder for the current :class:`LinkGraph` plus queued changes."""
+
+    def __init__(self) -> None:
+        self.watermark: Optional[datetime] = None
+        self._graph: Optional[LinkGraph] = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._added: List[_Edge] = []
+        self._removed: Set[_Edge] = set()
+        self._removed_notes: Set[UUID] = set()
+        self._caught_up_at = 0.0
+        self._built_at = 0.0
+        self._metrics: Dict[Tuple[Any, ...], Tuple[int, Any]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._graph is not None
+
+    # ---------------------------------------------------------------- changes
+
+    def links_changed(self, added: Sequence[LinkEdge], removed: Sequence[LinkEdge]) -> None:
+        """Queue committed link inserts and deletes.
+
+        Changes are applied in order, so the latest change to an edge wins: a
+        re-added edge is no longer removed and a removed one no longer added.
+        """
+
+        with self._lock:
+            if self._graph is None:
+                return
+            for edge in added:
+                key = (edge.source_id, edge.target_id, kind_code(edge.link_type))
+                self._removed.discard(key)
+                self._added.append(key)
+            gone = {(e.source_id, e.target_id, kind_code(e.link_type)) for e in removed}
+            if gone:
+                self._added = [edge for edge in self._added if edge not in gone]
+                self._removed |= gone
+
+    def remove_note(self, note_id: UUID) -> None:
+        """Queue removal of a deleted note and every link touching it."""
+
+        with self._lock:
+            if self._graph is None:
+                return
+            self._removed_notes.add(note_id)
+            self._added = [e for e in self._added if note_id not in (e[0], e[1])]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._graph = None
+            self._added, self._removed, self._removed_notes = [], set(), set()
+            self._metrics.clear()
+
+    # --------------------------------------------------------------- loading
+
+    async def graph(self, session: AsyncSession) -> LinkGraph:
+        """Return an up-to-date snapshot, loading or folding in changes first."""
+
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            now = time.monotonic()
+            if self._graph is None or now - self._built_at >= GRAPH_REBUILD_SECONDS:
+                await self._rebuild(session)
+            elif now - self._caught_up_at >= GRAPH_CATCH_UP_SECONDS:
+                await self._catch_up(session)
+            with self._lock:
+                pending = bool(self._added or self._removed or self._removed_notes)
+            if pending:
+                await asyncio.to_thread(self._fold)
+            assert self._graph is not None
+            return self._graph
+
+    async def _edges(
+        self, session: AsyncSession, since: Optional[datetime] = None
+    ) -> List[_Edge]:
+        stmt = select(
+            NoteLink.source_id, NoteLink.target_id, NoteLink.link_type, NoteLink.created_at
+        )
+        if since is not None:
+            stmt = stmt.where(NoteLink.created_at > since)
+        edges: List[_Edge] = []
+        result = await session.stream(stmt.execution_options(yield_per=_LOAD_BATCH))
+        async for rows in result.partitions():
+            for source_id, target_id, link_type, created_at in rows:
+                edges.append((source_id, target_id, kind_code(link_type)))
+                if self.watermark is None or created_at > self.watermark:
+                    self.watermark = created_at
+        return edges
+
+    async def _rebuild(self, session: AsyncSession) -> None:
+        started = time.perf_counter()
+        self.watermark = None
+        edges = await self._edges(session)
+        graph = await asyncio.to_thread(_build, edges)
+        with self._lock:
+            self._graph = graph
+            self._added, self._removed, self._removed_notes = [], set(), set()
+            self._version += 1
+        self._built_at = self._caught_up_at = time.monotonic()
+        logger.info(
+            "Built link graph with %d notes and %d links in %.2fs",
+            graph.node_count,
+            graph.edge_count,
+            time.perf_counter() - started,
+        )
+
+    async def _catch_up(self, session: AsyncSession) -> None:
+        since = self.watermark - _CATCH_UP_MARGIN if self.watermark else None
+        edges = await self._edges(session, since)
+        self._caught_up_at = time.monotonic()
+        if not edges:
+            return
+        with self._lock:
+            graph = self._graph
+            assert graph is not None
+            known = set(self._added)
+            for source_id, target_id, kind in edges:
+                edge = (source_id, target_id, kind)
+                if edge in known or _has_edge(graph, edge):
+                    continue
+                self._added.append(edge)
+                known.add(edge)
+
+    def _fold(self) -> None:
+        with self._lock:
+            graph = self._graph
+            added, removed, notes = self._added, self._removed, self._removed_notes
+            self._added, self._removed, self._removed_notes = [], set(), set()
+        assert graph is not None
+
+        ids = list(graph.ids)
+        index = dict(graph.index)
+        alive = graph.alive.copy()
+        sources, targets, kinds = graph.out_sources, graph.out_indices, graph.out_kinds
+
+        keep = np.ones(sources.size, dtype=np.bool_)
+        if notes:
+            dead = np.array([index[note] for note in notes if note in index], dtype=np.int64)
+            alive[dead] = False
+            keep &= alive[sources] & alive[targets]
+        if removed:
+            codes = [
+                _edge_key(index[s], index[t], kind)
+                for s, t, kind in removed
+                if s in index and t in index
+            ]
+            keep &= ~np.isin(_edge_key(sources, targets, kinds), np.array(codes, dtype=np.int64))
+
+        extra = []
+        for source_id, target_id, kind in added:
+            for node in (source_id, target_id):
+                if node not in index:
+                    index[node] = len(ids)
+                    ids.append(node)
+            extra.append((index[source_id], index[target_id], kind))
+        if len(ids) > alive.size:
+            alive = np.concatenate([alive, np.ones(len(ids) - alive.size, dtype=np.bool_)])
+        new = np.array(extra, dtype=np.int64).reshape(-1, 3)
+        if new.size:
+            # A re-added edge may still be in the old graph, or be queued twice.
+            codes = _edge_key(new[:, 0], new[:, 1], new[:, 2])
+            fresh = np.zeros(len(new), dtype=np.bool_)
+            fresh[np.unique(codes, return_index=True)[1]] = True
+            kept = _edge_key(sources[keep], targets[keep], kinds[keep])
+            new = new[fresh & ~np.isin(codes, kept)]
+
+        graph = LinkGraph(
+            ids,
+            np.concatenate([sources[keep], new[:, 0].astype(np.int32)]),
+            np.concatenate([targets[keep], new[:, 1].astype(np.int32)]),
+            np.concatenate([kinds[keep], new[:, 2].astype(np.int8)]),
+            alive=alive,
+        )
+        with self._lock:
+            self._graph = graph
+            self._version += 1
+
+    # --------------------------------------------------------------- metrics
+
+    async def cached(
+        self,
+        session: AsyncSession,
+        key: Tuple[Any, ...],
+        compute: Callable[[LinkGraph], Any],
+    ) -> Tuple[LinkGraph, Any]:
+        """Return ``compute(graph)``, reusing the result while the graph is unchanged."""
+
+        graph = await self.graph(session)
+        version = self._version
+        hit = self._metrics.get(key)
+        if hit is not None and hit[0] == version:
+            return graph, hit[1]
+        value = await asyncio.to_thread(compute, graph)
+        self._metrics[key] = (version, value)
+        return graph, value
+
+    async def pagerank(
+        self, session: AsyncSession, link_type: Optional[NoteLinkType] = None
+    ) -> Tuple[LinkGraph, np.ndarray]:
+        return await self.cached(session, ("pagerank", link_type), lambda g: g.pagerank(link_type))
+
+    async def degrees(
+        self, session: AsyncSession, link_type: Optional[NoteLinkType] = None
+    ) -> Tuple[LinkGraph, Tuple[np.ndarray, np.ndarray]]:
+        return await self.cached(session, ("degrees", link_type), lambda g: g.degrees(link_type))
+
+    async def components(
+        self, session: AsyncSession, link_type: Optional[NoteLinkType] = None
+    ) -> Tuple[LinkGraph, np.ndarray]:
+        return await self.cached(
+            session, ("components", link_type), lambda g: g.components(link_type)
+        )
+
+    def stats(self) -> Dict[str, float]:
+        graph = self._graph
+        if graph is None:
+            return {"loaded": 0}
+        edges = max(graph.edge_count, 1)
+        return {
+            "loaded": 1,
+            "version": self._version,
+            "notes": graph.node_count,
+            "links": graph.edge_count,
+            "bytes": graph.nbytes,
+            "bytes_per_link": round(graph.nbytes / edges, 2),
+            "pending": len(self._added) + len(self._removed) + len(self._removed_notes),
+        }
+
+
+def _edge_key(sources: Any, targets: Any, kinds: Any) -> Any:
+    return (np.int64(sources) << 33) | (np.int64(targets) << 2) | np.int64(kinds)
+
+
+def _has_edge(graph: LinkGraph, edge: _Edge) -> bool:
+    source, target = graph.index.get(edge[0]), graph.index.get(edge[1])
+    if source is None or target is None:
+        return False
+    start, end = graph.out_indptr[source], graph.out_indptr[source + 1]
+    hits = graph.out_indices[start:end] == target
+    return bool((graph.out_kinds[start:end][hits] == edge[2]).any())
+
+
+def _build(edges: List[_Edge]) -> LinkGraph:
+    index: Dict[UUID, int] = {}
+    ids: List[UUID] = []
+    coded = np.empty((len(edges), 3), dtype=np.int64)
+    for row, (source_id, target_id, kind) in enumerate(edges):
+        for node in (source_id, target_id):
+            if node not in index:
+                index[node] = len(ids)
+                ids.append(node)
+        coded[row] = (index[source_id], index[target_id], kind)
+    return LinkGraph(
+        ids,
+        coded[:, 0].astype(np.int32),
+        coded[:, 1].astype(np.int32),
+        coded[:, 2].astype(np.int8),
+    )
+
+
+link_graph = LinkGraphStore()
+add_link_listener(link_graph.links_changed)
+
+__all__ = ["GRAPH_CATCH_UP_SECONDS", "GRAPH_REBUILD_SECONDS", "LinkGraphStore", "link_graph"]
@@ -0,0 +1,30 @@
+"""Bulk import of notes from NDJSON streams and Markdown archives."""
+
+from .loader import DEFAULT_BATCH_SIZE, ImportReport, NoteImporter
+from .sources import (
+    ImportFormatError,
+    ImportRecord,
+    SkippedRecord,
+    iterate_in_thread,
+    ndjson_file_records,
+    ndjson_records,
+    tar_records,
+    zip_records,
+)
+
+IMPORT_FORMATS = ("ndjson", "tar", "zip")
+
+__all__ = [
+    "DEFAULT_BATCH_SIZE",
+    "IMPORT_FORMATS",
+    "ImportFormatError",
+    "ImportRecord",
+    "ImportReport",
+    "NoteImporter",
+    "SkippedRecord",
+    "iterate_in_thread",
+    "ndjson_file_records",
+    "ndjson_records",
+    "tar_records",
+    "zip_records",
+]
@@ -0,0 +1,103 @@
+"""Command line entrypoint: ``python -m backend.app.services.importer``.
+
+Progress is checkpointed after every committed batch. Re-running the same
+command after a crash resumes after the last committed batch; even without
+the checkpoint file, notes that were already imported are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Iterator
+
+from ...db.session import SessionLocal, with_engine
+from . import (
+    DEFAULT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    ImportReport,
+    NoteImporter,
+    iterate_in_thread,
+    ndjson_file_records,
+    tar_records,
+    zip_records,
+)
+
+_READERS = {"ndjson": ndjson_file_records, "tar": tar_records, "zip": zip_records}
+
+
+def _guess_format(path: str) -> str:
+    name = path.lower()
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if name.endswith(".zip"):
+        return "zip"
+    return "tar"
+
+
+def _read_checkpoint(path: str, source: str) -> int:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return 0
+    return int(data.get("records", 0)) if data.get("source") == source else 0
+
+
+def _write_checkpoint(path: str, source: str, records: int) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump({"source": source, "records": records}, handle)
+    os.replace(tmp, path)
+
+
+async def _main(args: argparse.Namespace) -> ImportReport:
+    fmt = args.format or _guess_format(args.path)
+    source = args.source if args.source is not None else os.path.basename(args.path)
+    checkpoint = args.checkpoint or f"{args.path}.import-checkpoint"
+    skip = 0 if args.restart else _read_checkpoint(checkpoint, source)
+    if skip:
+        logging.getLogger(__name__).info("resuming after %d records", skip)
+
+    async def save(report: ImportReport) -> None:
+        await asyncio.to_thread(_write_checkpoint, checkpoint, source, report.records)
+
+    with open(args.path, "rb") as handle:
+        items: Iterator[Any] = _READERS[fmt](handle, source)
+        async with SessionLocal() as session:
+            importer = NoteImporter(session, batch_size=args.batch_size, on_batch=save)
+            report = await importer.run(iterate_in_thread(items), skip=skip)
+
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import notes from NDJSON or Markdown archives.")
+    parser.add_argument("path", help="NDJSON file, tar(.gz) or zip of Markdown files")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None)
+    parser.add_argument(
+        "--source", default=None, help="name used to derive note ids (default: file name)"
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=None, help="default: <path>.import-checkpoint")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-5.5s [%(name)s] %(message)s")
+    report = asyncio.run(with_engine(_main(args)))
+    print(
+        f"{report.imported} notes imported, {report.duplicates} already present, "
+        f"{report.skipped} skipped in {report.seconds:.2f}s "
+        f"({report.notes_per_second:,.0f} notes/s)"
+    )
+    for error in report.errors:
+        print(f"  skipped {error}")
+
+
+if __name__ == "__main__":
+    main()
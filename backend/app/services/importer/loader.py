@@ -0,0 +1,263 @@
+"""Load import records into ``notes`` and ``text_contents`` with ``COPY``.
+
+Records are taken from the source in batches. Each batch is copied into a
+temporary staging table over the binary ``COPY`` protocol, then moved into
+the real tables with ``INSERT ... SELECT ... ON CONFLICT DO NOTHING`` and
+committed. Because record ids are deterministic, re-running an interrupted
+import skips the notes an earlier run already committed.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+from uuid import UUID, uuid5
+
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Text,
+    any_,
+    bindparam,
+    column,
+    func,
+    literal,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.models import Note, NoteContentType, TextContent
+from ...db.search import search_document
+from ...repositories import NoteRepository, TagRepository
+from ...repositories.links import notify_links_changed
+from .sources import IMPORT_NAMESPACE, ImportRecord, SkippedRecord
+
+DEFAULT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 50
+
+logger = logging.getLogger(__name__)
+
+_STAGE = "import_notes_stage"
+_STAGE_COLUMNS = (
+    "id",
+    "content_id",
+    "title",
+    "body",
+    "archived",
+    "created_at",
+    "updated_at",
+)
+_CREATE_STAGE = text(
+    f"CREATE TEMPORARY TABLE IF NOT EXISTS {_STAGE} ("
+    " id uuid NOT NULL,"
+    " content_id uuid NOT NULL,"
+    " title text NOT NULL,"
+    " body text NOT NULL,"
+    " archived boolean NOT NULL,"
+    " created_at timestamptz,"
+    " updated_at timestamptz"
+    ") ON COMMIT DELETE ROWS"
+)
+
+_stage = table(
+    _STAGE,
+    column("id", PGUUID(as_uuid=True)),
+    column("content_id", PGUUID(as_uuid=True)),
+    column("title", Text),
+    column("body", Text),
+    column("archived", Boolean),
+    column("created_at", DateTime(timezone=True)),
+    column("updated_at", DateTime(timezone=True)),
+)
+
+
+@dataclass
+class ImportReport:
+    """Running totals for one import."""
+
+    records: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def notes_per_second(self) -> float:
+        return self.imported / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "records": self.records,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "notes_per_second": round(self.notes_per_second, 1),
+            "errors": self.errors,
+        }
+
+
+def content_id(note_id: UUID) -> UUID:
+    """Deterministic ``text_contents.id`` for an imported note."""
+
+    return uuid5(IMPORT_NAMESPACE, f"text\0{note_id}")
+
+
+class NoteImporter:
+    """Stream records into the database in ``COPY``-loaded batches.
+
+    ``on_batch`` is awaited after every committed batch with the running
+    report; the CLI uses it to write its resume checkpoint.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_batch: Optional[Callable[[ImportReport], Awaitable[None]]] = None,
+    ) -> None:
+        self.session = session
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+
+    async def run(self, items: AsyncIterator[Any], skip: int = 0) -> ImportReport:
+        """Import every record from ``items`` after the first ``skip`` entries."""
+
+        report = ImportReport()
+        started = time.perf_counter()
+        batch: Dict[UUID, ImportRecord] = {}
+
+        async for item in items:
+            report.records += 1
+            if report.records <= skip:
+                continue
+            if isinstance(item, SkippedRecord):
+                report.skipped += 1
+                if len(report.errors) < MAX_REPORTED_ERRORS:
+                    report.errors.append(f"{item.key}: {item.reason}")
+                continue
+            if item.id in batch:
+                report.duplicates += 1
+            batch[item.id] = item
+            if len(batch) >= self.batch_size:
+                await self._flush(batch, report, started)
+                batch = {}
+
+        if batch:
+            await self._flush(batch, report, started)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    async def _flush(
+        self, batch: Dict[UUID, ImportRecord], report: ImportReport, started: float
+    ) -> None:
+        records = list(batch.values())
+        try:
+            inserted = await self._load(records)
+            notes = [
+                {"title": batch[note_id].title, "body": batch[note_id].body}
+                for note_id in inserted
+            ]
+            changes = await NoteRepository(self.session).link_inserted(inserted, notes)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        notify_links_changed(*changes)
+
+        report.batches += 1
+        report.imported += len(inserted)
+        report.duplicates += len(records) - len(inserted)
+        report.seconds = time.perf_counter() - started
+        logger.info(
+            "imported batch %d: %d notes (%d already present), %.0f notes/s overall",
+            report.batches,
+            len(inserted),
+            len(records) - len(inserted),
+            report.notes_per_second,
+        )
+        if self.on_batch is not None:
+            await self.on_batch(report)
+
+    async def _load(self, records: List[ImportRecord]) -> List[UUID]:
+        await self.session.execute(_CREATE_STAGE)
+        connection = await self.session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            _STAGE,
+            columns=_STAGE_COLUMNS,
+            records=[
+                (
+                    record.id,
+                    content_id(record.id),
+                    record.title,
+                    record.body,
+                    record.archived,
+                    record.created_at,
+                    record.updated_at,
+                )
+                for record in records
+            ],
+        )
+
+        now = func.now()
+        notes = (
+            pg_insert(Note.__table__)
+            .from_select(
+                [
+                    "id",
+                    "title",
+                    "content_type",
+                    "archived",
+                    "created_at",
+                    "updated_at",
+                    "search_vector",
+                ],
+                select(
+                    _stage.c.id,
+                    _stage.c.title,
+                    literal(NoteContentType.MARKDOWN, Note.__table__.c.content_type.type),
+                    _stage.c.archived,
+                    func.coalesce(_stage.c.created_at, now),
+                    func.coalesce(_stage.c.updated_at, _stage.c.created_at, now),
+                    search_document(_stage.c.title, _stage.c.body),
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=["id"])
+            .returning(Note.__table__.c.id)
+        )
+        inserted = list((await self.session.execute(notes)).scalars())
+        if not inserted:
+            return inserted
+
+        ids = bindparam("note_ids", inserted, type_=ARRAY(PGUUID(as_uuid=True)))
+        bodies = pg_insert(TextContent.__table__).from_select(
+            ["id", "note_id", "body", "created_at", "updated_at"],
+            select(
+                _stage.c.content_id,
+                _stage.c.id,
+                _stage.c.body,
+                func.coalesce(_stage.c.created_at, now),
+                func.coalesce(_stage.c.updated_at, _stage.c.created_at, now),
+            ).where(_stage.c.id == any_(ids)),
+        )
+        await self.session.execute(bodies)
+
+        fresh = set(inserted)
+        await self._attach_tags([record for record in records if record.id in fresh])
+        return inserted
+
+    async def _attach_tags(self, records: Iterable[ImportRecord]) -> None:
+        pairs = [(record.id, name) for record in records for name in record.tags]
+        await TagRepository(self.session).add_to_notes(pairs)
+
+
+__all__ = ["DEFAULT_BATCH_SIZE", "ImportReport", "NoteImporter", "content_id"]
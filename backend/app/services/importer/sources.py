@@ -0,0 +1,349 @@
+"""Parsers that turn NDJSON streams and Markdown archives into import records.
+
+Every parser is a generator so the importer never holds more than one batch
+of records at a time. Record ids are derived deterministically from the
+source name, the record's position and its content, so importing the same
+input twice produces the same ids and the second pass is a no-op.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import posixpath
+import re
+import tarfile
+import zipfile
+from datetime import datetime
+from typing import (
+    IO,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
+from uuid import UUID, uuid5
+
+IMPORT_NAMESPACE = UUID("5d0f8a3e-4b7c-4f51-9a43-1f2b6c8d9e07")
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+MAX_TITLE_LENGTH = 255
+MAX_TAG_LENGTH = 100
+
+_FRONT_MATTER = re.compile(r"\A---[ \t]*\r?\n(.*?)\r?\n---[ \t]*(?:\r?\n|\Z)", re.DOTALL)
+_HEADING = re.compile(r"^#[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+
+
+class ImportFormatError(ValueError):
+    """Raised for a record that cannot be turned into a note."""
+
+
+class ImportRecord(NamedTuple):
+    """One markdown note ready to be loaded."""
+
+    id: UUID
+    title: str
+    body: str
+    tags: List[str]
+    archived: bool = False
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class SkippedRecord(NamedTuple):
+    """A source entry that did not produce a note, with the reason why."""
+
+    key: str
+    reason: str
+
+
+SourceItem = Union[ImportRecord, SkippedRecord]
+
+
+def record_id(source: str, key: str, title: str, body: str) -> UUID:
+    """Stable note id for the entry at ``key`` of ``source`` with this content."""
+
+    digest = hashlib.sha1(f"{title}\0{body}".encode("utf-8")).hexdigest()
+    return uuid5(IMPORT_NAMESPACE, f"{source}\0{key}\0{digest}")
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError as exc:
+        raise ImportFormatError(f"invalid timestamp {value!r}") from exc
+
+
+def _normalize_tags(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        raise ImportFormatError("tags must be a list or a comma separated string")
+    tags: Dict[str, None] = {}
+    for tag in value:
+        name = str(tag).strip().lstrip("#")[:MAX_TAG_LENGTH]
+        if name:
+            tags[name] = None
+    return list(tags)
+
+
+def _make_record(source: str, key: str, fields: Dict[str, Any]) -> ImportRecord:
+    title = fields.get("title")
+    body = fields.get("body")
+    if not isinstance(title, str) or not title.strip():
+        raise ImportFormatError("missing title")
+    if body is None:
+        body = ""
+    if not isinstance(body, str):
+        raise ImportFormatError("body must be a string")
+    title = title.strip()[:MAX_TITLE_LENGTH]
+
+    note_id = fields.get("id")
+    if note_id is not None:
+        try:
+            note_id = UUID(str(note_id))
+        except ValueError as exc:
+            raise ImportFormatError(f"invalid id {note_id!r}") from exc
+    else:
+        note_id = record_id(source, key, title, body)
+
+    created_at = _parse_datetime(fields.get("created_at"))
+    return ImportRecord(
+        id=note_id,
+        title=title,
+        body=body,
+        tags=_normalize_tags(fields.get("tags")),
+        archived=bool(fields.get("archived", False)),
+        created_at=created_at,
+        updated_at=_parse_datetime(fields.get("updated_at")) or created_at,
+    )
+
+
+# ---------------------------------------------------------------------- NDJSON
+
+
+def ndjson_record(source: str, line_number: int, line: bytes) -> Optional[SourceItem]:
+    """Parse one NDJSON line; blank lines yield ``None``.
+
+    Lines written by ``GET /notes/export`` are accepted as-is: table notes and
+    table rows are reported as skipped since they are not markdown notes.
+    """
+
+    key = f"line {line_number}"
+    if not line.strip():
+        return None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return SkippedRecord(key, "invalid JSON")
+    if not isinstance(data, dict):
+        return SkippedRecord(key, "expected a JSON object")
+    if data.get("kind", "note") != "note":
+        return SkippedRecord(key, f"unsupported kind {data['kind']!r}")
+    if data.get("content_type", "markdown") != "markdown":
+        return SkippedRecord(key, "only markdown notes can be imported")
+    try:
+        return _make_record(source, key, data)
+    except ImportFormatError as exc:
+        return SkippedRecord(key, str(exc))
+
+
+async def ndjson_records(
+    chunks: AsyncIterator[bytes], source: str = ""
+) -> AsyncIterator[SourceItem]:
+    """Parse NDJSON from an async stream of byte chunks of any size."""
+
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            item = ndjson_record(source, line_number, line)
+            if item is not None:
+                yield item
+    if buffer:
+        item = ndjson_record(source, line_number + 1, buffer)
+        if item is not None:
+            yield item
+
+
+def ndjson_file_records(handle: IO[bytes], source: str = "") -> Iterator[SourceItem]:
+    """Parse NDJSON from a binary file object, line by line."""
+
+    for line_number, line in enumerate(handle, start=1):
+        item = ndjson_record(source, line_number, line)
+        if item is not None:
+            yield item
+
+
+# -------------------------------------------------------------------- Markdown
+
+
+def _load_front_matter(text: str) -> Dict[str, Any]:
+    try:
+        import yaml
+    except ImportError:
+        return _simple_front_matter(text)
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError as exc:
+        raise ImportFormatError(f"invalid front matter: {exc}") from exc
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ImportFormatError("front matter must be a mapping")
+    return data
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+
+def _simple_front_matter(text: str) -> Dict[str, Any]:
+    """Parse the ``key: value`` / ``[a, b]`` / ``- item`` subset of YAML."""
+
+    data: Dict[str, Any] = {}
+    current: Optional[str] = None
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        stripped = line.strip()
+        if stripped.startswith("- ") and current is not None:
+            if not isinstance(data.get(current), list):
+                data[current] = []
+            data[current].append(_unquote(stripped[2:].strip()))
+            continue
+        key, sep, value = line.partition(":")
+        if not sep:
+            raise ImportFormatError(f"invalid front matter line {raw!r}")
+        current = key.strip()
+        value = value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            data[current] = [_unquote(item.strip()) for item in value[1:-1].split(",")]
+        elif value.lower() in ("true", "false"):
+            data[current] = value.lower() == "true"
+        else:
+            data[current] = _unquote(value) if value else None
+    return data
+
+
+def markdown_record(source: str, path: str, text: str) -> ImportRecord:
+    """Build a record from a Markdown document with optional front matter.
+
+    The title comes from the front matter, else the first ``#`` heading, else
+    the file name.
+    """
+
+    fields: Dict[str, Any] = {}
+    body = text
+    match = _FRONT_MATTER.match(text)
+    if match:
+        fields = _load_front_matter(match.group(1))
+        body = text[match.end() :]
+
+    if not fields.get("title"):
+        heading = _HEADING.search(body)
+        stem = posixpath.splitext(posixpath.basename(path))[0]
+        fields["title"] = heading.group(1) if heading else stem
+    fields.setdefault("created_at", fields.get("created") or fields.get("date"))
+    fields.setdefault("updated_at", fields.get("updated"))
+    fields.pop("id", None)
+    fields["body"] = body
+    return _make_record(source, path, fields)
+
+
+def _markdown_item(source: str, path: str, data: bytes) -> SourceItem:
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return SkippedRecord(path, "not valid UTF-8")
+    try:
+        return markdown_record(source, path, text)
+    except ImportFormatError as exc:
+        return SkippedRecord(path, str(exc))
+
+
+def _is_markdown(path: str) -> bool:
+    name = posixpath.basename(path)
+    return name.lower().endswith(MARKDOWN_SUFFIXES) and not name.startswith(".")
+
+
+def tar_records(handle: IO[bytes], source: str = "") -> Iterator[SourceItem]:
+    """Read Markdown members of a (optionally compressed) tar stream in order.
+
+    The archive is read in streaming mode, so ``handle`` need not be seekable.
+    """
+
+    with tarfile.open(fileobj=handle, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile() or not _is_markdown(member.name):
+                continue
+            extracted = archive.extractfile(member)
+            if extracted is None:
+                continue
+            yield _markdown_item(source, member.name, extracted.read())
+
+
+def zip_records(handle: IO[bytes], source: str = "") -> Iterator[SourceItem]:
+    """Read Markdown members of a zip archive; ``handle`` must be seekable."""
+
+    with zipfile.ZipFile(handle) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not _is_markdown(info.filename):
+                continue
+            yield _markdown_item(source, info.filename, archive.read(info))
+
+
+# ---------------------------------------------------------------------- helpers
+
+
+async def iterate_in_thread(items: Iterable[Any], batch_size: int = 256) -> AsyncIterator[Any]:
+    """Drive a blocking iterator from a worker thread, ``batch_size`` items at a time."""
+
+    iterator = iter(items)
+
+    def take() -> List[Any]:
+        batch = []
+        for item in iterator:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    while True:
+        batch = await asyncio.to_thread(take)
+        if not batch:
+            return
+        for item in batch:
+            yield item
+
+
+__all__ = [
+    "IMPORT_NAMESPACE",
+    "ImportFormatError",
+    "ImportRecord",
+    "SkippedRecord",
+    "iterate_in_thread",
+    "markdown_record",
+    "ndjson_file_records",
+    "ndjson_records",
+    "record_id",
+    "tar_records",
+    "zip_records",
+]
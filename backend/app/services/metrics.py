@@ -0,0 +1,312 @@
+"""Per-route latency and SQL instrumentation, exported in Prometheus text format.
+
+:class:`MetricsMiddleware` opens a :class:`RequestStats` for each HTTP request.
+SQLAlchemy ``before_cursor_execute``/``after_cursor_execute`` hooks, installed
+on every engine, add each statement's count, duration and row count to it.
+When the response is done the totals are recorded under the matched route
+template (``/notes/{note_id}``, not the concrete path), so the number of
+series does not grow with the number of ids.
+
+An opt-in query budget catches N+1 regressions:
+
+``QUERY_BUDGET``       maximum statements per request (``0``, the default, disables it)
+``QUERY_BUDGET_MODE``  ``log`` warns after the request; ``fail`` raises
+                       :class:`QueryBudgetExceeded` from the statement that
+                       crosses the budget, so tests fail loudly
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..db.session import pool_metrics
+
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "0"))
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS: Tuple[float, ...] = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+_POOL_COUNTERS = ("checkouts", "timeouts", "connects", "invalidations")
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A request issued more SQL statements than ``QUERY_BUDGET`` allows."""
+
+
+class RequestStats:
+    """SQL totals for one request."""
+
+    __slots__ = ("budget", "db_seconds", "enforce", "queries", "rows", "scope")
+
+    def __init__(
+        self,
+        budget: int = 0,
+        enforce: bool = False,
+        scope: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.budget = budget
+        self.enforce = enforce
+        self.scope = scope
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+
+    @property
+    def method(self) -> Optional[str]:
+        return self.scope.get("method") if self.scope is not None else None
+
+    @property
+    def route(self) -> Optional[str]:
+        """Template of the route serving the request, once it has been matched."""
+
+        return _route_template(self.scope) if self.scope is not None else None
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being served, if any."""
+
+    return _current.get()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value
+
+
+class _RouteMetrics:
+    __slots__ = ("db_seconds", "latency", "queries", "rows", "statuses")
+
+    def __init__(self) -> None:
+        self.statuses: Dict[int, int] = {}
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.rows = 0
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**values: Any) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in values.items()) + "}"
+
+
+def _histogram_lines(name: str, labels: Dict[str, Any], histogram: _Histogram) -> Iterable[str]:
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        yield f"{name}_bucket{_labels(**labels, le=f'{bound:g}')} {cumulative}"
+    yield f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}"
+    yield f"{name}_sum{_labels(**labels)} {histogram.total:.6f}"
+    yield f"{name}_count{_labels(**labels)} {histogram.count}"
+
+
+class MetricsRegistry:
+    """Per-route request metrics plus the query budget settings."""
+
+    def __init__(self, budget: int = QUERY_BUDGET, budget_mode: str = QUERY_BUDGET_MODE) -> None:
+        self.budget = budget
+        self.budget_mode = budget_mode
+        self._routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, method: str, route: str, status: int, seconds: float, stats: RequestStats
+    ) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = _RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(stats.queries)
+            metrics.db_seconds += stats.db_seconds
+            metrics.rows += stats.rows
+        if stats.budget and stats.queries > stats.budget:
+            logger.warning(
+                "%s %s ran %d SQL statements (budget %d)",
+                method,
+                route,
+                stats.queries,
+                stats.budget,
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+
+        lines: List[str] = []
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines += [
+                "# HELP http_requests_total Requests served, by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route), metrics in routes:
+                for status, count in sorted(metrics.statuses.items()):
+                    labels = _labels(method=method, route=route, status=status)
+                    lines.append(f"http_requests_total{labels} {count}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), metrics in routes:
+                lines += _histogram_lines(
+                    "http_request_duration_seconds",
+                    {"method": method, "route": route},
+                    metrics.latency,
+                )
+
+            lines += [
+                "# HELP http_request_db_queries SQL statements per request.",
+                "# TYPE http_request_db_queries histogram",
+            ]
+            for (method, route), metrics in routes:
+                lines += _histogram_lines(
+                    "http_request_db_queries",
+                    {"method": method, "route": route},
+                    metrics.queries,
+                )
+
+            for name, help_text, attr in (
+                ("http_request_db_seconds_total", "Time spent in SQL statements.", "db_seconds"),
+                ("http_request_db_rows_total", "Rows returned or affected by SQL.", "rows"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, route), metrics in routes:
+                    value = getattr(metrics, attr)
+                    lines.append(f"{name}{_labels(method=method, route=route)} {value:g}")
+
+        for key, value in pool_metrics.stats().items():
+            if key in _POOL_COUNTERS:
+                lines += [f"# TYPE db_pool_{key}_total counter", f"db_pool_{key}_total {value:g}"]
+            else:
+                lines += [f"# TYPE db_pool_{key} gauge", f"db_pool_{key} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = MetricsRegistry()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *_: Any) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    if stats.enforce and stats.budget and stats.queries > stats.budget:
+        raise QueryBudgetExceeded(
+            f"statement {stats.queries} exceeds the query budget of {stats.budget}: "
+            f"{statement[:200]}"
+        )
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn: Any, cursor: Any, *_: Any) -> None:
+    stats = _current.get()
+    started = conn.info.pop("query_started", None)
+    if stats is None or started is None:
+        return
+    stats.db_seconds += time.perf_counter() - started
+    if cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    """The matched route's full path template, e.g. ``/notes/{note_id}``.
+
+    Included routers may be nested, in which case ``scope["route"].path`` holds
+    only the template below the router's prefix. The prefix is recovered from
+    the concrete path by dropping as many segments as that template has.
+    """
+
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "<unmatched>"
+    prefix = scope["path"]
+    for _ in range(template.count("/")):
+        prefix = prefix.rpartition("/")[0]
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL totals per route."""
+
+    def __init__(self, app: Any, registry: MetricsRegistry = request_metrics) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(
+            budget=self.registry.budget,
+            enforce=self.registry.budget_mode == "fail",
+            scope=scope,
+        )
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            self.registry.record(
+                scope["method"],
+                _route_template(scope),
+                status,
+                time.perf_counter() - started,
+                stats,
+            )
+
+
+__all__ = [
+    "MetricsMiddleware",
+    "MetricsRegistry",
+    "QUERY_BUDGET",
+    "QUERY_BUDGET_MODE",
+    "QueryBudgetExceeded",
+    "RequestStats",
+    "current_request_stats",
+    "request_metrics",
+]
@@ -0,0 +1,13 @@
+"""Approximate nearest-neighbour search over note embeddings."""
+
+from .ivf import IVFIndex
+from .store import NoteSimilarityIndex, note_index
+from .vectors import decode_embedding, encode_embedding
+
+__all__ = [
+    "IVFIndex",
+    "NoteSimilarityIndex",
+    "decode_embedding",
+    "encode_embedding",
+    "note_index",
+]
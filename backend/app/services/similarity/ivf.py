@@ -0,0 +1,574 @@
+"""In-process inverted-file (IVF) index for approximate nearest-neighbour search.
+
+Vectors are L2-normalised float32 rows, so inner product equals cosine
+similarity. The trained *base* segment is stored list-contiguous on disk and
+opened with ``mmap_mode="r"``; upserts land in a small in-memory *delta*
+segment that is scanned exhaustively until the next :meth:`IVFIndex.compact_to`.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import math
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from uuid import UUID, uuid4
+
+import numpy as np
+
+DEFAULT_NPROBE = 16
+MAX_NLIST = 4096
+_ASSIGN_BLOCK = 65536
+_KMEANS_SAMPLE_PER_LIST = 64
+_KMEANS_ITERATIONS = 12
+_FORMAT_VERSION = 1
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on the index directory ``path``.
+
+    Uses ``flock`` where available; elsewhere compactions are not serialised.
+    """
+
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(os.path.join(path, ".lock"), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    """Return ``matrix`` as float32 with unit-length rows (zero rows untouched)."""
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def default_nlist(count: int) -> int:
+    """Pick a list count of roughly ``4 * sqrt(n)``, the usual IVF rule of thumb."""
+
+    if count < 1024:
+        return 1
+    return min(MAX_NLIST, int(4 * math.sqrt(count)))
+
+
+def _ids_to_bytes(ids: Sequence[UUID]) -> np.ndarray:
+    if not ids:
+        return np.empty((0, 16), dtype=np.uint8)
+    raw = b"".join(item.bytes for item in ids)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, 16)
+
+
+def _assign(
+    vectors: np.ndarray, centroids: np.ndarray, rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Return the nearest centroid for each row, working in bounded blocks."""
+
+    total = len(vectors) if rows is None else len(rows)
+    out = np.empty(total, dtype=np.int32)
+    for start in range(0, total, _ASSIGN_BLOCK):
+        stop = min(start + _ASSIGN_BLOCK, total)
+        block = vectors[start:stop] if rows is None else vectors[rows[start:stop]]
+        out[start:stop] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def _kmeans(sample: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over ``sample``; returns ``(nlist, dim)`` centroids."""
+
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(_KMEANS_ITERATIONS):
+        assign = _assign(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+        centroids[filled] = sums
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+        centroids = normalize(centroids)
+    return centroids
+
+
+class IVFIndex:
+    """Approximate cosine-similarity index keyed by :class:`uuid.UUID`."""
+
+    def __init__(
+        self,
+        dim: int,
+        centroids: np.ndarray,
+        vectors: np.ndarray,
+        ids: np.ndarray,
+        offsets: np.ndarray,
+        trained_count: int,
+    ) -> None:
+        self.dim = dim
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+        self.trained_count = trained_count
+
+        self._positions = {UUID(bytes=row.tobytes()): pos for pos, row in enumerate(ids)}
+        self._deleted = np.zeros(len(ids), dtype=bool)
+        self._delta = np.empty((0, dim), dtype=np.float32)
+        self._delta_ids = np.empty((0, 16), dtype=np.uint8)
+        self._delta_live = np.empty(0, dtype=bool)
+        self._delta_count = 0
+        self._delta_positions: dict[UUID, int] = {}
+
+    # ------------------------------------------------------------------ build
+
+    @classmethod
+    def empty(cls, dim: int) -> "IVFIndex":
+        return cls(
+            dim=dim,
+            centroids=np.empty((0, dim), dtype=np.float32),
+            vectors=np.empty((0, dim), dtype=np.float32),
+            ids=np.empty((0, 16), dtype=np.uint8),
+            offsets=np.zeros(1, dtype=np.int64),
+            trained_count=0,
+        )
+
+    @classmethod
+    def train(
+        cls, ids: Sequence[UUID], vectors: np.ndarray, nlist: Optional[int] = None, seed: int = 0
+    ) -> "IVFIndex":
+        """Cluster ``vectors`` and return an in-memory index over them."""
+
+        vectors = normalize(vectors)
+        dim = vectors.shape[1]
+        if not len(ids):
+            return cls.empty(dim)
+
+        nlist = nlist or default_nlist(len(ids))
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(ids), nlist * _KMEANS_SAMPLE_PER_LIST)
+        sample = vectors[np.sort(rng.choice(len(ids), size=sample_size, replace=False))]
+        centroids = _kmeans(sample, nlist, seed=seed)
+
+        assign = _assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(
+            dim=dim,
+            centroids=centroids,
+            vectors=vectors[order],
+            ids=_ids_to_bytes(ids)[order],
+            offsets=offsets,
+            trained_count=len(ids),
+        )
+
+    # ---------------------------------------------------------------- mutation
+
+    def __len__(self) -> int:
+        return int(len(self._deleted) - self._deleted.sum()) + len(self._delta_positions)
+
+    def __contains__(self, item_id: UUID) -> bool:
+        return self.get(item_id) is not None
+
+    def get(self, item_id: UUID) -> Optional[np.ndarray]:
+        """Return the stored (normalised) vector for ``item_id``."""
+
+        pos = self._delta_positions.get(item_id)
+        if pos is not None:
+            return self._delta[pos]
+        pos = self._positions.get(item_id)
+        if pos is not None and not self._deleted[pos]:
+            return np.asarray(self.vectors[pos])
+        return None
+
+    def live_ids(self) -> Set[UUID]:
+        """Return the ids currently in the index."""
+
+        live = {item_id for item_id, pos in self._positions.items() if not self._deleted[pos]}
+        live.update(self._delta_positions)
+        return live
+
+    def upsert(self, item_id: UUID, vector: np.ndarray) -> None:
+        vector = normalize(vector)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a {self.dim}-dimensional vector, got {vector.shape}")
+
+        base_pos = self._positions.get(item_id)
+        if base_pos is not None:
+            self._deleted[base_pos] = True
+
+        pos = self._delta_positions.get(item_id)
+        if pos is None:
+            pos = self._delta_count
+            if pos == len(self._delta):
+                self._grow_delta()
+            self._delta_count += 1
+            self._delta_ids[pos] = np.frombuffer(item_id.bytes, dtype=np.uint8)
+            self._delta_positions[item_id] = pos
+        self._delta[pos] = vector
+        self._delta_live[pos] = True
+
+    def remove(self, item_id: UUID) -> None:
+        base_pos = self._positions.get(item_id)
+        if base_pos is not None:
+            self._deleted[base_pos] = True
+        pos = self._delta_positions.pop(item_id, None)
+        if pos is not None:
+            self._delta_live[pos] = False
+
+    def _grow_delta(self) -> None:
+        capacity = max(1024, 2 * len(self._delta))
+        delta = np.empty((capacity, self.dim), dtype=np.float32)
+        delta_ids = np.empty((capacity, 16), dtype=np.uint8)
+        live = np.zeros(capacity, dtype=bool)
+        count = self._delta_count
+        delta[:count] = self._delta[:count]
+        delta_ids[:count] = self._delta_ids[:count]
+        live[:count] = self._delta_live[:count]
+        self._delta, self._delta_ids, self._delta_live = delta, delta_ids, live
+
+    @property
+    def delta_size(self) -> int:
+        return self._delta_count
+
+    @property
+    def dirty(self) -> bool:
+        """True when there are upserts or removals not yet in the base."""
+
+        return bool(self._delta_count) or bool(self._deleted.any())
+
+    @property
+    def needs_compaction(self) -> bool:
+        """True once the delta or tombstones are large relative to the base."""
+
+        base = max(len(self._deleted), 1)
+        return self._delta_count > max(10_000, base // 10) or self._deleted.sum() > base // 4
+
+    def copy(self) -> "IVFIndex":
+        """Return a snapshot sharing the read-only base but not the mutable state."""
+
+        clone = object.__new__(IVFIndex)
+        clone.__dict__.update(self.__dict__)
+        clone._positions = self._positions
+        clone._deleted = self._deleted.copy()
+        clone._delta = self._delta[: self._delta_count].copy()
+        clone._delta_ids = self._delta_ids[: self._delta_count].copy()
+        clone._delta_live = self._delta_live[: self._delta_count].copy()
+        clone._delta_positions = dict(self._delta_positions)
+        return clone
+
+    # ------------------------------------------------------------------ search
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        nprobe: int = DEFAULT_NPROBE,
+        exclude: Iterable[UUID] = (),
+    ) -> List[Tuple[UUID, float]]:
+        """Return up to ``k`` ``(id, cosine similarity)`` pairs, best first."""
+
+        query = normalize(vector)
+        excluded = set(exclude)
+        want = k + len(excluded)
+
+        scores: List[np.ndarray] = []
+        ids: List[np.ndarray] = []
+
+        nlist = len(self.centroids)
+        if nlist and len(self.vectors):
+            probes = min(nprobe, nlist)
+            centroid_scores = self.centroids @ query
+            lists = np.argpartition(-centroid_scores, probes - 1)[:probes]
+            for lst in lists:
+                start, stop = int(self.offsets[lst]), int(self.offsets[lst + 1])
+                if start == stop:
+                    continue
+                block_scores = np.asarray(self.vectors[start:stop]) @ query
+                live = ~self._deleted[start:stop]
+                scores.append(block_scores[live])
+                ids.append(np.asarray(self.ids[start:stop])[live])
+
+        if self._delta_count:
+            live = self._delta_live[: self._delta_count]
+            scores.append((self._delta[: self._delta_count] @ query)[live])
+            ids.append(self._delta_ids[: self._delta_count][live])
+
+        if not scores:
+            return []
+        all_scores = np.concatenate(scores)
+        all_ids = np.concatenate(ids)
+        if len(all_scores) > want:
+            top = np.argpartition(-all_scores, want - 1)[:want]
+        else:
+            top = np.arange(len(all_scores))
+        top = top[np.argsort(-all_scores[top], kind="stable")]
+
+        results: List[Tuple[UUID, float]] = []
+        for idx in top:
+            item_id = UUID(bytes=all_ids[idx].tobytes())
+            if item_id in excluded:
+                continue
+            results.append((item_id, float(all_scores[idx])))
+            if len(results) == k:
+                break
+        return results
+
+    def search_many(
+        self,
+        vectors: np.ndarray,
+        k: int = 10,
+        nprobe: int = DEFAULT_NPROBE,
+        exclude: Optional[Sequence[Optional[UUID]]] = None,
+    ) -> List[List[Tuple[UUID, float]]]:
+        """:meth:`search` for every row of ``vectors`` at once.
+
+        Queries are grouped by the lists they probe, so each probed list is
+        scored against all of its queries with one matrix product.
+        ``exclude[i]`` is an id to leave out of row ``i``'s results.
+        """
+
+        queries = normalize(np.atleast_2d(vectors))
+        count = len(queries)
+        want = k + (1 if exclude is not None else 0)
+        best_scores = np.full((count, want), -np.inf, dtype=np.float32)
+        best_rows = np.full((count, want), -1, dtype=np.int64)
+
+        def merge(members: np.ndarray, scores: np.ndarray, rows: np.ndarray) -> None:
+            merged_scores = np.concatenate([best_scores[members], scores], axis=1)
+            merged_rows = np.concatenate(
+                [best_rows[members], np.broadcast_to(rows, scores.shape)], axis=1
+            )
+            top = np.argpartition(-merged_scores, want - 1, axis=1)[:, :want]
+            best_scores[members] = np.take_along_axis(merged_scores, top, axis=1)
+            best_rows[members] = np.take_along_axis(merged_rows, top, axis=1)
+
+        nlist = len(self.centroids)
+        base_count = len(self.vectors)
+        if count and nlist and base_count:
+            probes = min(nprobe, nlist)
+            lists = np.argpartition(-(queries @ self.centroids.T), probes - 1, axis=1)
+            lists = lists[:, :probes]
+            for lst in np.unique(lists):
+                start, stop = int(self.offsets[lst]), int(self.offsets[lst + 1])
+                if start == stop:
+                    continue
+                members = np.flatnonzero((lists == lst).any(axis=1))
+                scores = queries[members] @ np.asarray(self.vectors[start:stop]).T
+                scores[:, self._deleted[start:stop]] = -np.inf
+                merge(members, scores, np.arange(start, stop))
+
+        if count and self._delta_count:
+            scores = queries @ self._delta[: self._delta_count].T
+            scores[:, ~self._delta_live[: self._delta_count]] = -np.inf
+            merge(np.arange(count), scores, base_count + np.arange(self._delta_count))
+
+        results: List[List[Tuple[UUID, float]]] = []
+        for row in range(count):
+            order = np.argsort(-best_scores[row], kind="stable")
+            skip = exclude[row] if exclude is not None else None
+            found: List[Tuple[UUID, float]] = []
+            for idx in order:
+                score, position = float(best_scores[row, idx]), int(best_rows[row, idx])
+                if position < 0 or score == -np.inf:
+                    break
+                raw = (
+                    self.ids[position]
+                    if position < base_count
+                    else self._delta_ids[position - base_count]
+                )
+                item_id = UUID(bytes=np.asarray(raw).tobytes())
+                if item_id == skip:
+                    continue
+                found.append((item_id, score))
+                if len(found) == k:
+                    break
+            results.append(found)
+        return results
+
+    # ------------------------------------------------------------- persistence
+
+    def compact_to(
+        self,
+        path: str,
+        retrain: Optional[bool] = None,
+        seed: int = 0,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> "IVFIndex":
+        """Merge the delta into a new list-contiguous base written under ``path``.
+
+        Centroids are reused unless the live set has outgrown what they were
+        trained on, so routine compactions only assign the delta rows. Vectors
+        are copied into the new memory-mapped file in blocks; the returned index
+        is re-opened from disk. ``extra`` keys are stored in ``meta.json`` with
+        the base, so they always describe the files beside them.
+
+        Several processes may share ``path``. Each compaction writes temporary
+        files with its own suffix and holds an exclusive lock on
+        ``path/.lock`` until every file is in place, so two never interleave.
+        """
+
+        os.makedirs(path, exist_ok=True)
+        tag = f"{os.getpid()}-{uuid4().hex[:12]}"
+        with _locked(path):
+            try:
+                return self._compact(path, tag, retrain, seed, extra or {})
+            finally:
+                for leftover in glob.glob(os.path.join(path, f"*.{tag}.tmp*")):
+                    os.remove(leftover)
+
+    def _compact(
+        self,
+        path: str,
+        tag: str,
+        retrain: Optional[bool],
+        seed: int,
+        extra: Dict[str, Any],
+    ) -> "IVFIndex":
+        base_rows = np.flatnonzero(~self._deleted)
+        delta_rows = np.flatnonzero(self._delta_live[: self._delta_count])
+        delta_vectors = self._delta[delta_rows]
+        total = len(base_rows) + len(delta_rows)
+        if total == 0:
+            meta_path = os.path.join(path, "meta.json")
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+            return IVFIndex.empty(self.dim)
+
+        if retrain is None:
+            retrain = not len(self.centroids) or total > 4 * max(self.trained_count, 1)
+        if retrain and default_nlist(total) > 1:
+            nlist = default_nlist(total)
+            rng = np.random.default_rng(seed)
+            sample_size = min(total, nlist * _KMEANS_SAMPLE_PER_LIST)
+            picks = np.sort(rng.choice(total, size=sample_size, replace=False))
+            from_base = picks[picks < len(base_rows)]
+            sample = np.concatenate(
+                (
+                    np.asarray(self.vectors[base_rows[from_base]]),
+                    delta_vectors[picks[picks >= len(base_rows)] - len(base_rows)],
+                )
+            )
+            centroids = _kmeans(normalize(sample), nlist, seed=seed)
+            base_assign = _assign(self.vectors, centroids, rows=base_rows)
+            trained_count = total
+        elif retrain or not len(self.centroids):
+            centroids = normalize(np.ones((1, self.dim), dtype=np.float32))
+            base_assign = np.zeros(len(base_rows), dtype=np.int32)
+            trained_count = total
+        else:
+            centroids = self.centroids
+            list_of_row = np.repeat(
+                np.arange(len(centroids), dtype=np.int32), np.diff(self.offsets)
+            )
+            base_assign = list_of_row[base_rows]
+            trained_count = self.trained_count
+
+        delta_assign = _assign(delta_vectors, centroids)
+        assign = np.concatenate((base_assign, delta_assign))
+        # Non-negative sources are base rows; negative ones index the delta.
+        source = np.concatenate((base_rows, -(delta_rows + 1)))
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(assign, minlength=len(centroids))))
+        ).astype(np.int64)
+
+        tmp = {
+            name: os.path.join(path, f"{name}.{tag}.tmp.npy")
+            for name in ("vectors", "ids", "centroids", "offsets")
+        }
+        vectors_tmp, ids_tmp = tmp["vectors"], tmp["ids"]
+        out_vectors = np.lib.format.open_memmap(
+            vectors_tmp, mode="w+", dtype=np.float32, shape=(total, self.dim)
+        )
+        out_ids = np.lib.format.open_memmap(ids_tmp, mode="w+", dtype=np.uint8, shape=(total, 16))
+        for start in range(0, total, _ASSIGN_BLOCK):
+            stop = min(start + _ASSIGN_BLOCK, total)
+            src = source[order[start:stop]]
+            is_base = src >= 0
+            block_vectors = np.empty((stop - start, self.dim), dtype=np.float32)
+            block_ids = np.empty((stop - start, 16), dtype=np.uint8)
+            block_vectors[is_base] = self.vectors[src[is_base]]
+            block_ids[is_base] = self.ids[src[is_base]]
+            delta_src = -src[~is_base] - 1
+            block_vectors[~is_base] = self._delta[delta_src]
+            block_ids[~is_base] = self._delta_ids[delta_src]
+            out_vectors[start:stop] = block_vectors
+            out_ids[start:stop] = block_ids
+        out_vectors.flush()
+        out_ids.flush()
+        del out_vectors, out_ids
+
+        np.save(tmp["centroids"], centroids)
+        np.save(tmp["offsets"], offsets)
+        for name, written in tmp.items():
+            os.replace(written, os.path.join(path, f"{name}.npy"))
+        return self._finish_save(path, tag, total, trained_count, extra)
+
+    def _finish_save(
+        self, path: str, tag: str, count: int, trained_count: int, extra: Dict[str, Any]
+    ) -> "IVFIndex":
+        meta = {
+            **extra,
+            "version": _FORMAT_VERSION,
+            "dim": self.dim,
+            "count": count,
+            "trained_count": trained_count,
+        }
+        fd, meta_tmp = tempfile.mkstemp(dir=path, prefix="meta.json.", suffix=f".{tag}.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(meta, handle)
+        os.replace(meta_tmp, os.path.join(path, "meta.json"))
+        loaded = IVFIndex.load(path)
+        if loaded is None:
+            raise RuntimeError(f"Index written to {path!r} could not be re-opened")
+        return loaded
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IVFIndex"]:
+        """Open a persisted index, memory-mapping its vectors.
+
+        Returns ``None`` when nothing usable is on disk (missing files, format
+        change or a partially written index).
+        """
+
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as handle:
+                meta = json.load(handle)
+            if meta.get("version") != _FORMAT_VERSION:
+                return None
+            vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+            ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+            centroids = np.load(os.path.join(path, "centroids.npy"))
+            offsets = np.load(os.path.join(path, "offsets.npy"))
+        except (OSError, ValueError):
+            return None
+
+        dim = int(meta["dim"])
+        count = int(meta["count"])
+        if vectors.shape != (count, dim) or ids.shape != (count, 16) or offsets[-1] != count:
+            return None
+        return cls(
+            dim=dim,
+            centroids=centroids,
+            vectors=vectors,
+            ids=ids,
+            offsets=offsets,
+            trained_count=int(meta["trained_count"]),
+        )
+
+
+__all__ = ["DEFAULT_NPROBE", "IVFIndex", "default_nlist", "normalize"]
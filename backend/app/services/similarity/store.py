@@ -0,0 +1,349 @@
+"""Process-wide similarity index over note embeddings.
+
+A note's vector is its ``TextContent.embedding`` or, for table notes, the mean
+of its ``TableRow.embedding`` values. The index is opened from disk at startup
+and caught up with rows changed since it was last persisted; only when nothing
+usable is on disk is it rebuilt from the database.
+
+Embeddings are usually written by another process (the embedding worker CLI),
+so :meth:`NoteSimilarityIndex.run` re-reads rows changed since the watermark
+every ``SIMILARITY_CATCH_UP_SECONDS`` and drops notes that lost their embedding.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import exists, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ...db.models import TableContent, TableRow, TextContent
+from .ivf import DEFAULT_NPROBE, IVFIndex
+from .vectors import decode_embedding
+
+INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", os.path.join(".", ".similarity_index"))
+SIMILARITY_CATCH_UP_SECONDS = float(os.getenv("SIMILARITY_CATCH_UP_SECONDS", "30"))
+_LOAD_BATCH = 5000
+# Rows committed slightly out of ``updated_at`` order are re-read on catch-up.
+_CATCH_UP_MARGIN = timedelta(minutes=5)
+
+logger = logging.getLogger(__name__)
+
+NoteVector = Tuple[UUID, Optional[np.ndarray], datetime]
+
+
+async def _text_vectors(
+    session: AsyncSession,
+    since: Optional[datetime] = None,
+    note_ids: Optional[List[UUID]] = None,
+) -> AsyncIterator[NoteVector]:
+    stmt = select(TextContent.note_id, TextContent.embedding, TextContent.updated_at)
+    if note_ids is not None:
+        stmt = stmt.where(TextContent.note_id.in_(note_ids))
+    else:
+        stmt = stmt.where(TextContent.embedding.isnot(None))
+        if since is not None:
+            stmt = stmt.where(TextContent.updated_at > since)
+
+    result = await session.stream(stmt.execution_options(yield_per=_LOAD_BATCH))
+    async for note_id, embedding, updated_at in result:
+        yield note_id, decode_embedding(embedding), updated_at
+
+
+async def _table_vectors(
+    session: AsyncSession,
+    since: Optional[datetime] = None,
+    note_ids: Optional[List[UUID]] = None,
+) -> AsyncIterator[NoteVector]:
+    """Yield the mean row embedding of each table note, one note at a time."""
+
+    stmt = select(TableRow.table_note_id, TableRow.embedding, TableRow.updated_at).where(
+        TableRow.embedding.isnot(None)
+    )
+    if note_ids is not None:
+        stmt = stmt.where(TableRow.table_note_id.in_(note_ids))
+    elif since is not None:
+        changed = select(TableRow.table_note_id).where(TableRow.updated_at > since)
+        stmt = stmt.where(TableRow.table_note_id.in_(changed))
+    stmt = stmt.order_by(TableRow.table_note_id)
+
+    current: Optional[UUID] = None
+    total: Optional[np.ndarray] = None
+    count = 0
+    latest: Optional[datetime] = None
+
+    result = await session.stream(stmt.execution_options(yield_per=_LOAD_BATCH))
+    async for note_id, embedding, updated_at in result:
+        vector = decode_embedding(embedding)
+        if vector is None:
+            continue
+        if note_id != current:
+            if current is not None and total is not None:
+                yield current, total / count, latest
+            current, total, count, latest = note_id, np.zeros_like(vector), 0, updated_at
+        if total is None or vector.shape != total.shape:
+            continue
+        total += vector
+        count += 1
+        latest = max(latest, updated_at) if latest is not None else updated_at
+
+    if current is not None and total is not None and count:
+        yield current, total / count, latest
+
+
+async def _embedded_note_ids(session: AsyncSession) -> Set[UUID]:
+    """Ids of every note that currently has a vector."""
+
+    has_rows = exists().where(
+        TableRow.table_note_id == TableContent.note_id, TableRow.embedding.isnot(None)
+    )
+    stmt = union_all(
+        select(TextContent.note_id).where(TextContent.embedding.isnot(None)),
+        select(TableContent.note_id).where(has_rows),
+    )
+    result = await session.stream(stmt.execution_options(yield_per=_LOAD_BATCH))
+    return {note_id async for (note_id,) in result}
+
+
+class NoteSimilarityIndex:
+    """Thread-safe holder for the active :class:`IVFIndex`.
+
+    Mutations made while a compaction runs in a worker thread are journalled
+    and replayed onto the compacted index before it is swapped in.
+    """
+
+    def __init__(self, path: str = INDEX_DIR, nprobe: int = DEFAULT_NPROBE) -> None:
+        self.path = path
+        self.nprobe = nprobe
+        self.watermark: Optional[datetime] = None
+        self._index: Optional[IVFIndex] = None
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._journal: Optional[List[Tuple[UUID, Optional[np.ndarray]]]] = None
+        self._compacting = False
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index) if self._index is not None else 0
+
+    # ----------------------------------------------------------------- loading
+
+    async def load(self, session: AsyncSession) -> None:
+        """Open the persisted index and catch it up, or build it from scratch."""
+
+        # Read before the base: if another process replaces both in between, an
+        # older watermark only means re-reading more rows.
+        since = self._read_watermark()
+        index = await asyncio.to_thread(IVFIndex.load, self.path)
+        if index is not None:
+            with self._lock:
+                self._index = index
+            self._advance_watermark(since)
+            await self._apply(session, since - _CATCH_UP_MARGIN if since else None)
+            logger.info("Loaded similarity index with %d vectors from %s", len(self), self.path)
+        else:
+            ids: List[UUID] = []
+            vectors: List[np.ndarray] = []
+            async for note_id, vector, updated_at in self._all_vectors(session):
+                if vector is None or (vectors and vector.shape != vectors[0].shape):
+                    continue
+                ids.append(note_id)
+                vectors.append(vector)
+                self._advance_watermark(updated_at)
+            if ids:
+                trained = await asyncio.to_thread(IVFIndex.train, ids, np.stack(vectors))
+                with self._lock:
+                    self._index = trained
+                await self.compact()
+            logger.info("Built similarity index with %d vectors", len(ids))
+        self._loaded = True
+
+    async def _all_vectors(
+        self, session: AsyncSession, since: Optional[datetime] = None
+    ) -> AsyncIterator[NoteVector]:
+        async for item in _text_vectors(session, since=since):
+            yield item
+        async for item in _table_vectors(session, since=since):
+            yield item
+
+    async def catch_up(self, session: AsyncSession) -> None:
+        """Apply vectors changed since the watermark and drop notes that lost theirs."""
+
+        since = self.watermark - _CATCH_UP_MARGIN if self.watermark else None
+        await self._apply(session, since)
+        # Snapshot the index before reading the database, so a note embedded
+        # in between is never mistaken for one whose embedding is gone.
+        with self._lock:
+            live = self._index.live_ids() if self._index is not None else set()
+        for note_id in live - await _embedded_note_ids(session):
+            self.remove(note_id)
+        self._schedule_compaction()
+
+    async def run(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        interval: float = SIMILARITY_CATCH_UP_SECONDS,
+    ) -> None:
+        """Catch up every ``interval`` seconds until cancelled."""
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as session:
+                    await self.catch_up(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Similarity index catch-up failed")
+
+    async def _apply(self, session: AsyncSession, since: Optional[datetime]) -> None:
+        async for note_id, vector, updated_at in self._all_vectors(session, since=since):
+            if vector is not None:
+                self._upsert_safely(note_id, vector)
+            self._advance_watermark(updated_at)
+
+    async def refresh(self, session: AsyncSession, note_ids: Iterable[UUID]) -> None:
+        """Re-read the vectors of ``note_ids`` and apply them to the index.
+
+        Notes that no longer have an embedding (or no longer exist) are removed.
+        """
+
+        ids = list(note_ids)
+        if not ids:
+            return
+
+        seen = set()
+        sources = (_text_vectors(session, note_ids=ids), _table_vectors(session, note_ids=ids))
+        for source in sources:
+            async for note_id, vector, updated_at in source:
+                if vector is None:
+                    continue
+                self._upsert_safely(note_id, vector)
+                self._advance_watermark(updated_at)
+                seen.add(note_id)
+        for note_id in ids:
+            if note_id not in seen:
+                self.remove(note_id)
+        self._schedule_compaction()
+
+    def _schedule_compaction(self) -> None:
+        if self._index is not None and self._index.needs_compaction and not self._compacting:
+            asyncio.get_running_loop().create_task(self.compact())
+
+    # ---------------------------------------------------------------- mutation
+
+    def upsert(self, note_id: UUID, vector: np.ndarray) -> None:
+        with self._lock:
+            if self._index is None:
+                self._index = IVFIndex.empty(int(np.asarray(vector).shape[0]))
+            self._index.upsert(note_id, vector)
+            if self._journal is not None:
+                self._journal.append((note_id, np.asarray(vector, dtype=np.float32)))
+
+    def remove(self, note_id: UUID) -> None:
+        with self._lock:
+            if self._index is None:
+                return
+            self._index.remove(note_id)
+            if self._journal is not None:
+                self._journal.append((note_id, None))
+
+    def _upsert_safely(self, note_id: UUID, vector: np.ndarray) -> None:
+        try:
+            self.upsert(note_id, vector)
+        except ValueError:
+            logger.warning("Skipping embedding for note %s with mismatched dimension", note_id)
+
+    def _advance_watermark(self, updated_at: Optional[datetime]) -> None:
+        if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+            self.watermark = updated_at
+
+    # ------------------------------------------------------------------ search
+
+    def vector(self, note_id: UUID) -> Optional[np.ndarray]:
+        with self._lock:
+            return self._index.get(note_id) if self._index is not None else None
+
+    def search(
+        self, vector: np.ndarray, k: int = 10, exclude: Iterable[UUID] = ()
+    ) -> List[Tuple[UUID, float]]:
+        with self._lock:
+            if self._index is None:
+                return []
+            return self._index.search(vector, k=k, nprobe=self.nprobe, exclude=exclude)
+
+    def search_many(
+        self,
+        vectors: np.ndarray,
+        k: int = 10,
+        exclude: Optional[Sequence[Optional[UUID]]] = None,
+    ) -> List[List[Tuple[UUID, float]]]:
+        with self._lock:
+            if self._index is None:
+                return [[] for _ in range(len(vectors))]
+            return self._index.search_many(vectors, k=k, nprobe=self.nprobe, exclude=exclude)
+
+    # ------------------------------------------------------------- persistence
+
+    async def compact(self) -> None:
+        """Fold pending changes into the on-disk base off the event loop."""
+
+        if self._compacting:
+            return
+        with self._lock:
+            if self._index is None:
+                return
+            # With nothing new, the base on disk (possibly written by another
+            # process) and the watermark stored with it are left as they are.
+            if not self._index.dirty and os.path.exists(os.path.join(self.path, "meta.json")):
+                return
+            snapshot = self._index.copy()
+            watermark = self.watermark
+            self._journal = []
+            self._compacting = True
+
+        extra = {"watermark": watermark.isoformat() if watermark else None}
+        try:
+            compacted = await asyncio.to_thread(snapshot.compact_to, self.path, extra=extra)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        finally:
+            self._compacting = False
+
+        with self._lock:
+            journal, self._journal = self._journal or [], None
+            for note_id, vector in journal:
+                if vector is None:
+                    compacted.remove(note_id)
+                else:
+                    compacted.upsert(note_id, vector)
+            self._index = compacted
+
+    def _read_watermark(self) -> Optional[datetime]:
+        """The watermark stored with the base in ``meta.json`` by :meth:`compact`."""
+
+        try:
+            with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as handle:
+                value = json.load(handle).get("watermark")
+        except (OSError, ValueError):
+            return None
+        return datetime.fromisoformat(value) if value else None
+
+
+note_index = NoteSimilarityIndex()
+
+__all__ = ["INDEX_DIR", "NoteSimilarityIndex", "SIMILARITY_CATCH_UP_SECONDS", "note_index"]
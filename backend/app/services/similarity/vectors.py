@@ -0,0 +1,43 @@
+"""Encoding of embedding vectors stored in the JSONB ``embedding`` columns."""
+
+from __future__ import annotations
+
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+
+def encode_embedding(
+    vector: Sequence[float] | np.ndarray, model: str, content_hash: Optional[str] = None
+) -> dict:
+    """Return the JSON payload persisted in ``TextContent``/``TableRow.embedding``."""
+
+    values = np.asarray(vector, dtype=np.float32)
+    payload: dict[str, Any] = {
+        "model": model,
+        "dim": int(values.shape[0]),
+        "vector": values.tolist(),
+    }
+    if content_hash is not None:
+        payload["content_hash"] = content_hash
+    return payload
+
+
+def decode_embedding(payload: Any) -> Optional[np.ndarray]:
+    """Return the float32 vector held in an ``embedding`` payload, if any.
+
+    Accepts the mapping written by :func:`encode_embedding` as well as a bare
+    list of floats.
+    """
+
+    if isinstance(payload, dict):
+        payload = payload.get("vector")
+    if not isinstance(payload, list) or not payload:
+        return None
+    try:
+        return np.asarray(payload, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+
+
+__all__ = ["decode_embedding", "encode_embedding"]
@@ -0,0 +1,278 @@
+"""Slow-query log with query plans captured in the background.
+
+Every SQL statement that runs longer than ``SLOW_QUERY_MS`` is recorded,
+together with its parameters and the route that issued it, in a bounded
+ring buffer (``GET /admin/slow-queries``). When ``SLOW_QUERY_FILE`` is set,
+each entry is also appended to that file as one JSON line.
+
+Plans are captured off the request path. The statement hook only queues
+the entry. :meth:`SlowQueryLog.run` later re-runs read-only statements
+under ``EXPLAIN`` on a connection of its own, inside a ``READ ONLY``
+transaction with a statement timeout. A plan is reused for the same SQL
+text for ``SLOW_QUERY_EXPLAIN_INTERVAL`` seconds, so a hot slow query costs
+one extra execution per interval, not one per occurrence.
+
+=================================  ========  ====================================
+``SLOW_QUERY_MS``                  200       threshold; ``0`` disables the log
+``SLOW_QUERY_LOG_SIZE``            200       entries kept in memory
+``SLOW_QUERY_FILE``                unset     JSONL file that entries are appended to
+``SLOW_QUERY_ANALYZE``             1         ``EXPLAIN (ANALYZE, BUFFERS)`` rather
+                                             than the planner estimate alone
+``SLOW_QUERY_EXPLAIN_TIMEOUT_MS``  5000      statement timeout for the re-run
+``SLOW_QUERY_EXPLAIN_INTERVAL``    300       seconds a captured plan is reused
+=================================  ========  ====================================
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .metrics import current_request_stats
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+SLOW_QUERY_FILE = os.getenv("SLOW_QUERY_FILE") or None
+SLOW_QUERY_ANALYZE = os.getenv("SLOW_QUERY_ANALYZE", "1") == "1"
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+_QUEUE_SIZE = 100
+_PARAMETER_CHARS = 200
+_STATEMENT_CHARS = 10_000
+_MAX_PLANS = 500
+
+logger = logging.getLogger(__name__)
+
+_READ_ONLY = re.compile(r"^\s*(select|with|values)\b", re.IGNORECASE)
+_WRITES = re.compile(
+    r"\b(insert|update|delete|merge)\b|\bfor\s+(no\s+key\s+)?(update|share)\b", re.IGNORECASE
+)
+
+
+@dataclass
+class SlowQuery:
+    """One statement that crossed the threshold."""
+
+    at: str
+    seconds: float
+    statement: str
+    parameters: List[str]
+    rows: int
+    method: Optional[str] = None
+    route: Optional[str] = None
+    plan: Optional[List[str]] = None
+    plan_error: Optional[str] = None
+    # Driver parameters for the EXPLAIN re-run; not serialized.
+    raw_parameters: Any = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.repr}
+
+
+def _parameter(value: Any) -> str:
+    text = repr(value)
+    if len(text) > _PARAMETER_CHARS:
+        text = text[: _PARAMETER_CHARS - 3] + "..."
+    return text
+
+
+def explainable(statement: str) -> bool:
+    """Whether ``statement`` only reads, so re-running it under EXPLAIN is harmless."""
+
+    return bool(_READ_ONLY.match(statement)) and not _WRITES.search(statement)
+
+
+class SlowQueryLog:
+    """Ring buffer of slow statements plus the queue of plans to capture."""
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        size: int = SLOW_QUERY_LOG_SIZE,
+        path: Optional[str] = SLOW_QUERY_FILE,
+        analyze: bool = SLOW_QUERY_ANALYZE,
+    ) -> None:
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self.analyze = analyze
+        self.recorded = self.dropped = self.explained = 0
+        self._entries: Deque[SlowQuery] = deque(maxlen=max(size, 1))
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue[SlowQuery]] = None
+        self._plans: Dict[str, Tuple[float, List[str]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def observe(
+        self, statement: str, parameters: Any, seconds: float, rows: int, executemany: bool
+    ) -> None:
+        """Record ``statement`` if it took longer than the threshold."""
+
+        if not self.enabled or seconds < self.threshold:
+            return
+        stats = current_request_stats()
+        if executemany:
+            shown = [f"<{len(parameters)} parameter sets>"]
+        else:
+            values = parameters.values() if isinstance(parameters, dict) else parameters or ()
+            shown = [_parameter(value) for value in values]
+        entry = SlowQuery(
+            at=datetime.now(timezone.utc).isoformat(),
+            seconds=round(seconds, 6),
+            statement=statement[:_STATEMENT_CHARS],
+            parameters=shown,
+            rows=rows,
+            method=stats.method if stats is not None else None,
+            route=stats.route if stats is not None else None,
+        )
+        if executemany:
+            entry.plan_error = "executemany statements are not explained"
+        else:
+            entry.raw_parameters = parameters
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+        logger.warning(
+            "Slow query (%.0f ms) from %s: %s",
+            seconds * 1000,
+            entry.route or "<no request>",
+            statement[:200],
+        )
+        if self._queue is None or entry.plan_error is not None:
+            self._write(entry)
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self._write(entry)
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Recorded entries, newest first."""
+
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return [entry.to_dict() for entry in entries[:limit]]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self._plans.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "entries": len(self._entries),
+            "recorded": self.recorded,
+            "explained": self.explained,
+            "dropped": self.dropped,
+        }
+
+    async def run(self, engine: AsyncEngine) -> None:
+        """Capture plans for queued entries until cancelled."""
+
+        self._queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        try:
+            while True:
+                entry = await self._queue.get()
+                try:
+                    await self._explain(engine, entry)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:  # the entry is still logged, just without a plan
+                    entry.plan_error = f"{type(exc).__name__}: {exc}"
+                entry.raw_parameters = None
+                self._write(entry)
+        finally:
+            self._queue = None
+
+    async def _explain(self, engine: AsyncEngine, entry: SlowQuery) -> None:
+        if not explainable(entry.statement):
+            entry.plan_error = "only read-only statements are explained"
+            return
+
+        now = time.monotonic()
+        cached = self._plans.get(entry.statement)
+        if cached is not None and now - cached[0] < SLOW_QUERY_EXPLAIN_INTERVAL:
+            entry.plan = cached[1]
+            return
+
+        options = "ANALYZE, BUFFERS" if self.analyze else "COSTS"
+        async with engine.connect() as conn:
+            await conn.execution_options(slow_query_log=False)
+            await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            await conn.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {int(SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}"
+            )
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN ({options}) {entry.statement}", entry.raw_parameters or ()
+            )
+            plan = [row[0] for row in result]
+            await conn.rollback()
+
+        if len(self._plans) >= _MAX_PLANS:
+            self._plans.clear()
+        self._plans[entry.statement] = (now, plan)
+        entry.plan = plan
+        self.explained += 1
+
+    def _write(self, entry: SlowQuery) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(entry.to_dict(), default=str) + "\n")
+        except OSError:
+            logger.exception("Failed to append to the slow query file %s", self.path)
+
+
+slow_query_log = SlowQueryLog()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn: Any, *_: Any) -> None:
+    if slow_query_log.enabled and conn.get_execution_options().get("slow_query_log", True):
+        conn.info["slow_query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    started = conn.info.pop("slow_query_started", None)
+    if started is None:
+        return
+    rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+    slow_query_log.observe(
+        statement, parameters, time.perf_counter() - started, rows, executemany
+    )
+
+
+__all__ = [
+    "SLOW_QUERY_MS",
+    "SlowQuery",
+    "SlowQueryLog",
+    "explainable",
+    "slow_query_log",
+]
@@ -0,0 +1,64 @@
+"""Table notes: column schemas, bulk row ingestion and row queries."""
+
+from .ingest import (
+    DEFAULT_BATCH_SIZE,
+    TABLE_FORMATS,
+    IngestReport,
+    TableIngestor,
+    TableNotFoundError,
+    TableSource,
+    csv_source,
+    parquet_available,
+    parquet_source,
+)
+from .columnar import (
+    ColumnarCache,
+    ColumnarSnapshot,
+    columnar_cache,
+    evaluate,
+    histogram,
+)
+from .indexes import ExpressionIndexAdvisor, table_index_advisor
+from .query import (
+    AGGREGATE_FNS,
+    FILTER_OPS,
+    MAX_QUERY_LIMIT,
+    QueryError,
+    QueryTimeoutError,
+    TableQueryResult,
+    load_table_schema,
+    query_rows,
+)
+from .schema import COLUMN_TYPES, Column, SchemaError, parse_schema, to_schema_json
+
+__all__ = [
+    "AGGREGATE_FNS",
+    "COLUMN_TYPES",
+    "Column",
+    "ColumnarCache",
+    "ColumnarSnapshot",
+    "DEFAULT_BATCH_SIZE",
+    "ExpressionIndexAdvisor",
+    "FILTER_OPS",
+    "IngestReport",
+    "MAX_QUERY_LIMIT",
+    "QueryError",
+    "QueryTimeoutError",
+    "SchemaError",
+    "TABLE_FORMATS",
+    "TableIngestor",
+    "TableNotFoundError",
+    "TableQueryResult",
+    "TableSource",
+    "columnar_cache",
+    "csv_source",
+    "evaluate",
+    "histogram",
+    "load_table_schema",
+    "parquet_available",
+    "parquet_source",
+    "parse_schema",
+    "query_rows",
+    "table_index_advisor",
+    "to_schema_json",
+]
@@ -0,0 +1,580 @@
+"""In-memory columnar snapshots of table notes with vectorised aggregates.
+
+A snapshot holds one NumPy array per column, typed from ``schema_json``,
+plus a validity mask. Integers are stored as ``int64``, numbers as
+``float64``, booleans as ``bool`` and dates/datetimes as ``datetime64``.
+Strings are dictionary-encoded to ``int32`` codes. Dashboards that re-run
+aggregates over the same table then work on these arrays instead of
+re-parsing ``row_data`` JSONB on every query.
+
+Snapshots are built lazily on first use and kept in a byte-bounded LRU. Each
+use re-reads the table's ``row_count`` and schema, one primary-key lookup,
+to check the snapshot is still current. When rows were appended, only rows
+past the snapshot's highest ``position`` are fetched and concatenated. If the
+counts still disagree, for example because an older transaction committed
+late, the snapshot is rebuilt.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.models import TableContent, TableRow
+from .query import MAX_IN_VALUES, QueryError, column_expression, json_value, table_predicate
+from .schema import Column, parse_schema
+
+COLUMNAR_CACHE_MAX_BYTES = int(os.getenv("COLUMNAR_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+_LOAD_BATCH = 10_000
+# Rough per-cell cost used to decide up front whether a table fits the cache.
+_ESTIMATED_CELL_BYTES = 10
+
+_EMPTY: Dict[str, np.ndarray] = {
+    "integer": np.empty(0, dtype=np.int64),
+    "number": np.empty(0, dtype=np.float64),
+    "boolean": np.empty(0, dtype=np.bool_),
+    "date": np.empty(0, dtype="datetime64[D]"),
+    "datetime": np.empty(0, dtype="datetime64[us]"),
+    "string": np.empty(0, dtype=np.int32),
+}
+_COMPARE = {
+    "lt": np.less,
+    "lte": np.less_equal,
+    "gt": np.greater,
+    "gte": np.greater_equal,
+}
+
+
+class ColumnData:
+    """Values, validity mask and (for strings) the dictionary of one column."""
+
+    __slots__ = ("kind", "values", "valid", "categories", "lookup")
+
+    def __init__(
+        self,
+        kind: str,
+        values: np.ndarray,
+        valid: np.ndarray,
+        categories: Optional[List[str]] = None,
+        lookup: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.kind = kind
+        self.values = values
+        self.valid = valid
+        self.categories = categories
+        self.lookup = lookup
+
+    @property
+    def nbytes(self) -> int:
+        size = self.values.nbytes + self.valid.nbytes
+        if self.categories is not None:
+            size += sum(len(item) + 100 for item in self.categories)
+        return size
+
+    def decode(self, value: Any) -> Any:
+        """Turn one stored array value back into a JSON-friendly Python value."""
+
+        if self.kind == "string":
+            return self.categories[int(value)] if value >= 0 else None  # type: ignore[index]
+        if self.kind == "integer":
+            return int(value)
+        if self.kind == "number":
+            return float(value)
+        if self.kind == "boolean":
+            return bool(value)
+        if self.kind == "date":
+            return np.datetime64(value, "D").item()
+        return np.datetime64(value, "us").item().replace(tzinfo=timezone.utc)
+
+
+class _ColumnBuilder:
+    """Encode fetched values chunk by chunk, optionally extending ``base``."""
+
+    def __init__(self, kind: str, base: Optional[ColumnData] = None) -> None:
+        self.kind = kind
+        self.base = base
+        self.chunks: List[np.ndarray] = [] if base is None else [base.values]
+        self.valid: List[np.ndarray] = [] if base is None else [base.valid]
+        self.categories = list(base.categories) if base and base.categories is not None else []
+        self.lookup = dict(base.lookup) if base and base.lookup is not None else {}
+
+    def add(self, raw: Sequence[Any]) -> None:
+        count = len(raw)
+        self.valid.append(np.fromiter((value is not None for value in raw), np.bool_, count))
+        kind = self.kind
+        if kind == "string":
+            codes = np.empty(count, dtype=np.int32)
+            lookup, categories = self.lookup, self.categories
+            for index, value in enumerate(raw):
+                if value is None:
+                    codes[index] = -1
+                    continue
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(categories)
+                    categories.append(value)
+                codes[index] = code
+            self.chunks.append(codes)
+        elif kind == "integer":
+            self.chunks.append(np.fromiter((v or 0 for v in raw), np.int64, count))
+        elif kind == "number":
+            self.chunks.append(
+                np.fromiter((np.nan if v is None else v for v in raw), np.float64, count)
+            )
+        elif kind == "boolean":
+            self.chunks.append(np.fromiter((bool(v) for v in raw), np.bool_, count))
+        elif kind == "date":
+            self.chunks.append(np.array(raw, dtype="datetime64[D]"))
+        else:
+            self.chunks.append(
+                np.array(
+                    [
+                        None if v is None else v.astimezone(timezone.utc).replace(tzinfo=None)
+                        for v in raw
+                    ],
+                    dtype="datetime64[us]",
+                )
+            )
+
+    def finish(self) -> ColumnData:
+        values = np.concatenate(self.chunks) if self.chunks else _EMPTY[self.kind]
+        valid = np.concatenate(self.valid) if self.valid else np.empty(0, dtype=np.bool_)
+        if self.kind == "string":
+            return ColumnData(self.kind, values, valid, self.categories, self.lookup)
+        return ColumnData(self.kind, values, valid)
+
+
+class ColumnarSnapshot:
+    """All rows of one table note as typed column arrays."""
+
+    def __init__(
+        self,
+        note_id: UUID,
+        schema: List[Column],
+        columns: Dict[str, ColumnData],
+        row_count: int,
+        position: int,
+    ) -> None:
+        self.note_id = note_id
+        self.schema = schema
+        self.columns = columns
+        self.row_count = row_count
+        # Highest ``TableRow.position`` loaded; appends are read from here on.
+        self.position = position
+        self.nbytes = sum(column.nbytes for column in columns.values())
+
+    def column(self, name: Any) -> Tuple[Column, ColumnData]:
+        for column in self.schema:
+            if column.name == name:
+                return column, self.columns[name]
+        raise QueryError(f"unknown column {name!r}")
+
+
+async def _load(
+    session: AsyncSession,
+    note_id: UUID,
+    schema: List[Column],
+    base: Optional[ColumnarSnapshot] = None,
+) -> ColumnarSnapshot:
+    """Build a snapshot, or extend ``base`` with rows appended after it."""
+
+    builders = [
+        _ColumnBuilder(column.type, base.columns[column.name] if base else None)
+        for column in schema
+    ]
+    stmt = select(
+        TableRow.position, *(column_expression(column) for column in schema)
+    ).where(table_predicate(note_id))
+    if base is not None:
+        stmt = stmt.where(TableRow.position > base.position)
+
+    position = base.position if base else 0
+    loaded = base.row_count if base else 0
+    result = await session.stream(stmt.execution_options(yield_per=_LOAD_BATCH))
+    async for rows in result.partitions():
+        position = max(position, max(row[0] for row in rows))
+        for index, builder in enumerate(builders, start=1):
+            builder.add([row[index] for row in rows])
+        loaded += len(rows)
+
+    columns = {column.name: builder.finish() for column, builder in zip(schema, builders)}
+    return ColumnarSnapshot(note_id, schema, columns, loaded, position)
+
+
+class ColumnarCache:
+    """Byte-bounded LRU of :class:`ColumnarSnapshot` objects keyed by note id."""
+
+    def __init__(self, max_bytes: int = COLUMNAR_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[UUID, ColumnarSnapshot]" = OrderedDict()
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+        self._bytes = 0
+        self.hits = self.misses = self.patches = self.evictions = 0
+
+    def fits(self, row_count: int, column_count: int) -> bool:
+        """Whether a table of this shape is expected to fit in the cache."""
+
+        return row_count * max(column_count, 1) * _ESTIMATED_CELL_BYTES <= self.max_bytes
+
+    async def get(self, session: AsyncSession, note_id: UUID) -> Optional[ColumnarSnapshot]:
+        """Return a current snapshot of ``note_id``; ``None`` if it is not a table."""
+
+        row = (
+            await session.execute(
+                select(TableContent.schema_json, TableContent.row_count).where(
+                    TableContent.note_id == note_id
+                )
+            )
+        ).first()
+        if row is None:
+            self.invalidate(note_id)
+            return None
+        schema, row_count = parse_schema(row.schema_json), row.row_count
+
+        lock = self._locks.setdefault(note_id, asyncio.Lock())
+        async with lock:
+            snapshot = self._entries.get(note_id)
+            if snapshot is not None and snapshot.schema == schema:
+                if snapshot.row_count == row_count:
+                    self.hits += 1
+                    self._entries.move_to_end(note_id)
+                    return snapshot
+                if snapshot.row_count < row_count:
+                    patched = await _load(session, note_id, schema, base=snapshot)
+                    if patched.row_count == row_count:
+                        self.patches += 1
+                        self._store(patched)
+                        return patched
+
+            self.misses += 1
+            snapshot = await _load(session, note_id, schema)
+            self._store(snapshot)
+            return snapshot
+
+    def _store(self, snapshot: ColumnarSnapshot) -> None:
+        self._discard(snapshot.note_id)
+        if snapshot.nbytes > self.max_bytes:
+            return
+        self._entries[snapshot.note_id] = snapshot
+        self._bytes += snapshot.nbytes
+        while self._bytes > self.max_bytes and self._entries:
+            evicted_id, _ = next(iter(self._entries.items()))
+            self._discard(evicted_id)
+            self.evictions += 1
+
+    def _discard(self, note_id: UUID) -> None:
+        snapshot = self._entries.pop(note_id, None)
+        if snapshot is not None:
+            self._bytes -= snapshot.nbytes
+
+    def invalidate(self, note_id: UUID) -> None:
+        self._discard(note_id)
+        lock = self._locks.get(note_id)
+        if lock is not None and not lock.locked():
+            del self._locks[note_id]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "patches": self.patches,
+            "evictions": self.evictions,
+        }
+
+
+# ----------------------------------------------------------------- evaluation
+
+
+def _native(column: Column, data: ColumnData, value: Any) -> Any:
+    """``value`` in the array representation of ``data`` (``None`` if absent)."""
+
+    coerced = json_value(column, value)
+    if column.type == "string":
+        return data.lookup.get(coerced) if data.lookup is not None else None
+    if column.type == "date":
+        return np.datetime64(coerced, "D")
+    if column.type == "datetime":
+        moment = datetime.fromisoformat(coerced)
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return np.datetime64(moment, "us")
+    return coerced
+
+
+def filter_mask(snapshot: ColumnarSnapshot, filters: Sequence[Mapping[str, Any]]) -> np.ndarray:
+    """Boolean row mask for ``filters``, with the row query API's semantics."""
+
+    mask = np.ones(snapshot.row_count, dtype=np.bool_)
+    for spec in filters:
+        column, data = snapshot.column(spec.get("column"))
+        op = spec.get("op", "eq")
+        value = spec.get("value")
+        if op == "is_null":
+            mask &= ~data.valid
+        elif op == "not_null":
+            mask &= data.valid
+        elif op in ("eq", "ne", "in"):
+            if op == "in":
+                if not isinstance(value, list) or not value:
+                    raise QueryError(f"'in' on {column.name!r} needs a non-empty list")
+                if len(value) > MAX_IN_VALUES:
+                    raise QueryError(f"'in' accepts at most {MAX_IN_VALUES} values")
+                targets = [_native(column, data, item) for item in value]
+            else:
+                targets = [_native(column, data, value)]
+            targets = [target for target in targets if target is not None]
+            hit = data.valid & np.isin(data.values, targets) if targets else np.zeros_like(mask)
+            mask &= ~hit if op == "ne" else hit
+        elif op == "contains":
+            if column.type != "string" or not isinstance(value, str):
+                raise QueryError(f"'contains' needs a string column and value: {column.name!r}")
+            needle = value.lower()
+            codes = [i for i, item in enumerate(data.categories or []) if needle in item.lower()]
+            mask &= data.valid & np.isin(data.values, codes)
+        elif op in ("lt", "lte", "gt", "gte"):
+            if column.type in ("boolean", "string"):
+                raise QueryError(
+                    f"the columnar engine cannot range-filter {column.type} {column.name!r}"
+                )
+            bound = _native(column, data, value)
+            mask &= data.valid & _COMPARE[op](data.values, bound)
+        else:
+            raise QueryError(f"unknown filter op {op!r}")
+    return mask
+
+
+def _factorize(data: ColumnData, rows: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Dense group codes for ``data`` restricted to ``rows``; nulls form one group."""
+
+    values, valid = data.values[rows], data.valid[rows]
+    if data.kind == "number":
+        values = np.where(valid, values, 0.0)
+    elif data.kind in ("date", "datetime"):
+        values = values.view(np.int64)
+    filled = np.where(valid, values, values.dtype.type(0))
+    uniques, inverse = np.unique(filled, return_inverse=True)
+    inverse = inverse.reshape(-1).astype(np.int64)
+    # Shift valid codes up by one so nulls get their own group 0.
+    return np.where(valid, inverse + 1, 0), len(uniques) + 1
+
+
+def _string_order(data: ColumnData) -> np.ndarray:
+    """Category codes in ascending string order."""
+
+    return np.argsort(np.array(data.categories or [], dtype=object), kind="stable")
+
+
+def _as_sortable(data: ColumnData, values: np.ndarray, ranking: np.ndarray) -> np.ndarray:
+    """``values`` as numbers whose order matches the column's value order."""
+
+    if data.kind in ("date", "datetime"):
+        return values.view(np.int64)
+    if data.kind == "string":
+        ranks = np.empty(len(ranking) + 1, dtype=np.int64)
+        ranks[ranking] = np.arange(len(ranking))
+        ranks[-1] = -1
+        # Null codes (-1) pick up the trailing sentinel.
+        return ranks[values]
+    if data.kind == "boolean":
+        return values.astype(np.int64)
+    return values
+
+
+def _from_sortable(data: ColumnData, value: Any, ranking: np.ndarray) -> Any:
+    if data.kind == "date":
+        return data.decode(np.int64(value).astype("datetime64[D]"))
+    if data.kind == "datetime":
+        return data.decode(np.int64(value).astype("datetime64[us]"))
+    if data.kind == "string":
+        return data.decode(ranking[int(value)])
+    return data.decode(value)
+
+
+def evaluate(
+    snapshot: ColumnarSnapshot,
+    filters: Sequence[Mapping[str, Any]] = (),
+    group_by: Sequence[str] = (),
+    aggregates: Sequence[Mapping[str, Any]] = (),
+    sort: Sequence[Mapping[str, Any]] = (),
+    limit: int = 100,
+    offset: int = 0,
+) -> Tuple[List[str], List[List[Any]]]:
+    """Answer a group-by/aggregate row query from ``snapshot``.
+
+    Returns the output column names and rows, matching the SQL path of
+    :func:`~.query.query_rows`.
+    """
+
+    if not group_by and not aggregates:
+        raise QueryError("the columnar engine only answers group_by/aggregate queries")
+
+    rows = np.flatnonzero(filter_mask(snapshot, filters))
+    size = len(rows)
+
+    groups = np.zeros(size, dtype=np.int64)
+    span = 1
+    group_columns = []
+    for name in group_by:
+        column, data = snapshot.column(name)
+        codes, cardinality = _factorize(data, rows)
+        if span * cardinality >= 2**62:
+            # Re-densify the combined key before it can overflow int64.
+            _, groups = np.unique(groups, return_inverse=True)
+            groups = groups.reshape(-1).astype(np.int64)
+            span = int(groups.max()) + 1 if size else 1
+        groups = groups * cardinality + codes
+        span *= cardinality
+        group_columns.append((column, data))
+    if group_by:
+        _, first, groups = np.unique(groups, return_index=True, return_inverse=True)
+        groups = groups.reshape(-1)
+        count = len(first)
+    else:
+        first = np.zeros(1, dtype=np.int64)
+        count = 1
+
+    order = np.argsort(groups, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(groups[order]) != 0]) if size else np.array([0])
+    sizes = np.bincount(groups, minlength=count)
+
+    labels: List[str] = [column.name for column, _ in group_columns]
+    outputs: List[List[Any]] = []
+    for column, data in group_columns:
+        picked = rows[first] if size else np.empty(0, dtype=np.int64)
+        outputs.append(
+            [data.decode(data.values[i]) if data.valid[i] else None for i in picked]
+        )
+
+    for spec in aggregates:
+        fn, name = spec.get("fn"), spec.get("column")
+        alias = spec.get("alias") or "_".join(str(part) for part in (fn, name) if part)
+        if alias in labels:
+            raise QueryError(f"duplicate output column {alias!r}")
+        labels.append(alias)
+        outputs.append(
+            _aggregate(snapshot, fn, name, rows, groups, order, starts, sizes, count)
+        )
+
+    table = [list(row) for row in zip(*outputs)] if size or not group_by else []
+    for spec in reversed(list(sort)):
+        name = spec.get("column")
+        if name not in labels:
+            raise QueryError(f"can only sort grouped results by output column {name!r}")
+        index = labels.index(name)
+        descending = spec.get("direction", "asc") == "desc"
+        present = [row for row in table if row[index] is not None]
+        missing = [row for row in table if row[index] is None]
+        present.sort(key=lambda row: row[index], reverse=descending)
+        table = present + missing
+    return labels, table[offset : offset + limit]
+
+
+def _aggregate(
+    snapshot: ColumnarSnapshot,
+    fn: Any,
+    name: Any,
+    rows: np.ndarray,
+    groups: np.ndarray,
+    order: np.ndarray,
+    starts: np.ndarray,
+    sizes: np.ndarray,
+    count: int,
+) -> List[Any]:
+    if fn == "count" and name is None:
+        return [int(value) for value in sizes]
+    column, data = snapshot.column(name)
+    valid = data.valid[rows]
+    counts = np.bincount(groups, weights=valid, minlength=count).astype(np.int64)
+    if fn == "count":
+        return [int(value) for value in counts]
+    if fn == "count_distinct":
+        values = data.values[rows][valid]
+        if data.kind in ("number", "date", "datetime"):
+            values = values.view(np.int64)
+        if not values.size:
+            return [0] * count
+        pairs = np.unique(np.stack([groups[valid], values.astype(np.int64)]), axis=1)
+        return [int(value) for value in np.bincount(pairs[0], minlength=count)]
+    if len(rows) == 0:
+        return [None] * count
+
+    if fn in ("sum", "avg"):
+        if column.type not in ("integer", "number"):
+            raise QueryError(f"{fn} needs a numeric column, {column.name!r} is {column.type}")
+        zero = data.values.dtype.type(0)
+        totals = np.add.reduceat(np.where(valid, data.values[rows], zero)[order], starts)
+        if fn == "sum":
+            return [
+                data.decode(total) if n else None for total, n in zip(totals, counts)
+            ]
+        return [float(total) / n if n else None for total, n in zip(totals, counts)]
+    if fn in ("min", "max"):
+        if column.type == "boolean":
+            raise QueryError(f"{fn} is not defined for boolean column {column.name!r}")
+        ranking = _string_order(data) if data.kind == "string" else np.empty(0, np.int64)
+        values = _as_sortable(data, data.values[rows], ranking)
+        if values.dtype.kind == "f":
+            fill = np.inf if fn == "min" else -np.inf
+        else:
+            info = np.iinfo(np.int64)
+            fill = info.max if fn == "min" else info.min
+        reduce = np.minimum if fn == "min" else np.maximum
+        best = reduce.reduceat(np.where(valid, values, fill)[order], starts)
+        return [
+            _from_sortable(data, value, ranking) if n else None for value, n in zip(best, counts)
+        ]
+    raise QueryError(f"unknown aggregate {fn!r}")
+
+
+def histogram(
+    snapshot: ColumnarSnapshot,
+    name: str,
+    bins: int = 20,
+    filters: Sequence[Mapping[str, Any]] = (),
+) -> Tuple[List[Any], List[int]]:
+    """Equal-width histogram of a numeric, date or datetime column."""
+
+    column, data = snapshot.column(name)
+    if column.type not in ("integer", "number", "date", "datetime"):
+        raise QueryError(f"cannot build a histogram of {column.type} column {column.name!r}")
+    mask = filter_mask(snapshot, filters) & data.valid
+    values = data.values[mask]
+    temporal = column.type in ("date", "datetime")
+    numeric = values.view(np.int64).astype(np.float64) if temporal else values.astype(np.float64)
+    if numeric.size == 0:
+        return [], []
+    counts, edges = np.histogram(numeric, bins=bins)
+    if temporal:
+        unit = "datetime64[D]" if column.type == "date" else "datetime64[us]"
+        decoded = [data.decode(np.int64(round(edge)).astype(unit)) for edge in edges]
+    else:
+        decoded = [float(edge) for edge in edges]
+    return decoded, [int(value) for value in counts]
+
+
+columnar_cache = ColumnarCache()
+
+__all__ = [
+    "COLUMNAR_CACHE_MAX_BYTES",
+    "ColumnarCache",
+    "ColumnarSnapshot",
+    "columnar_cache",
+    "evaluate",
+    "filter_mask",
+    "histogram",
+]
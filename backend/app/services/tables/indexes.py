@@ -0,0 +1,158 @@
+"""Automatic per-table expression indexes for frequently queried columns.
+
+Range filters and sorts on ``row_data`` can only use a B-tree over the exact
+typed expression the query compiles to. The advisor counts how often each
+column of each table is range-filtered or sorted on. Once a column crosses
+``TABLE_AUTO_INDEX_AFTER`` uses on a table with at least
+``TABLE_AUTO_INDEX_MIN_ROWS`` rows, it builds a partial index::
+
+    CREATE INDEX CONCURRENTLY ix_table_rows_q_<note>_<digest>
+        ON table_rows ((row_data ->> 'col')::<type>)
+        WHERE table_note_id = '<note id>'::uuid
+
+The build runs in the background on an AUTOCOMMIT connection, so it never
+blocks writers or the query that triggered it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import Counter
+from typing import Iterable, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .query import column_expression, table_predicate
+from .schema import Column
+
+AUTO_INDEX_AFTER = int(os.getenv("TABLE_AUTO_INDEX_AFTER", "20"))
+AUTO_INDEX_MIN_ROWS = int(os.getenv("TABLE_AUTO_INDEX_MIN_ROWS", "10000"))
+INDEX_PREFIX = "ix_table_rows_q_"
+
+logger = logging.getLogger(__name__)
+
+_Key = Tuple[UUID, Column]
+
+
+def index_name(note_id: UUID, column: Column) -> str:
+    digest = hashlib.sha1(f"{column.name}\0{column.type}".encode("utf-8")).hexdigest()
+    return f"{INDEX_PREFIX}{note_id.hex[:12]}_{digest[:10]}"
+
+
+def _sql(element: object) -> str:
+    return str(
+        element.compile(  # type: ignore[attr-defined]
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def index_ddl(note_id: UUID, column: Column) -> str:
+    """``CREATE INDEX CONCURRENTLY`` statement for ``column`` of table ``note_id``."""
+
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name(note_id, column)} "
+        f"ON table_rows (({_sql(column_expression(column))})) "
+        f"WHERE {_sql(table_predicate(note_id))}"
+    )
+
+
+class ExpressionIndexAdvisor:
+    """Count column usage per table and build expression indexes past a threshold."""
+
+    def __init__(
+        self, threshold: int = AUTO_INDEX_AFTER, min_rows: int = AUTO_INDEX_MIN_ROWS
+    ) -> None:
+        self.threshold = threshold
+        self.min_rows = min_rows
+        self._uses: Counter[_Key] = Counter()
+        self._done: Set[_Key] = set()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    def record(
+        self, engine: AsyncEngine, note_id: UUID, row_count: int, columns: Iterable[Column]
+    ) -> None:
+        """Note one query over ``columns``; schedule index builds that are due."""
+
+        if self.threshold <= 0:
+            return
+        for column in columns:
+            key = (note_id, column)
+            if key in self._done:
+                continue
+            self._uses[key] += 1
+            if self._uses[key] >= self.threshold and row_count >= self.min_rows:
+                self._done.add(key)
+                del self._uses[key]
+                task = asyncio.get_running_loop().create_task(
+                    self._build(engine, note_id, column)
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _build(self, engine: AsyncEngine, note_id: UUID, column: Column) -> None:
+        name = index_name(note_id, column)
+        try:
+            async with engine.connect() as connection:
+                connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+                valid = await connection.scalar(
+                    text(
+                        "SELECT i.indisvalid FROM pg_index i "
+                        "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+                    ),
+                    {"name": name},
+                )
+                if valid:
+                    return
+                if valid is False:
+                    # Left behind by an interrupted concurrent build.
+                    await connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                await connection.execute(text(index_ddl(note_id, column)))
+            logger.info("Built expression index %s on table %s (%s)", name, note_id, column.name)
+        except Exception:
+            self._done.discard((note_id, column))
+            logger.exception("Building expression index %s failed", name)
+
+    def forget(self, engine: AsyncEngine, note_id: UUID) -> None:
+        """Drop the expression indexes of a deleted table note in the background."""
+
+        self._uses = Counter({key: n for key, n in self._uses.items() if key[0] != note_id})
+        if not any(key[0] == note_id for key in self._done):
+            return
+        self._done = {key for key in self._done if key[0] != note_id}
+        task = asyncio.get_running_loop().create_task(self._drop(engine, note_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drop(self, engine: AsyncEngine, note_id: UUID) -> None:
+        try:
+            async with engine.connect() as connection:
+                connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+                names = (
+                    await connection.execute(
+                        text("SELECT indexname FROM pg_indexes WHERE indexname LIKE :prefix"),
+                        {"prefix": f"{INDEX_PREFIX}{note_id.hex[:12]}_%"},
+                    )
+                ).scalars()
+                for name in list(names):
+                    await connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        except Exception:
+            logger.exception("Dropping expression indexes of table %s failed", note_id)
+
+
+table_index_advisor = ExpressionIndexAdvisor()
+
+__all__ = [
+    "AUTO_INDEX_AFTER",
+    "AUTO_INDEX_MIN_ROWS",
+    "ExpressionIndexAdvisor",
+    "index_ddl",
+    "index_name",
+    "table_index_advisor",
+]
@@ -0,0 +1,357 @@
+"""Bulk-load CSV and Parquet files into table notes with ``COPY``.
+
+Rows are read and converted to JSON in a worker thread, then copied into
+``table_rows`` in bounded batches over the binary ``COPY`` protocol, so memory
+stays flat however large the file is. ``TableContent.row_count`` is bumped by
+the number of rows copied inside the same transaction. It never needs a
+``count(*)`` rescan.
+
+When the table has no schema yet, column types are inferred from the first
+``sample_size`` CSV rows, or taken from the Parquet schema. A later value that
+does not fit its inferred type widens that column to ``string``; if rows typed
+the old way were already copied, they are deleted and the input is read again
+with the settled schema, so every row of a column has the same JSON type. When
+the table already has a schema, or one is supplied, every value must fit it,
+and the first one that does not aborts the load.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from itertools import chain, islice
+from typing import IO, Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.models import Note, NoteContentType, TableContent, TableRow
+from ...repositories import NoteRepository
+from ...repositories.links import LinkChanges, notify_links_changed
+from ..importer import iterate_in_thread
+from .schema import (
+    Column,
+    SchemaError,
+    arrow_column_type,
+    check_header,
+    coerce,
+    infer_columns,
+    parse_schema,
+    to_schema_json,
+)
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_SAMPLE_SIZE = 1000
+TABLE_FORMATS = ("csv", "parquet")
+
+logger = logging.getLogger(__name__)
+
+_COPY_COLUMNS = ("id", "table_note_id", "row_data")
+
+
+class TableNotFoundError(LookupError):
+    """Raised when rows are loaded into a note that does not exist."""
+
+
+class TableSource(NamedTuple):
+    """Rows of an input file, each a sequence of values in ``header`` order."""
+
+    header: List[str]
+    rows: Iterator[Sequence[Any]]
+    # Column types declared by the file itself (Parquet), if any.
+    columns: Optional[List[Column]] = None
+    # Reads the rows again from the start, for a load whose inferred types changed.
+    reread: Optional[Callable[[], Iterator[Sequence[Any]]]] = None
+
+
+def csv_source(handle: IO[bytes], delimiter: str = ",") -> TableSource:
+    """Read a UTF-8 CSV whose first row is the header; ``handle`` must be seekable."""
+
+    reader = csv.reader(codecs.iterdecode(handle, "utf-8-sig"), delimiter=delimiter)
+    header = next(reader, None)
+    if not header:
+        raise SchemaError("CSV input has no header row")
+
+    def reread() -> Iterator[Sequence[Any]]:
+        handle.seek(0)
+        rows = csv.reader(codecs.iterdecode(handle, "utf-8-sig"), delimiter=delimiter)
+        next(rows, None)
+        yield from rows
+
+    return TableSource([name.strip() for name in header], reader, reread=reread)
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parquet_source(handle: IO[bytes], batch_size: int = DEFAULT_BATCH_SIZE) -> TableSource:
+    """Read a Parquet file one record batch at a time; ``handle`` must be seekable."""
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Parquet ingestion requires the 'pyarrow' package") from exc
+
+    parquet = pq.ParquetFile(handle)
+    schema = parquet.schema_arrow
+    columns = [Column(field.name, arrow_column_type(field.type) or "string") for field in schema]
+
+    def rows() -> Iterator[Sequence[Any]]:
+        for batch in parquet.iter_batches(batch_size=batch_size):
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+    return TableSource(list(schema.names), rows(), columns, rows)
+
+
+@dataclass
+class IngestReport:
+    """Outcome of one load."""
+
+    note_id: UUID
+    rows: int
+    row_count: int
+    batches: int
+    seconds: float
+    schema_json: Dict[str, Any]
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "note_id": self.note_id,
+            "rows": self.rows,
+            "row_count": self.row_count,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "schema_json": self.schema_json,
+        }
+
+
+class _RowEncoder:
+    """Turn source rows into ``row_data`` JSON text, settling the schema on the way.
+
+    Runs inside a worker thread; :attr:`columns` is final once it is exhausted.
+    When a column widens after earlier rows were yielded, :attr:`stale` is set
+    and the remaining rows only settle the schema; nothing more is yielded.
+    """
+
+    def __init__(
+        self, source: TableSource, columns: Optional[List[Column]], sample_size: int
+    ) -> None:
+        self.source = source
+        self.columns = columns
+        self.strict = columns is not None
+        self.sample_size = sample_size
+        self.stale = False
+
+    def __iter__(self) -> Iterator[str]:
+        header = self.source.header
+        rows: Iterator[Sequence[Any]] = iter(self.source.rows)
+        if self.columns is None:
+            if self.source.columns is not None:
+                self.columns = list(self.source.columns)
+            else:
+                sample = list(islice(rows, self.sample_size))
+                self.columns = infer_columns(header, sample)
+                rows = chain(sample, rows)
+
+        columns = self.columns
+        positions = [header.index(column.name) for column in columns]
+        width = len(header)
+        dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+        for number, row in enumerate(rows, start=1):
+            if len(row) > width:
+                raise SchemaError(f"row {number}: expected {width} values, got {len(row)}")
+            data = {}
+            for index, position in enumerate(positions):
+                column = columns[index]
+                value = row[position] if position < len(row) else None
+                try:
+                    data[column.name] = coerce(value, column.type)
+                except (ValueError, TypeError) as exc:
+                    if self.strict:
+                        raise SchemaError(
+                            f"row {number}, column {column.name!r}: "
+                            f"{value!r} is not a valid {column.type}"
+                        ) from exc
+                    columns[index] = Column(column.name, "string")
+                    data[column.name] = coerce(value, "string")
+                    self.stale = self.stale or number > 1
+            if not self.stale:
+                yield dumps(data)
+
+
+class TableIngestor:
+    """Load rows into table notes within the caller's session.
+
+    :meth:`ingest` commits when it finishes. A failed load is rolled back, so
+    the table never holds part of a file.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+    ) -> None:
+        self.session = session
+        self.batch_size = batch_size
+        self.sample_size = sample_size
+        # Link changes from create_table(), announced once ingest() commits.
+        self._link_changes: LinkChanges = ([], [])
+
+    async def create_table(self, title: str) -> UUID:
+        """Add a table note with an empty schema, without committing.
+
+        Notes waiting on a ``[[title]]`` link are linked to the new table.
+        """
+
+        repo = NoteRepository(self.session)
+        fields = [{"title": title, "content_type": NoteContentType.TABLE}]
+        (note_id,) = await repo.insert_many(fields)
+        self._link_changes = await repo.link_inserted([note_id], fields)
+        self.session.add(TableContent(note_id=note_id, schema_json={"columns": []}, row_count=0))
+        await self.session.flush()
+        return note_id
+
+    async def ingest(
+        self,
+        note_id: UUID,
+        source: TableSource,
+        schema: Optional[List[Column]] = None,
+    ) -> IngestReport:
+        """Append every row of ``source`` to the table note ``note_id``."""
+
+        started = time.perf_counter()
+        changes, self._link_changes = self._link_changes, ([], [])
+        try:
+            report = await self._ingest(note_id, source, schema, started)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        notify_links_changed(*changes)
+        logger.info(
+            "ingested %d rows into table %s at %.0f rows/s",
+            report.rows,
+            note_id,
+            report.rows_per_second,
+        )
+        return report
+
+    async def _ingest(
+        self,
+        note_id: UUID,
+        source: TableSource,
+        schema: Optional[List[Column]],
+        started: float,
+    ) -> IngestReport:
+        content_type = await self.session.scalar(
+            select(Note.content_type).where(Note.id == note_id)
+        )
+        if content_type is None:
+            raise TableNotFoundError(note_id)
+        if content_type != NoteContentType.TABLE:
+            raise SchemaError("note is not a table note")
+
+        # Serialises concurrent loads into the same table.
+        table = await self.session.scalar(
+            select(TableContent).where(TableContent.note_id == note_id).with_for_update()
+        )
+        if table is None:
+            table = TableContent(note_id=note_id, schema_json={"columns": []}, row_count=0)
+            self.session.add(table)
+            await self.session.flush()
+
+        existing = parse_schema(table.schema_json) if table.schema_json else []
+        if existing and schema is not None and schema != existing:
+            raise SchemaError("supplied schema differs from the table's schema")
+        fixed = existing or schema
+        if fixed:
+            check_header(source.header, fixed)
+        elif len(set(source.header)) != len(source.header) or not all(source.header):
+            raise SchemaError("column names must be unique and non-empty")
+
+        encoder = _RowEncoder(source, list(fixed) if fixed else None, self.sample_size)
+        rows, batches = await self._copy(note_id, encoder)
+        if encoder.stale:
+            if source.reread is None:
+                raise SchemaError("column types changed mid-file and the input cannot be re-read")
+            # Only a table without a schema is loaded this way, and it has no
+            # rows yet, so every row of the note came from this load.
+            await self.session.execute(delete(TableRow).where(TableRow.table_note_id == note_id))
+            encoder = _RowEncoder(
+                source._replace(rows=source.reread()), encoder.columns, self.sample_size
+            )
+            rows, batches = await self._copy(note_id, encoder)
+
+        schema_json = to_schema_json(encoder.columns or [])
+        values: Dict[str, Any] = {"row_count": TableContent.row_count + rows}
+        if schema_json != table.schema_json:
+            values["schema_json"] = schema_json
+        row_count = await self.session.scalar(
+            update(TableContent)
+            .where(TableContent.note_id == note_id)
+            .values(**values)
+            .returning(TableContent.row_count)
+            .execution_options(synchronize_session=False)
+        )
+        return IngestReport(
+            note_id=note_id,
+            rows=rows,
+            row_count=row_count,
+            batches=batches,
+            seconds=time.perf_counter() - started,
+            schema_json=schema_json,
+        )
+
+    async def _copy(self, note_id: UUID, encoder: _RowEncoder) -> Tuple[int, int]:
+        """``COPY`` the encoded rows in batches; returns the rows and batches copied."""
+
+        connection = await self.session.connection()
+        raw = await connection.get_raw_connection()
+
+        rows = batches = 0
+        batch: List[tuple] = []
+        async for row_data in iterate_in_thread(encoder, batch_size=1024):
+            batch.append((uuid.uuid4(), note_id, row_data))
+            if len(batch) >= self.batch_size:
+                await raw.driver_connection.copy_records_to_table(
+                    "table_rows", records=batch, columns=_COPY_COLUMNS
+                )
+                rows, batches, batch = rows + len(batch), batches + 1, []
+        if batch:
+            await raw.driver_connection.copy_records_to_table(
+                "table_rows", records=batch, columns=_COPY_COLUMNS
+            )
+            rows, batches = rows + len(batch), batches + 1
+        return rows, batches
+
+
+__all__ = [
+    "DEFAULT_BATCH_SIZE",
+    "DEFAULT_SAMPLE_SIZE",
+    "IngestReport",
+    "TABLE_FORMATS",
+    "TableIngestor",
+    "TableNotFoundError",
+    "TableSource",
+    "csv_source",
+    "parquet_available",
+    "parquet_source",
+]
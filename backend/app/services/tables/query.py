@@ -0,0 +1,336 @@
+"""Compile typed row queries over ``table_rows.row_data`` into SQL.
+
+A query is a list of filters, optional group-by columns and aggregates, a
+sort order and a limit. Every column reference is checked against the table's
+``schema_json``. In SQL it becomes ``row_data ->> 'name'`` cast to the
+column's type. JSON keys and the table id are rendered as literals, not bind
+parameters. That keeps the compiled expressions identical to the per-table
+expression indexes in :mod:`.indexes`, so the planner can match them.
+
+Equality and ``in`` filters compile to ``row_data @> '{"name": value}'``,
+which the ``jsonb_path_ops`` GIN index answers directly.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Float,
+    Text,
+    and_,
+    cast,
+    distinct,
+    func,
+    literal_column,
+    or_,
+    select,
+    text,
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+from ...db.models import TableContent, TableRow
+from .schema import Column, coerce, parse_schema
+
+MAX_QUERY_LIMIT = 1000
+MAX_IN_VALUES = 100
+ROW_QUERY_TIMEOUT_MS = int(os.getenv("ROW_QUERY_TIMEOUT_MS", "10000"))
+
+FILTER_OPS = ("eq", "ne", "lt", "lte", "gt", "gte", "in", "contains", "is_null", "not_null")
+AGGREGATE_FNS = ("count", "count_distinct", "sum", "avg", "min", "max")
+RANGE_OPS = ("lt", "lte", "gt", "gte")
+
+_CASTS = {
+    "integer": BigInteger(),
+    "number": Float(precision=53),
+    "boolean": Boolean(),
+    "date": Date(),
+    "datetime": DateTime(timezone=True),
+}
+_NUMERIC = ("integer", "number")
+_QUERY_CANCELED = "57014"
+
+
+class QueryError(ValueError):
+    """Raised when a row query does not fit the table's schema."""
+
+
+class QueryTimeoutError(RuntimeError):
+    """Raised when a row query exceeds ``ROW_QUERY_TIMEOUT_MS``."""
+
+
+class TableQueryResult(NamedTuple):
+    columns: List[str]
+    rows: List[List[Any]]
+    # Columns the query range-filtered or sorted on, for the index advisor.
+    indexable: List[Column]
+
+
+def sql_string(value: str) -> ColumnElement:
+    """Render ``value`` as an inline SQL string literal."""
+
+    if "\x00" in value:
+        raise QueryError("column names cannot contain NUL characters")
+    return literal_column("'" + value.replace("'", "''") + "'")
+
+
+def table_predicate(note_id: UUID) -> ColumnElement:
+    """``table_note_id = '<uuid>'`` with the id inlined for partial-index matching."""
+
+    return TableRow.table_note_id == literal_column(f"'{UUID(str(note_id))}'::uuid")
+
+
+def column_expression(column: Column) -> ColumnElement:
+    """Typed SQL expression reading ``column`` out of ``row_data``."""
+
+    value = TableRow.row_data.op("->>", return_type=Text)(sql_string(column.name))
+    if column.type == "string":
+        return value
+    return cast(value, _CASTS[column.type])
+
+
+def json_value(column: Column, value: Any) -> Any:
+    """The value as it is stored in ``row_data``, for ``@>`` containment."""
+
+    try:
+        coerced = coerce(value, column.type)
+    except (TypeError, ValueError) as exc:
+        raise QueryError(f"{value!r} is not a valid {column.type} for {column.name!r}") from exc
+    if coerced is None:
+        raise QueryError(f"use is_null instead of comparing {column.name!r} to null")
+    return coerced
+
+
+def bind_value(column: Column, value: Any) -> Any:
+    """The value as a Python object comparable with :func:`column_expression`."""
+
+    coerced = json_value(column, value)
+    if column.type == "date":
+        return date.fromisoformat(coerced)
+    if column.type == "datetime":
+        return datetime.fromisoformat(coerced)
+    return coerced
+
+
+def _plain(value: Any) -> Any:
+    # sum()/avg() over bigint return numeric; keep JSON output numeric too.
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+class _Compiler:
+    def __init__(self, columns: Sequence[Column]) -> None:
+        self.columns = {column.name: column for column in columns}
+        self.ordered = list(columns)
+        self.indexable: Dict[str, Column] = {}
+
+    def column(self, name: Any) -> Column:
+        column = self.columns.get(name) if isinstance(name, str) else None
+        if column is None:
+            raise QueryError(f"unknown column {name!r}")
+        return column
+
+    def filter(self, spec: Mapping[str, Any]) -> ColumnElement:
+        column = self.column(spec.get("column"))
+        op = spec.get("op", "eq")
+        value = spec.get("value")
+        expr = column_expression(column)
+
+        if op == "is_null":
+            return expr.is_(None)
+        if op == "not_null":
+            return expr.isnot(None)
+        if op == "eq":
+            return TableRow.row_data.contains({column.name: json_value(column, value)})
+        if op == "in":
+            if not isinstance(value, list) or not value:
+                raise QueryError(f"'in' on {column.name!r} needs a non-empty list")
+            if len(value) > MAX_IN_VALUES:
+                raise QueryError(f"'in' accepts at most {MAX_IN_VALUES} values")
+            return or_(
+                *(
+                    TableRow.row_data.contains({column.name: json_value(column, item)})
+                    for item in value
+                )
+            )
+        if op == "ne":
+            return expr.is_distinct_from(bind_value(column, value))
+        if op == "contains":
+            if column.type != "string" or not isinstance(value, str):
+                raise QueryError(f"'contains' needs a string column and value: {column.name!r}")
+            return expr.icontains(value, autoescape=True)
+        if op in RANGE_OPS:
+            if column.type == "boolean":
+                raise QueryError(f"cannot range-filter boolean column {column.name!r}")
+            self.indexable[column.name] = column
+            bound = bind_value(column, value)
+            return {
+                "lt": expr < bound,
+                "lte": expr <= bound,
+                "gt": expr > bound,
+                "gte": expr >= bound,
+            }[op]
+        raise QueryError(f"unknown filter op {op!r}; expected one of {', '.join(FILTER_OPS)}")
+
+    def aggregate(self, spec: Mapping[str, Any]) -> ColumnElement:
+        fn = spec.get("fn")
+        name = spec.get("column")
+        if fn == "count" and name is None:
+            return func.count()
+        column = self.column(name)
+        expr = column_expression(column)
+        if fn == "count":
+            return func.count(expr)
+        if fn == "count_distinct":
+            return func.count(distinct(expr))
+        if fn in ("sum", "avg"):
+            if column.type not in _NUMERIC:
+                raise QueryError(f"{fn} needs a numeric column, {column.name!r} is {column.type}")
+            return getattr(func, fn)(expr)
+        if fn in ("min", "max"):
+            if column.type == "boolean":
+                raise QueryError(f"{fn} is not defined for boolean column {column.name!r}")
+            return getattr(func, fn)(expr)
+        raise QueryError(f"unknown aggregate {fn!r}; expected one of {', '.join(AGGREGATE_FNS)}")
+
+
+def compile_row_query(
+    note_id: UUID,
+    columns: Sequence[Column],
+    filters: Sequence[Mapping[str, Any]] = (),
+    sort: Sequence[Mapping[str, Any]] = (),
+    group_by: Sequence[str] = (),
+    aggregates: Sequence[Mapping[str, Any]] = (),
+    select_columns: Optional[Sequence[str]] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> Tuple[Select, List[str], List[Column]]:
+    """Build the ``SELECT`` for a row query.
+
+    Returns the statement, the output column names and the columns worth an
+    expression index.
+    """
+
+    compiler = _Compiler(columns)
+    where = and_(table_predicate(note_id), *(compiler.filter(spec) for spec in filters))
+
+    outputs: Dict[str, ColumnElement] = {}
+    grouped = bool(group_by or aggregates)
+    if grouped:
+        if select_columns:
+            raise QueryError("columns cannot be combined with group_by or aggregates")
+        group_exprs = []
+        for name in group_by:
+            column = compiler.column(name)
+            expr = column_expression(column)
+            group_exprs.append(expr)
+            outputs[column.name] = expr
+        for spec in aggregates:
+            alias = spec.get("alias") or "_".join(
+                str(part) for part in (spec.get("fn"), spec.get("column")) if part
+            )
+            if alias in outputs:
+                raise QueryError(f"duplicate output column {alias!r}")
+            outputs[alias] = compiler.aggregate(spec)
+    else:
+        names = list(select_columns) if select_columns else [c.name for c in compiler.ordered]
+        for name in names:
+            column = compiler.column(name)
+            outputs[column.name] = column_expression(column)
+
+    order_by = []
+    for spec in sort:
+        name = spec.get("column")
+        descending = spec.get("direction", "asc") == "desc"
+        if grouped:
+            if name not in outputs:
+                raise QueryError(f"can only sort grouped results by output column {name!r}")
+            expr = outputs[name]
+        else:
+            column = compiler.column(name)
+            compiler.indexable[column.name] = column
+            expr = column_expression(column)
+        order_by.append(expr.desc().nulls_last() if descending else expr.asc().nulls_last())
+
+    labels = list(outputs)
+    stmt = select(
+        *(expr.label(f"c{index}") for index, expr in enumerate(outputs.values()))
+    ).where(where)
+    if grouped:
+        if group_by:
+            stmt = stmt.group_by(*(outputs[name] for name in group_by))
+    else:
+        # Rows tie-break on id so pages are stable.
+        order_by.append(TableRow.id.asc())
+    stmt = stmt.order_by(*order_by).limit(min(limit, MAX_QUERY_LIMIT)).offset(offset)
+    return stmt, labels, list(compiler.indexable.values())
+
+
+async def load_table_schema(
+    session: AsyncSession, note_id: UUID
+) -> Optional[Tuple[List[Column], int]]:
+    """Return ``(columns, row_count)`` for a table note, or ``None``."""
+
+    row = (
+        await session.execute(
+            select(TableContent.schema_json, TableContent.row_count).where(
+                TableContent.note_id == note_id
+            )
+        )
+    ).first()
+    if row is None:
+        return None
+    return parse_schema(row.schema_json), row.row_count
+
+
+async def query_rows(
+    session: AsyncSession, note_id: UUID, columns: Sequence[Column], **query: Any
+) -> TableQueryResult:
+    """Run a row query under ``ROW_QUERY_TIMEOUT_MS``.
+
+    The query runs in its own transaction, which is rolled back afterwards to
+    drop the ``SET LOCAL`` timeout.
+    """
+
+    stmt, labels, indexable = compile_row_query(note_id, columns, **query)
+    await session.rollback()
+    try:
+        await session.execute(text(f"SET LOCAL statement_timeout = {int(ROW_QUERY_TIMEOUT_MS)}"))
+        rows = [[_plain(value) for value in row] for row in await session.execute(stmt)]
+    except DBAPIError as exc:
+        if getattr(exc.orig, "sqlstate", None) == _QUERY_CANCELED:
+            raise QueryTimeoutError(f"row query exceeded {ROW_QUERY_TIMEOUT_MS} ms") from exc
+        raise
+    finally:
+        await session.rollback()
+    return TableQueryResult(labels, rows, indexable)
+
+
+__all__ = [
+    "AGGREGATE_FNS",
+    "FILTER_OPS",
+    "MAX_QUERY_LIMIT",
+    "QueryError",
+    "QueryTimeoutError",
+    "TableQueryResult",
+    "bind_value",
+    "column_expression",
+    "compile_row_query",
+    "json_value",
+    "load_table_schema",
+    "query_rows",
+    "sql_string",
+    "table_predicate",
+]
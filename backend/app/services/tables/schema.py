@@ -0,0 +1,213 @@
+"""Column schemas for table notes and coercion of incoming cell values.
+
+``TableContent.schema_json`` has the shape::
+
+    {"columns": [{"name": "city", "type": "string"}, ...]}
+
+where ``type`` is one of :data:`COLUMN_TYPES`. Cell values are stored in
+``TableRow.row_data`` as JSON: integers and numbers as JSON numbers, booleans
+as JSON booleans, dates and datetimes as ISO-8601 strings, and empty cells as
+``null``.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+COLUMN_TYPES = ("integer", "number", "boolean", "date", "datetime", "string")
+MAX_COLUMNS = 1000
+
+_TRUE = frozenset({"true", "t", "yes", "y", "1"})
+_FALSE = frozenset({"false", "f", "no", "n", "0"})
+# Order in which inference tries types; the first that fits every sample wins.
+_INFERENCE_ORDER = ("integer", "number", "boolean", "date", "datetime")
+
+
+class SchemaError(ValueError):
+    """Raised when a schema is malformed or rows do not fit it."""
+
+
+class Column(NamedTuple):
+    name: str
+    type: str
+
+
+def parse_schema(schema_json: Any) -> List[Column]:
+    """Validate ``schema_json`` and return its columns."""
+
+    if not isinstance(schema_json, dict) or not isinstance(schema_json.get("columns"), list):
+        raise SchemaError('schema must be an object with a "columns" list')
+    columns: List[Column] = []
+    seen = set()
+    for entry in schema_json["columns"]:
+        if not isinstance(entry, dict):
+            raise SchemaError("each column must be an object with name and type")
+        name, kind = entry.get("name"), entry.get("type", "string")
+        if not isinstance(name, str) or not name:
+            raise SchemaError("column names must be non-empty strings")
+        if name in seen:
+            raise SchemaError(f"duplicate column {name!r}")
+        if kind not in COLUMN_TYPES:
+            raise SchemaError(f"column {name!r} has unknown type {kind!r}")
+        seen.add(name)
+        columns.append(Column(name, kind))
+    if len(columns) > MAX_COLUMNS:
+        raise SchemaError(f"at most {MAX_COLUMNS} columns are supported")
+    return columns
+
+
+def to_schema_json(columns: Iterable[Column]) -> Dict[str, Any]:
+    return {"columns": [{"name": column.name, "type": column.type} for column in columns]}
+
+
+def check_header(header: Sequence[str], columns: Sequence[Column]) -> None:
+    """Ensure ``header`` names exactly the schema's columns, in any order."""
+
+    expected = {column.name for column in columns}
+    names = list(header)
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise SchemaError(f"duplicate columns in input: {', '.join(duplicates)}")
+    missing = sorted(expected - set(names))
+    unknown = sorted(set(names) - expected)
+    if missing or unknown:
+        parts = []
+        if missing:
+            parts.append(f"missing columns: {', '.join(missing)}")
+        if unknown:
+            parts.append(f"unknown columns: {', '.join(unknown)}")
+        raise SchemaError("; ".join(parts))
+
+
+def coerce(value: Any, kind: str) -> Any:
+    """Convert one cell to its JSON representation for ``kind``.
+
+    Strings (CSV cells) are parsed; already-typed values (Parquet cells) are
+    checked. Empty strings and ``None`` become ``None``. Raises
+    :class:`ValueError` when the value does not fit.
+    """
+
+    if value is None or value == "":
+        return None
+    if kind == "string":
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value if isinstance(value, str) else str(value)
+    if kind == "integer":
+        if isinstance(value, bool):
+            raise ValueError("not an integer")
+        if isinstance(value, int):
+            return value
+        if isinstance(value, (float, Decimal)) and value == int(value):
+            return int(value)
+        return int(_numeric_text(value))
+    if kind == "number":
+        if isinstance(value, bool):
+            raise ValueError("not a number")
+        if isinstance(value, (int, float, Decimal)):
+            number = float(value)
+        else:
+            number = float(_numeric_text(value))
+        if not math.isfinite(number):
+            raise ValueError("not a finite number")
+        return int(number) if isinstance(value, int) else number
+    if kind == "boolean":
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+        raise ValueError("not a boolean")
+    if kind == "date":
+        if isinstance(value, datetime):
+            raise ValueError("not a date")
+        if isinstance(value, date):
+            return value.isoformat()
+        return date.fromisoformat(str(value).strip()).isoformat()
+    if kind == "datetime":
+        if isinstance(value, datetime):
+            return value.isoformat()
+        text = str(value).strip()
+        if len(text) <= 10:
+            raise ValueError("not a datetime")
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).isoformat()
+    raise ValueError(f"unknown column type {kind!r}")
+
+
+def infer_type(values: Iterable[Any]) -> str:
+    """Pick the narrowest column type that fits every non-empty sample value."""
+
+    candidates = list(_INFERENCE_ORDER)
+    seen = False
+    for value in values:
+        if value is None or value == "":
+            continue
+        seen = True
+        candidates = [kind for kind in candidates if _fits(value, kind)]
+        if not candidates:
+            return "string"
+    return candidates[0] if seen else "string"
+
+
+def infer_columns(header: Sequence[str], sample: Sequence[Sequence[Any]]) -> List[Column]:
+    """Infer one :class:`Column` per header name from ``sample`` rows."""
+
+    return [
+        Column(name, infer_type(row[index] for row in sample if index < len(row)))
+        for index, name in enumerate(header)
+    ]
+
+
+def _numeric_text(value: Any) -> str:
+    # int() and float() accept "1_000"; spreadsheets never mean that.
+    text = str(value).strip()
+    if "_" in text:
+        raise ValueError("not a number")
+    return text
+
+
+def _fits(value: Any, kind: str) -> bool:
+    try:
+        coerce(value, kind)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+
+def arrow_column_type(arrow_type: Any) -> Optional[str]:
+    """Map a ``pyarrow`` type to a column type (``None`` when unsupported)."""
+
+    import pyarrow.types as pat
+
+    if pat.is_boolean(arrow_type):
+        return "boolean"
+    if pat.is_integer(arrow_type):
+        return "integer"
+    if pat.is_floating(arrow_type) or pat.is_decimal(arrow_type):
+        return "number"
+    if pat.is_date(arrow_type):
+        return "date"
+    if pat.is_timestamp(arrow_type):
+        return "datetime"
+    if pat.is_string(arrow_type) or pat.is_large_string(arrow_type):
+        return "string"
+    return None
+
+
+__all__ = [
+    "COLUMN_TYPES",
+    "Column",
+    "SchemaError",
+    "arrow_column_type",
+    "check_header",
+    "coerce",
+    "infer_columns",
+    "infer_type",
+    "parse_schema",
+    "to_schema_json",
+]
@@ -0,0 +1,4 @@
+"""Standalone benchmarks for the Bobo Notes backend.
+
+Run each module with ``python -m benchmarks.<name> --help`` from the repository root.
+"""
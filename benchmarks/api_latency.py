@@ -0,0 +1,598 @@
+"""Drive every API route at fixed concurrency and report latency percentiles.
+
+``run`` seeds a synthetic dataset into the database at ``$DATABASE_URL``:
+markdown notes with tags, power-law links between them, a table note and
+drafts. It then sends ``--requests`` requests to each endpoint from
+``--concurrency`` concurrent clients, one endpoint at a time, and reports
+throughput and p50/p95/p99 latency. Without ``--base-url`` the app is served
+in-process, lifespan included, through httpx's ASGI transport. With it,
+requests go to a running server, which must use the same database. Seeded
+rows, and everything the endpoints create, are deleted afterwards unless
+``--keep`` is given.
+
+``compare`` reads two saved runs. It flags endpoints whose p95 grew, or
+whose throughput fell, by more than ``--threshold``, and endpoints that
+return errors they did not return before. It exits with status 1 if any
+were flagged. Example::
+
+    python -m benchmarks.api_latency run --notes 5000 --output before.json
+    python -m benchmarks.api_latency run --notes 5000 --output after.json
+    python -m benchmarks.api_latency compare before.json after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+import httpx
+import numpy as np
+from sqlalchemy import delete
+
+from backend.app.db.models import Draft, Note, NoteContentType, NoteLinkType, Tag
+from backend.app.db.session import SessionLocal, init_engine, with_engine
+from backend.app.repositories import (
+    DraftRepository,
+    LinkRepository,
+    NewLink,
+    NoteRepository,
+    TagRepository,
+)
+from backend.app.services.tables import TableIngestor, csv_source
+
+from .table_ingest import _write_csv
+
+_BATCH = 1000
+
+# (url, keyword arguments for httpx.AsyncClient.request)
+Call = Tuple[str, Dict[str, Any]]
+
+
+@dataclass
+class Dataset:
+    """Identifiers of the seeded rows that requests are built from."""
+
+    prefix: str
+    words: List[str]
+    note_ids: List[UUID] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    draft_ids: List[UUID] = field(default_factory=list)
+    table_id: Optional[UUID] = None
+    table_csv: bytes = b""
+
+    def text(self, rng: random.Random, words: int) -> str:
+        return " ".join(rng.choices(self.words, k=words))
+
+
+class Endpoint(NamedTuple):
+    """One route, how to build a request for it and which statuses count as success."""
+
+    method: str
+    name: str
+    build: Callable[[Dataset, random.Random, Any], Call]
+    # Creates the rows that requests consume (drafts to organize, notes to delete).
+    setup: Optional[Callable[[httpx.AsyncClient, Dataset, int], Awaitable[List[Any]]]] = None
+    ok: Tuple[int, ...] = (200, 201, 204, 207)
+
+
+# ---------------------------------------------------------------- seeding
+
+
+def _vocabulary(rng: random.Random, size: int = 2000) -> List[str]:
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "an", "or", "el"]
+    return sorted({"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(size)})
+
+
+async def seed(args: argparse.Namespace, prefix: str) -> Dataset:
+    """Insert the benchmark dataset and return the identifiers requests need."""
+
+    rng = random.Random(args.seed)
+    data = Dataset(prefix=prefix, words=_vocabulary(rng))
+    data.tags = [f"{prefix}-tag-{index}" for index in range(args.tags)]
+    started = time.perf_counter()
+
+    async with SessionLocal() as session:
+        repo = NoteRepository(session)
+        tags = TagRepository(session)
+        for start in range(0, args.notes, _BATCH):
+            notes = [
+                {
+                    "title": f"{prefix} note {index} {rng.choice(data.words)}",
+                    "content_type": NoteContentType.MARKDOWN,
+                    "body": data.text(rng, args.body_words),
+                }
+                for index in range(start, min(start + _BATCH, args.notes))
+            ]
+            ids = await repo.insert_many(notes)
+            # A few tags are on most notes; the long tail is rare.
+            pairs = {
+                (note_id, data.tags[min(int(rng.paretovariate(1.2)) - 1, args.tags - 1)])
+                for note_id in ids
+                for _ in range(rng.randint(0, 3))
+            }
+            await tags.add_to_notes(sorted(pairs, key=str))
+            await session.commit()
+            data.note_ids.extend(ids)
+
+        notes = len(data.note_ids)
+        hubs = rng.sample(data.note_ids, notes)
+        edges = {
+            (rng.choice(data.note_ids), hubs[min(int(rng.paretovariate(1.1)) - 1, notes - 1)])
+            for _ in range(int(notes * args.links_per_note))
+        }
+        links = [
+            NewLink(source_id, target_id, NoteLinkType.EXPLICIT)
+            for source_id, target_id in edges
+            if source_id != target_id
+        ]
+        link_repo = LinkRepository(session)
+        for start in range(0, len(links), _BATCH * 10):
+            await link_repo.create_links(links[start : start + _BATCH * 10])
+
+        drafts = DraftRepository(session)
+        for index in range(args.drafts):
+            draft = await drafts.create(f"{prefix} draft {index}", data.text(rng, 40))
+            data.draft_ids.append(draft.id)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rows.csv")
+        _write_csv(path, args.table_rows, args.seed)
+        with open(path, "rb") as handle:
+            async with SessionLocal() as session:
+                ingestor = TableIngestor(session)
+                data.table_id = await ingestor.create_table(f"{prefix} table")
+                await ingestor.ingest(data.table_id, csv_source(handle))
+        _write_csv(path, 100, args.seed + 1)
+        with open(path, "rb") as handle:
+            data.table_csv = handle.read()
+
+    print(
+        f"seeded {notes:,} notes, {len(links):,} links, {args.tags} tags, "
+        f"{args.drafts} drafts, {args.table_rows:,} table rows "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return data
+
+
+async def cleanup(prefix: str) -> None:
+    """Delete every note, draft and tag whose name starts with ``prefix``."""
+
+    async with SessionLocal() as session:
+        await session.execute(delete(Note).where(Note.title.startswith(prefix)))
+        await session.execute(delete(Draft).where(Draft.title.startswith(prefix)))
+        await session.execute(delete(Tag).where(Tag.name.startswith(prefix)))
+        await session.commit()
+
+
+# -------------------------------------------------------------- endpoints
+
+
+def _note(data: Dataset, rng: random.Random) -> UUID:
+    return rng.choice(data.note_ids)
+
+
+async def _new_drafts(client: httpx.AsyncClient, data: Dataset, count: int) -> List[Any]:
+    ids = []
+    for index in range(count):
+        response = await client.post(
+            "/drafts/", json={"title": f"{data.prefix} disposable draft {index}", "body": "x"}
+        )
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def _new_draft_batches(client: httpx.AsyncClient, data: Dataset, count: int) -> List[Any]:
+    ids = await _new_drafts(client, data, count * 10)
+    return [ids[start : start + 10] for start in range(0, len(ids), 10)]
+
+
+async def _new_notes(client: httpx.AsyncClient, data: Dataset, count: int) -> List[Any]:
+    ids: List[Any] = []
+    for start in range(0, count, 500):
+        payload = [
+            {"title": f"{data.prefix} disposable {index}", "content_type": "markdown"}
+            for index in range(start, min(start + 500, count))
+        ]
+        response = await client.post("/notes/bulk", json=payload)
+        response.raise_for_status()
+        ids.extend(item["id"] for item in response.json()["results"])
+    return ids
+
+
+def _import_body(data: Dataset, rng: random.Random) -> bytes:
+    records = (
+        {"title": f"{data.prefix} imported {uuid.uuid4()}", "body": data.text(rng, 50)}
+        for _ in range(10)
+    )
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+def _assignment(data: Dataset, rng: random.Random) -> Dict[str, Any]:
+    note_ids = [str(note_id) for note_id in rng.sample(data.note_ids, min(20, len(data.note_ids)))]
+    return {"json": {"note_ids": note_ids, "tags": data.tags[-1:]}}
+
+
+def _path(data: Dataset, rng: random.Random) -> Dict[str, Any]:
+    source, target = _note(data, rng), _note(data, rng)
+    return {"params": {"source": str(source), "target": str(target), "direction": "both"}}
+
+
+ROW_QUERY = {
+    "group_by": ["city"],
+    "aggregates": [{"fn": "count"}, {"fn": "avg", "column": "ratio"}],
+}
+
+ENDPOINTS: List[Endpoint] = [
+    Endpoint("GET", "/notes/", lambda d, r, _: ("/notes/", {"params": {"limit": 50}})),
+    Endpoint(
+        "GET",
+        "/notes/?tag",
+        lambda d, r, _: ("/notes/", {"params": {"limit": 50, "tag": r.choice(d.tags[:5])}}),
+    ),
+    Endpoint(
+        "GET",
+        "/notes/search",
+        lambda d, r, _: ("/notes/search", {"params": {"q": r.choice(d.words), "limit": 20}}),
+    ),
+    Endpoint("GET", "/notes/export", lambda d, r, _: ("/notes/export", {})),
+    Endpoint("GET", "/notes/{note_id}", lambda d, r, _: (f"/notes/{_note(d, r)}", {})),
+    Endpoint(
+        "GET",
+        "/notes/{note_id}/backlinks",
+        lambda d, r, _: (f"/notes/{_note(d, r)}/backlinks", {}),
+    ),
+    Endpoint(
+        "GET",
+        "/notes/{note_id}/graph",
+        lambda d, r, _: (f"/notes/{_note(d, r)}/graph", {"params": {"depth": 2}}),
+    ),
+    Endpoint(
+        "GET",
+        "/notes/{note_id}/similar",
+        lambda d, r, _: (f"/notes/{_note(d, r)}/similar", {}),
+        # Notes without embeddings, or an index that is not loaded, are expected.
+        ok=(200, 404, 503),
+    ),
+    Endpoint(
+        "POST",
+        "/notes/",
+        lambda d, r, _: (
+            "/notes/",
+            {
+                "json": {
+                    "title": f"{d.prefix} created {uuid.uuid4()}",
+                    "content_type": "markdown",
+                    "body": d.text(r, 80),
+                }
+            },
+        ),
+    ),
+    Endpoint(
+        "POST",
+        "/notes/bulk",
+        lambda d, r, _: (
+            "/notes/bulk",
+            {
+                "json": [
+                    {
+                        "title": f"{d.prefix} bulk {uuid.uuid4()}",
+                        "content_type": "markdown",
+                        "body": d.text(r, 80),
+                    }
+                    for _ in range(50)
+                ]
+            },
+        ),
+    ),
+    Endpoint(
+        "POST",
+        "/notes/import",
+        lambda d, r, _: (
+            "/notes/import",
+            {"content": _import_body(d, r), "params": {"format": "ndjson"}},
+        ),
+    ),
+    Endpoint(
+        "PATCH",
+        "/notes/{note_id}",
+        lambda d, r, _: (f"/notes/{_note(d, r)}", {"json": {"body": d.text(r, 80)}}),
+    ),
+    Endpoint("DELETE", "/notes/{note_id}", lambda d, r, i: (f"/notes/{i}", {}), _new_notes),
+    Endpoint(
+        "POST",
+        "/notes/tables",
+        lambda d, r, _: (
+            "/notes/tables",
+            {
+                "content": d.table_csv,
+                "params": {"title": f"{d.prefix} table {uuid.uuid4()}", "format": "csv"},
+            },
+        ),
+    ),
+    Endpoint(
+        "POST",
+        "/notes/{note_id}/rows",
+        lambda d, r, _: (
+            f"/notes/{d.table_id}/rows",
+            {"content": d.table_csv, "params": {"format": "csv"}},
+        ),
+    ),
+    Endpoint(
+        "GET",
+        "/notes/{note_id}/rows",
+        lambda d, r, _: (f"/notes/{d.table_id}/rows", {"params": {"limit": 100}}),
+    ),
+    Endpoint(
+        "POST",
+        "/notes/{note_id}/rows/query",
+        lambda d, r, _: (f"/notes/{d.table_id}/rows/query", {"json": ROW_QUERY}),
+    ),
+    Endpoint(
+        "POST",
+        "/notes/{note_id}/rows/histogram",
+        lambda d, r, _: (
+            f"/notes/{d.table_id}/rows/histogram",
+            {"json": {"column": "population", "bins": 20}},
+        ),
+    ),
+    Endpoint("GET", "/drafts/", lambda d, r, _: ("/drafts/", {})),
+    Endpoint(
+        "GET", "/drafts/{draft_id}", lambda d, r, _: (f"/drafts/{r.choice(d.draft_ids)}", {})
+    ),
+    Endpoint(
+        "POST",
+        "/drafts/",
+        lambda d, r, _: ("/drafts/", {"json": {"title": f"{d.prefix} new draft", "body": "x"}}),
+    ),
+    Endpoint("DELETE", "/drafts/{draft_id}", lambda d, r, i: (f"/drafts/{i}", {}), _new_drafts),
+    Endpoint("POST", "/organize/{draft_id}", lambda d, r, i: (f"/organize/{i}", {}), _new_drafts),
+    Endpoint(
+        "POST",
+        "/organize/batch",
+        lambda d, r, i: ("/organize/batch", {"json": {"draft_ids": i}}),
+        _new_draft_batches,
+    ),
+    Endpoint("GET", "/tags/", lambda d, r, _: ("/tags/", {})),
+    Endpoint(
+        "POST", "/tags/", lambda d, r, _: ("/tags/", {"json": {"name": r.choice(d.tags)}})
+    ),
+    Endpoint("POST", "/tags/attach", lambda d, r, _: ("/tags/attach", _assignment(d, r))),
+    Endpoint("POST", "/tags/detach", lambda d, r, _: ("/tags/detach", _assignment(d, r))),
+    Endpoint("GET", "/graph/rank", lambda d, r, _: ("/graph/rank", {})),
+    Endpoint("GET", "/graph/components", lambda d, r, _: ("/graph/components", {})),
+    Endpoint("GET", "/graph/path", lambda d, r, _: ("/graph/path", _path(d, r)), ok=(200, 404)),
+] + [
+    Endpoint("GET", f"/admin/{name}", lambda d, r, _, name=name: (f"/admin/{name}", {}))
+    for name in ("cache", "columnar", "graph", "pool", "slow-queries", "tags")
+]
+
+
+# ---------------------------------------------------------------- driving
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    endpoint: Endpoint,
+    data: Dataset,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int,
+) -> Dict[str, Any]:
+    """Send ``requests`` requests to ``endpoint`` from ``concurrency`` workers."""
+
+    total = requests + warmup
+    items = await endpoint.setup(client, data, total) if endpoint.setup else [None] * total
+    rng = random.Random(seed)
+    calls = [endpoint.build(data, rng, item) for item in items]
+
+    for url, kwargs in calls[:warmup]:
+        await client.request(endpoint.method, url, **kwargs)
+
+    latencies: List[float] = []
+    statuses: Counter[int] = Counter()
+    pending = iter(calls[warmup:])
+
+    async def worker() -> None:
+        # Workers share one iterator, so each call is sent exactly once.
+        for url, kwargs in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.request(endpoint.method, url, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+
+    millis = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for code, count in statuses.items() if code not in endpoint.ok),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "seconds": round(seconds, 4),
+        "throughput": round(len(latencies) / seconds, 2) if seconds else 0.0,
+        "mean_ms": round(float(millis.mean()), 3),
+        "p50_ms": round(float(np.percentile(millis, 50)), 3),
+        "p95_ms": round(float(np.percentile(millis, 95)), 3),
+        "p99_ms": round(float(np.percentile(millis, 99)), 3),
+        "max_ms": round(float(millis.max()), 3),
+    }
+
+
+def _header() -> str:
+    return (
+        f"{'endpoint':<40}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    )
+
+
+def _row(name: str, result: Dict[str, Any]) -> str:
+    return (
+        f"{name:<40}{result['throughput']:>9.1f}{result['p50_ms']:>9.1f}"
+        f"{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['errors']:>8}"
+    )
+
+
+async def _run_all(
+    client: httpx.AsyncClient, args: argparse.Namespace, data: Dataset
+) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    print(_header())
+    for index, endpoint in enumerate(ENDPOINTS):
+        name = f"{endpoint.method} {endpoint.name}"
+        if args.only and not any(part in name for part in args.only):
+            continue
+        result = await drive(
+            client,
+            endpoint,
+            data,
+            args.requests,
+            args.concurrency,
+            args.warmup,
+            args.seed + index,
+        )
+        results[name] = result
+        print(_row(name, result), flush=True)
+    return results
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    prefix = f"bench-http-{uuid.uuid4().hex[:8]}"
+    data = await seed(args, prefix)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        if args.base_url:
+            async with httpx.AsyncClient(
+                base_url=args.base_url, timeout=args.timeout, limits=limits
+            ) as client:
+                results = await _run_all(client, args, data)
+        else:
+            from backend.app.main import app
+
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(
+                    transport=transport, base_url="http://bench", timeout=args.timeout
+                ) as client:
+                    results = await _run_all(client, args, data)
+    finally:
+        if not args.keep:
+            # The in-process lifespan disposes the engine on the way out.
+            init_engine()
+            await cleanup(prefix)
+
+    return {
+        "started": datetime.now(timezone.utc).isoformat(),
+        "target": args.base_url or "in-process",
+        "dataset": {
+            "notes": args.notes,
+            "links_per_note": args.links_per_note,
+            "tags": args.tags,
+            "drafts": args.drafts,
+            "table_rows": args.table_rows,
+            "seed": args.seed,
+        },
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "endpoints": results,
+    }
+
+
+# -------------------------------------------------------------- comparing
+
+
+def compare(
+    before: Dict[str, Any], after: Dict[str, Any], threshold: float, min_ms: float
+) -> List[str]:
+    """Print per-endpoint changes and return the names of regressed endpoints."""
+
+    regressions = []
+    print(f"{'endpoint':<40}{'p95 before':>12}{'p95 after':>11}{'change':>9}{'req/s':>9}")
+    for name, new in after["endpoints"].items():
+        old = before["endpoints"].get(name)
+        if old is None:
+            print(f"{name:<40}{'-':>12}{new['p95_ms']:>11.1f}{'new':>9}")
+            continue
+        latency = new["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        throughput = new["throughput"] / old["throughput"] - 1 if old["throughput"] else 0.0
+        reasons = []
+        if latency > threshold and new["p95_ms"] - old["p95_ms"] > min_ms:
+            reasons.append("p95")
+        if throughput < -threshold:
+            reasons.append("throughput")
+        if new["errors"] > old["errors"]:
+            reasons.append("errors")
+        if reasons:
+            regressions.append(name)
+        print(
+            f"{name:<40}{old['p95_ms']:>12.1f}{new['p95_ms']:>11.1f}{latency:>+9.0%}"
+            f"{throughput:>+9.0%}" + (f"  REGRESSION ({', '.join(reasons)})" if reasons else "")
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="seed a dataset and benchmark every endpoint")
+    run.add_argument("--base-url", help="running server to target; in-process by default")
+    run.add_argument("--notes", type=int, default=2000)
+    run.add_argument("--links-per-note", type=float, default=3.0)
+    run.add_argument("--tags", type=int, default=50)
+    run.add_argument("--drafts", type=int, default=200)
+    run.add_argument("--table-rows", type=int, default=20_000)
+    run.add_argument("--body-words", type=int, default=150)
+    run.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    run.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--timeout", type=float, default=60.0)
+    run.add_argument("--only", nargs="*", help="only endpoints whose name contains one of these")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    run.add_argument("--output", help="write the results to this JSON file")
+
+    diff = commands.add_parser("compare", help="compare two saved runs")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    diff.add_argument("--threshold", type=float, default=0.10, help="relative change to flag")
+    diff.add_argument(
+        "--min-ms", type=float, default=1.0, help="ignore p95 increases smaller than this"
+    )
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.before, encoding="utf-8") as handle:
+            before = json.load(handle)
+        with open(args.after, encoding="utf-8") as handle:
+            after = json.load(handle)
+        regressions = compare(before, after, args.threshold, args.min_ms)
+        print(f"{len(regressions)} regression(s)")
+        sys.exit(1 if regressions else 0)
+
+    report = asyncio.run(with_engine(_run(args)))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare single-note creation with :meth:`NoteRepository.create_many`.
+
+Needs a migrated database at ``$DATABASE_URL``; every note it creates is
+deleted again afterwards. Example::
+
+    python -m benchmarks.bulk_create --count 20000 --batch-size 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import delete
+
+from backend.app.db.models import Note, NoteContentType
+from backend.app.db.session import SessionLocal, with_engine
+from backend.app.repositories import NoteRepository
+
+
+def _payloads(count: int, prefix: str) -> List[Dict[str, Any]]:
+    body = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8
+    return [
+        {
+            "title": f"{prefix} {index}",
+            "content_type": NoteContentType.MARKDOWN,
+            "body": f"{body}#{index}",
+        }
+        for index in range(count)
+    ]
+
+
+async def _single(count: int) -> float:
+    payloads = _payloads(count, "bench-single")
+    started = time.perf_counter()
+    async with SessionLocal() as session:
+        repo = NoteRepository(session)
+        for payload in payloads:
+            await repo.create(**payload)
+    return time.perf_counter() - started
+
+
+async def _bulk(count: int, batch_size: int) -> float:
+    payloads = _payloads(count, "bench-bulk")
+    started = time.perf_counter()
+    async with SessionLocal() as session:
+        repo = NoteRepository(session)
+        for start in range(0, count, batch_size):
+            await repo.create_many(payloads[start : start + batch_size])
+    return time.perf_counter() - started
+
+
+async def _cleanup() -> None:
+    async with SessionLocal() as session:
+        await session.execute(delete(Note).where(Note.title.like("bench-%")))
+        await session.commit()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        single = await _single(args.single_count)
+        bulk = await _bulk(args.count, args.batch_size)
+    finally:
+        await _cleanup()
+
+    single_rate = args.single_count / single
+    bulk_rate = args.count / bulk
+    print(f"single: {args.single_count} notes in {single:.2f}s ({single_rate:,.0f} notes/s)")
+    print(f"bulk:   {args.count} notes in {bulk:.2f}s ({bulk_rate:,.0f} notes/s)")
+    print(f"speedup: {bulk_rate / single_rate:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--single-count", type=int, default=2_000)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    asyncio.run(with_engine(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
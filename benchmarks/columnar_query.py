@@ -0,0 +1,137 @@
+"""Compare aggregate row queries on the SQL JSONB path and the columnar cache.
+
+Loads a synthetic table note through :class:`TableIngestor`, then runs the
+same group-by/aggregate queries through :func:`query_rows` and through a
+columnar snapshot (:func:`evaluate`). It reports the snapshot build time,
+its size and the median latency of each engine, then deletes the note again.
+Needs a migrated database at ``$DATABASE_URL``. Example::
+
+    python -m benchmarks.columnar_query --rows 500000 --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import delete
+
+from backend.app.db.models import Note
+from backend.app.db.session import SessionLocal, with_engine
+from backend.app.services.tables import (
+    ColumnarCache,
+    TableIngestor,
+    csv_source,
+    evaluate,
+    histogram,
+    load_table_schema,
+    query_rows,
+)
+
+from .table_ingest import _write_csv
+
+QUERIES: Dict[str, Dict[str, Any]] = {
+    "count": {"aggregates": [{"fn": "count"}]},
+    "sum/avg": {
+        "aggregates": [
+            {"fn": "sum", "column": "population"},
+            {"fn": "avg", "column": "ratio"},
+        ]
+    },
+    "group by city": {
+        "group_by": ["city"],
+        "aggregates": [
+            {"fn": "count"},
+            {"fn": "avg", "column": "population"},
+            {"fn": "max", "column": "founded"},
+        ],
+    },
+    "filtered group": {
+        "filters": [
+            {"column": "active", "value": True},
+            {"column": "ratio", "op": "gte", "value": 0.5},
+        ],
+        "group_by": ["city", "active"],
+        "aggregates": [{"fn": "min", "column": "population"}, {"fn": "sum", "column": "ratio"}],
+    },
+}
+
+
+async def _median_ms(repeat: int, run: Callable[[], Any]) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rows.csv")
+        _write_csv(path, args.rows, args.seed)
+        with open(path, "rb") as handle:
+            async with SessionLocal() as session:
+                ingestor = TableIngestor(session)
+                note_id = await ingestor.create_table("bench-columnar-query")
+                await ingestor.ingest(note_id, csv_source(handle))
+
+    try:
+        async with SessionLocal() as session:
+            table = await load_table_schema(session, note_id)
+            assert table is not None
+            columns, _ = table
+            cache = ColumnarCache()
+
+            started = time.perf_counter()
+            snapshot = await cache.get(session, note_id)
+            assert snapshot is not None
+            load_seconds = time.perf_counter() - started
+            print(
+                f"rows: {snapshot.row_count:,}  snapshot: {load_seconds:.2f}s, "
+                f"{snapshot.nbytes / (1024 * 1024):,.1f} MB"
+            )
+            print(f"{'query':<16}{'sql ms':>10}{'columnar ms':>14}{'speedup':>10}")
+
+            for name, query in QUERIES.items():
+
+                async def sql(query: Dict[str, Any] = query) -> Any:
+                    return await query_rows(session, note_id, columns, **query)
+
+                async def columnar(query: Dict[str, Any] = query) -> Any:
+                    current = await cache.get(session, note_id)
+                    return evaluate(current, **query)  # type: ignore[arg-type]
+
+                sql_ms = await _median_ms(args.repeat, sql)
+                columnar_ms = await _median_ms(args.repeat, columnar)
+                print(
+                    f"{name:<16}{sql_ms:>10.1f}{columnar_ms:>14.1f}"
+                    f"{sql_ms / columnar_ms:>9.1f}x"
+                )
+
+            async def hist() -> Any:
+                current = await cache.get(session, note_id)
+                return histogram(current, "population", bins=50)  # type: ignore[arg-type]
+
+            print(f"{'histogram':<16}{'-':>10}{await _median_ms(args.repeat, hist):>14.1f}")
+    finally:
+        async with SessionLocal() as session:
+            await session.execute(delete(Note).where(Note.id == note_id))
+            await session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(with_engine(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure NDJSON export throughput and peak memory.
+
+Streams the whole corpus through :func:`export_notes` and the chosen
+compressor, discarding the output. Seed the database first, e.g. with one
+million notes, to check that peak RSS stays flat as the corpus grows.
+Example::
+
+    python -m benchmarks.export --compression gzip
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import resource
+import sys
+import time
+
+from backend.app.db.session import SessionLocal, with_engine
+from backend.app.services.export import COMPRESSIONS, compress, export_notes
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _main(args: argparse.Namespace) -> None:
+    baseline = _peak_rss_mb()
+    raw = written = lines = 0
+
+    async def counted():
+        nonlocal raw, lines
+        async for chunk in export_notes(session):
+            raw += len(chunk)
+            lines += chunk.count(b"\n")
+            yield chunk
+
+    started = time.perf_counter()
+    async with SessionLocal() as session:
+        async for chunk in compress(counted(), args.compression):
+            written += len(chunk)
+    seconds = time.perf_counter() - started
+
+    mb = raw / (1024 * 1024)
+    print(f"records: {lines:,} in {seconds:.2f}s ({lines / seconds:,.0f} records/s)")
+    print(f"raw:     {mb:,.1f} MB ({mb / seconds:,.1f} MB/s)")
+    if args.compression != "none":
+        ratio = raw / written if written else 0.0
+        print(f"output:  {written / (1024 * 1024):,.1f} MB ({args.compression}, {ratio:.1f}x)")
+    print(f"peak RSS: {_peak_rss_mb():,.1f} MB (baseline {baseline:,.1f} MB)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none")
+    asyncio.run(with_engine(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
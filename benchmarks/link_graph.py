@@ -0,0 +1,95 @@
+"""Build time, memory per link and query latency of the in-memory link graph.
+
+The graph is synthetic and needs no database. Link targets follow a power
+law, so a few hub notes collect most backlinks, as wiki-style notes do.
+The benchmark also folds a batch of new links into the graph, which is what
+:class:`LinkGraphStore` does after ``create_link``. Example::
+
+    python -m benchmarks.link_graph --notes 200000 --links 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import uuid
+
+import numpy as np
+
+from backend.app.services.graph import LinkGraph, LinkGraphStore
+from backend.app.services.graph.store import _build
+
+
+def _links(notes: int, links: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(0, notes, size=links)
+    targets = np.minimum(rng.zipf(1.6, size=links) - 1, notes - 1)
+    targets = rng.permutation(notes)[targets]
+    kinds = (rng.random(links) < 0.3).astype(np.int64)
+    return np.stack([sources, targets, kinds], axis=1)
+
+
+def _timed(label: str, run, repeat: int = 1):  # type: ignore[no-untyped-def]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        value = run()
+    print(f"{label:<28}{(time.perf_counter() - started) * 1000 / repeat:>10.1f} ms")
+    return value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=200_000)
+    parser.add_argument("--links", type=int, default=1_000_000)
+    parser.add_argument("--paths", type=int, default=200)
+    parser.add_argument("--appends", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ids = [uuid.UUID(int=i + 1) for i in range(args.notes)]
+    coded = _links(args.notes, args.links, args.seed)
+    edges = [(ids[s], ids[t], int(k)) for s, t, k in coded.tolist()]
+
+    graph: LinkGraph = _timed("build from rows", lambda: _build(edges))
+    id_bytes = sys.getsizeof(graph.index) + sum(
+        sys.getsizeof(node_id) + sys.getsizeof(node_id.int) for node_id in graph.ids
+    )
+    print(
+        f"notes {graph.node_count:,}  links {graph.edge_count:,}  "
+        f"arrays {graph.nbytes / 2**20:.1f} MB ({graph.nbytes / graph.edge_count:.1f} B/link)  "
+        f"id map {id_bytes / 2**20:.1f} MB ({id_bytes / len(graph.ids):.0f} B/note)"
+    )
+
+    ranks = _timed("pagerank", graph.pagerank)
+    _timed("degrees", graph.degrees, repeat=10)
+    labels = _timed("components", graph.components)
+    print(f"{'':<28}{np.unique(labels).size:>10,} components, rank sum {ranks.sum():.4f}")
+
+    rng = np.random.default_rng(args.seed + 1)
+    # Targets are drawn from link targets so that outgoing walks can reach them.
+    sources = rng.choice(coded[:, 0], size=args.paths)
+    targets = rng.choice(coded[:, 1], size=args.paths)
+    for direction in ("out", "both"):
+        latencies = []
+        found = 0
+        for source, target in zip(sources, targets):
+            started = time.perf_counter()
+            path = graph.shortest_path(ids[source], ids[target], direction)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found += path is not None
+        print(
+            f"shortest path ({direction})".ljust(28)
+            + f"p50={np.percentile(latencies, 50):.2f}ms p99={np.percentile(latencies, 99):.2f}ms"
+            + f" found {found}/{args.paths}"
+        )
+
+    store = LinkGraphStore()
+    store._graph = graph
+    extra = _links(args.notes, args.appends, args.seed + 2)
+    store._added = [(ids[s], ids[t], int(k)) for s, t, k in extra.tolist()]
+    _timed(f"fold {args.appends} new links", store._fold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Compare CPU per ``GET /notes/`` page for the ORM and the column-row paths.
+
+``orm`` is the path ``list_notes`` used to take. It loads ``Note`` entities
+with their contents, builds a ``NoteSchema`` per note and a ``NotePage``,
+and then does what ``response_model`` did: dump, validate again and render.
+``rows`` is the current path. It reads :meth:`NoteRepository.list_rows` and
+encodes the dicts with :func:`dump_json_bytes`. Both walk the same pages, and
+the benchmark checks that they produce the same JSON.
+
+Needs a migrated database at ``$DATABASE_URL``. It seeds ``--notes`` markdown
+notes with embeddings and deletes them afterwards. CPU is process time, so
+the time Postgres spends is not counted. Example::
+
+    python -m benchmarks.list_serialization --notes 2000 --page-size 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+
+from backend.app.api.routes.schemas import NotePage
+from backend.app.api.schemas import dump_json_bytes, to_schema
+from backend.app.db.models import Note, NoteContentType, NoteSchema, TextContent
+from backend.app.db.session import SessionLocal, with_engine
+from backend.app.repositories import NoteRepository
+from backend.app.services.similarity import encode_embedding
+
+_PREFIX = "bench-list"
+_BATCH = 1000
+
+# Fetch and encode one page; returns the JSON body and the next cursor.
+Encoder = Callable[[NoteRepository, int, Optional[str]], Awaitable[Tuple[bytes, Optional[str]]]]
+
+
+async def _orm_page(
+    repo: NoteRepository, limit: int, cursor: Optional[str]
+) -> Tuple[bytes, Optional[str]]:
+    page = await repo.list(limit=limit, cursor=cursor)
+    response = NotePage(
+        items=[to_schema(NoteSchema, note) for note in page.items],
+        next_cursor=page.next_cursor,
+    )
+    checked = NotePage.model_validate(response.model_dump())
+    body = json.dumps(
+        checked.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    return body, page.next_cursor
+
+
+async def _rows_page(
+    repo: NoteRepository, limit: int, cursor: Optional[str]
+) -> Tuple[bytes, Optional[str]]:
+    page = await repo.list_rows(limit=limit, cursor=cursor)
+    body = dump_json_bytes({"items": page.items, "next_cursor": page.next_cursor})
+    return body, page.next_cursor
+
+
+async def _seed(count: int, dim: int) -> None:
+    rng = random.Random(0)
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod".split()
+    async with SessionLocal() as session:
+        repo = NoteRepository(session)
+        for start in range(0, count, _BATCH):
+            payloads = [
+                {
+                    "title": f"{_PREFIX} {index}",
+                    "content_type": NoteContentType.MARKDOWN,
+                    "body": " ".join(rng.choice(words) for _ in range(120)),
+                }
+                for index in range(start, min(start + _BATCH, count))
+            ]
+            await repo.create_many(payloads)
+        vector = [rng.uniform(-1, 1) for _ in range(dim)]
+        seeded = select(Note.id).where(Note.title.like(f"{_PREFIX} %"))
+        await session.execute(
+            update(TextContent)
+            .where(TextContent.note_id.in_(seeded))
+            .values(embedding=encode_embedding(vector, "bench"))
+        )
+        await session.commit()
+
+
+async def _cleanup() -> None:
+    async with SessionLocal() as session:
+        await session.execute(delete(Note).where(Note.title.like(f"{_PREFIX} %")))
+        await session.commit()
+
+
+async def _walk(encode: Encoder, pages: int, page_size: int) -> Tuple[float, float, List[bytes]]:
+    """Encode the first ``pages`` pages; returns CPU seconds, wall seconds and bodies."""
+
+    bodies: List[bytes] = []
+    cursor: Optional[str] = None
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    async with SessionLocal() as session:
+        repo = NoteRepository(session)
+        for _ in range(pages):
+            body, cursor = await encode(repo, page_size, cursor)
+            bodies.append(body)
+            if cursor is None:
+                break
+    return time.process_time() - cpu_started, time.perf_counter() - wall_started, bodies
+
+
+async def _main(args: argparse.Namespace) -> None:
+    await _seed(args.notes, args.dim)
+    try:
+        pages = max(args.notes // args.page_size, 1)
+        # Warm both paths (statement caches, imports) before timing.
+        await _walk(_orm_page, 1, args.page_size)
+        await _walk(_rows_page, 1, args.page_size)
+
+        results = {}
+        for name, encode in (("orm", _orm_page), ("rows", _rows_page)):
+            cpu = wall = 0.0
+            walked = 0
+            for _ in range(args.rounds):
+                spent, elapsed, bodies = await _walk(encode, pages, args.page_size)
+                cpu, wall, walked = cpu + spent, wall + elapsed, walked + len(bodies)
+            results[name] = (cpu / walked, wall / walked, bodies)
+    finally:
+        await _cleanup()
+
+    identical = all(
+        json.loads(old) == json.loads(new)
+        for old, new in zip(results["orm"][2], results["rows"][2])
+    )
+    print(f"{args.page_size} notes per page, {args.dim}-dimension embeddings")
+    for name, (cpu, wall, bodies) in results.items():
+        size = sum(len(body) for body in bodies) / len(bodies) / 1024
+        print(
+            f"{name:>5}: {cpu * 1000:7.2f} ms CPU/page  {wall * 1000:7.2f} ms wall/page  "
+            f"{size:,.0f} KiB/page"
+        )
+    print(f"CPU speedup: {results['orm'][0] / results['rows'][0]:.1f}x")
+    print(f"identical JSON: {'yes' if identical else 'NO'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=2_000)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(with_engine(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Latency and recall@k of :class:`IVFIndex` against exact brute-force search.
+
+Vectors are drawn from a mixture of Gaussians so clusters exist the way they
+do for real text embeddings. Example::
+
+    python -m benchmarks.similarity_recall --count 1000000 --dim 128 --nprobe 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from backend.app.services.similarity.ivf import IVFIndex, normalize
+
+
+def _dataset(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    out = np.empty((count, dim), dtype=np.float32)
+    block = 100_000
+    for start in range(0, count, block):
+        stop = min(start + block, count)
+        picks = rng.integers(0, clusters, size=stop - start)
+        noise = rng.normal(scale=0.35, size=(stop - start, dim)).astype(np.float32)
+        out[start:stop] = centers[picks] + noise
+    return normalize(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = _dataset(args.count, args.dim, args.clusters, args.seed)
+    ids = [uuid.UUID(int=i + 1) for i in range(args.count)]
+
+    started = time.perf_counter()
+    index = IVFIndex.train(ids, vectors, seed=args.seed)
+    with tempfile.TemporaryDirectory() as path:
+        index = index.compact_to(path)
+        print(
+            f"built {args.count} x {args.dim} index with {len(index.centroids)} lists "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        rng = np.random.default_rng(args.seed + 1)
+        query_rows = rng.choice(args.count, size=args.queries, replace=False)
+        queries = vectors[query_rows]
+
+        truth = []
+        for query, row in zip(queries, query_rows):
+            scores = vectors @ query
+            scores[row] = -np.inf
+            top = np.argpartition(-scores, args.k)[: args.k]
+            truth.append({ids[i] for i in top})
+
+        for nprobe in args.nprobe:
+            latencies = []
+            hits = 0
+            for query, row, expected in zip(queries, query_rows, truth):
+                started = time.perf_counter()
+                found = index.search(query, k=args.k, nprobe=nprobe, exclude=[ids[row]])
+                latencies.append(time.perf_counter() - started)
+                hits += len(expected & {item for item, _ in found})
+            latencies_ms = np.array(latencies) * 1000
+            print(
+                f"nprobe={nprobe:<4} recall@{args.k}={hits / (args.k * args.queries):.3f} "
+                f"p50={np.percentile(latencies_ms, 50):.2f}ms "
+                f"p99={np.percentile(latencies_ms, 99):.2f}ms"
+            )
+        del index
+
+
+if __name__ == "__main__":
+    main()
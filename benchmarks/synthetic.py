@@ -0,0 +1,531 @@
+"""Generate a large synthetic dataset and stream it into Postgres with ``COPY``.
+
+Fills every table: notes with their text or table contents, table rows,
+tags and note tags, links and drafts. The work is cut into fixed-size blocks
+of notes. Each block is generated from ``(seed, phase, block)`` alone, so
+the same seed loads the same rows, ids included, whatever ``--workers`` is.
+Worker processes take blocks from a pool. Each one loads its blocks over
+its own connection, with the binary ``COPY`` protocol, one transaction per
+block. Links are loaded in a second pass, once every note exists.
+
+The data aims for realistic shape rather than content. Body lengths are
+log-normal over a Zipf-distributed vocabulary. A small share of notes are
+tables, whose row counts are log-normal too. Tag use is Zipf-distributed.
+Link in-degree follows a power law, so a few hub notes collect most
+backlinks, and out-degree is Zipf-distributed. Search vectors are built
+in SQL as notes are inserted, exactly as the importer does.
+
+Load into an empty database, or use a seed that has not been loaded yet:
+ids are derived from the seed, so loading the same seed twice collides.
+Example::
+
+    python -m benchmarks.synthetic --notes 1000000 --workers 8 --seed 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+import numpy as np
+from sqlalchemy import column
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import make_url
+
+from backend.app.db.search import search_document
+from backend.app.db.session import DATABASE_URL
+
+BLOCK = 10_000
+_SECONDS_PER_DAY = 86_400
+_EPOCH = date(1970, 1, 1)
+_ODD = 0x9E3779B97F4A7C15F39CC0605CEDC835  # 128-bit odd multiplier: index -> id is a bijection
+_MASK = (1 << 128) - 1
+_STAGE = "synthetic_notes_stage"
+_ZIPF_OUT = 2.5
+_ZIPF_OUT_MEAN = 0.9463  # zeta(1.5) / zeta(2.5) - 1, the mean of zipf(2.5) - 1
+_RANK_OFFSET = 10
+_COLUMN_TYPES = ("integer", "number", "boolean", "date", "string")
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "an", "or", "el", "du", "pe")
+
+_SEARCH_DOCUMENT = str(
+    search_document(column("title"), column("body")).compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+)
+_CREATE_STAGE = f"""
+    CREATE TEMPORARY TABLE {_STAGE} (
+        id uuid NOT NULL,
+        content_id uuid NOT NULL,
+        title text NOT NULL,
+        body text NOT NULL,
+        content_type text NOT NULL,
+        archived boolean NOT NULL,
+        created_at timestamptz NOT NULL,
+        updated_at timestamptz NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+_INSERT_NOTES = f"""
+    INSERT INTO notes (id, title, content_type, archived, created_at, updated_at, search_vector)
+    SELECT id, title, content_type::note_content_type, archived, created_at, updated_at,
+           {_SEARCH_DOCUMENT}
+    FROM {_STAGE}
+"""
+_INSERT_BODIES = f"""
+    INSERT INTO text_contents (id, note_id, body, created_at, updated_at)
+    SELECT content_id, id, body, created_at, updated_at
+    FROM {_STAGE} WHERE content_type = 'markdown'
+"""
+_TABLE_CONTENT_COLUMNS = ("id", "note_id", "schema_json", "row_count", "created_at", "updated_at")
+_DRAFT_COLUMNS = ("id", "title", "body", "editor_state", "metadata", "created_at", "updated_at")
+_TABLES = (
+    "notes",
+    "text_contents",
+    "table_contents",
+    "table_rows",
+    "tags",
+    "note_tags",
+    "note_links",
+    "drafts",
+)
+
+
+def ids(seed: int, kind: str, indexes: Sequence[int]) -> List[uuid.UUID]:
+    """Deterministic, well-spread UUIDs for ``indexes`` of one kind of row."""
+
+    digest = hashlib.blake2b(f"{seed}:{kind}".encode(), digest_size=16).digest()
+    base = int.from_bytes(digest, "big")
+    return [uuid.UUID(int=(index * _ODD + base) & _MASK) for index in indexes]
+
+
+def _rng(seed: int, phase: int, block: int) -> np.random.Generator:
+    return np.random.default_rng([seed, phase, block])
+
+
+class Corpus:
+    """A long word stream; bodies and titles are slices of it.
+
+    Slicing one prebuilt string at word boundaries is far cheaper than
+    joining fresh words for every note.
+    """
+
+    def __init__(self, seed: int, words: int = 2_000_000, vocabulary: int = 20_000) -> None:
+        rng = _rng(seed, 0, 0)
+        lengths = rng.integers(1, 5, size=vocabulary)
+        picks = rng.integers(0, len(_SYLLABLES), size=(vocabulary, 4))
+        vocab = sorted(
+            {"".join(_SYLLABLES[p] for p in row[:n]) for row, n in zip(picks, lengths)}
+        )
+        # Zipf word frequencies, as in natural text.
+        ranks = np.minimum(rng.zipf(1.2, size=words) - 1, len(vocab) - 1)
+        stream = [vocab[rank] for rank in ranks]
+        self.vocabulary = vocab
+        self.text = " ".join(stream)
+        lengths = np.fromiter((len(word) + 1 for word in stream), dtype=np.int64, count=words)
+        self.starts = np.concatenate([[0], np.cumsum(lengths)])
+        self.words = words
+
+    def slice(self, offset: int, words: int) -> str:
+        words = min(words, self.words - 1)
+        offset %= self.words - words
+        return self.text[self.starts[offset] : self.starts[offset + words] - 1]
+
+
+class _Worker:
+    """Per-process state: event loop, connection, settings and corpus."""
+
+    loop: asyncio.AbstractEventLoop
+    connection: asyncpg.Connection
+    args: argparse.Namespace
+    tag_ids: List[uuid.UUID]
+    corpus: Corpus
+
+
+_worker = _Worker()
+
+
+def _dsn(url: str) -> str:
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def _init_worker(args: argparse.Namespace, tag_ids: List[uuid.UUID]) -> None:
+    _worker.loop = asyncio.new_event_loop()
+    _worker.connection = _worker.loop.run_until_complete(asyncpg.connect(_dsn(args.database_url)))
+    _worker.loop.run_until_complete(_worker.connection.execute("SET synchronous_commit = off"))
+    _worker.loop.run_until_complete(_worker.connection.execute(_CREATE_STAGE))
+    _worker.args = args
+    _worker.tag_ids = tag_ids
+    _worker.corpus = Corpus(args.seed)
+
+
+def _timestamps(
+    args: argparse.Namespace, rng: np.random.Generator, positions: np.ndarray
+) -> Tuple[List[datetime], List[datetime]]:
+    """Creation times spread over ``--days`` in index order, edits some days later."""
+
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc)
+    span = args.days * _SECONDS_PER_DAY
+    created = positions * span + rng.uniform(0, 3600, size=positions.size)
+    edited = created + np.minimum(rng.exponential(7 * _SECONDS_PER_DAY, size=positions.size), span)
+    return (
+        [start + timedelta(seconds=float(value)) for value in created],
+        [start + timedelta(seconds=float(value)) for value in edited],
+    )
+
+
+def _table(
+    rng: np.random.Generator, rows: int, corpus: Corpus
+) -> Tuple[Dict[str, Any], List[str]]:
+    """A random column schema and ``rows`` JSON-encoded rows that fit it."""
+
+    kinds = rng.choice(_COLUMN_TYPES, size=int(rng.integers(3, 13)))
+    picks = rng.integers(0, len(corpus.vocabulary), kinds.size)
+    names = [f"{corpus.vocabulary[int(i)]}_{n}" for n, i in enumerate(picks)]
+    values: List[List[Any]] = []
+    for kind in kinds:
+        if kind == "integer":
+            values.append(rng.integers(0, 1_000_000, size=rows).tolist())
+        elif kind == "number":
+            values.append(np.round(rng.lognormal(3, 1.5, size=rows), 4).tolist())
+        elif kind == "boolean":
+            values.append((rng.random(rows) < 0.5).tolist())
+        elif kind == "date":
+            days = rng.integers(0, 20_000, size=rows)
+            values.append([(_EPOCH + timedelta(days=int(d))).isoformat() for d in days])
+        else:
+            # Low-cardinality labels, like the categories real tables group by.
+            labels = corpus.vocabulary[: int(rng.integers(5, 200))]
+            values.append([labels[int(i)] for i in rng.integers(0, len(labels), size=rows)])
+    # Some cells are empty.
+    empty = rng.random((kinds.size, rows)) < 0.02
+    encoded = [
+        json.dumps({name: (None if empty[c, r] else values[c][r]) for c, name in enumerate(names)})
+        for r in range(rows)
+    ]
+    schema = {"columns": [{"name": n, "type": str(k)} for n, k in zip(names, kinds)]}
+    return schema, encoded
+
+
+# ----------------------------------------------------------------- blocks
+
+
+def _note_block(block: int) -> Counter:
+    """Generate and load notes ``[block * BLOCK, ...)`` with their contents and tags."""
+
+    args, corpus = _worker.args, _worker.corpus
+    rng = _rng(args.seed, 1, block)
+    first = block * BLOCK
+    indexes = range(first, min(first + BLOCK, args.notes))
+    count = len(indexes)
+    note_ids = ids(args.seed, "note", indexes)
+    created, updated = _timestamps(args, rng, np.asarray(indexes) / args.notes)
+
+    is_table = rng.random(count) < args.table_fraction
+    archived = rng.random(count) < 0.05
+    title_words = rng.integers(2, 9, size=count)
+    body_words = np.clip(
+        rng.lognormal(math.log(args.body_words), 1.0, size=count), 1, 20_000
+    ).astype(np.int64)
+    offsets = rng.integers(0, corpus.words, size=count)
+    title_offsets = rng.integers(0, corpus.words, size=count)
+
+    stage = []
+    content_ids = ids(args.seed, "text", indexes)
+    for i in range(count):
+        title = corpus.slice(int(title_offsets[i]), int(title_words[i])).capitalize()
+        body = "" if is_table[i] else corpus.slice(int(offsets[i]), int(body_words[i]))
+        stage.append(
+            (
+                note_ids[i],
+                content_ids[i],
+                title,
+                body,
+                "table" if is_table[i] else "markdown",
+                bool(archived[i]),
+                created[i],
+                updated[i],
+            )
+        )
+
+    tables, rows = [], []
+    table_positions = np.flatnonzero(is_table)
+    table_ids = ids(args.seed, "table", [first + int(p) for p in table_positions])
+    row_counts = np.clip(
+        rng.lognormal(math.log(args.table_rows), 1.2, size=table_positions.size),
+        1,
+        args.max_table_rows,
+    ).astype(np.int64)
+    for position, table_id, row_count in zip(table_positions, table_ids, row_counts):
+        note_index = first + int(position)
+        schema, encoded = _table(rng, int(row_count), corpus)
+        tables.append(
+            (
+                table_id,
+                note_ids[position],
+                json.dumps(schema),
+                int(row_count),
+                created[position],
+                updated[position],
+            )
+        )
+        row_ids = ids(args.seed, "row", [(note_index << 32) | r for r in range(int(row_count))])
+        rows.extend((row_id, note_ids[position], data) for row_id, data in zip(row_ids, encoded))
+
+    # Tag popularity is Zipf: a few tags are on most notes.
+    tag_count = len(_worker.tag_ids)
+    per_note = rng.poisson(args.tags_per_note, size=count)
+    note_tags = []
+    for i in range(count):
+        if not per_note[i] or not tag_count:
+            continue
+        ranks = np.unique(np.minimum(rng.zipf(1.5, size=per_note[i]) - 1, tag_count - 1))
+        note_tags.extend(
+            (note_ids[i], _worker.tag_ids[int(rank)], created[i], created[i]) for rank in ranks
+        )
+
+    async def load() -> None:
+        connection = _worker.connection
+        async with connection.transaction():
+            await connection.copy_records_to_table(
+                _STAGE,
+                records=stage,
+                columns=(
+                    "id",
+                    "content_id",
+                    "title",
+                    "body",
+                    "content_type",
+                    "archived",
+                    "created_at",
+                    "updated_at",
+                ),
+            )
+            await connection.execute(_INSERT_NOTES)
+            await connection.execute(_INSERT_BODIES)
+            if tables:
+                await connection.copy_records_to_table(
+                    "table_contents",
+                    records=tables,
+                    columns=_TABLE_CONTENT_COLUMNS,
+                )
+                await connection.copy_records_to_table(
+                    "table_rows", records=rows, columns=("id", "table_note_id", "row_data")
+                )
+            if note_tags:
+                await connection.copy_records_to_table(
+                    "note_tags",
+                    records=note_tags,
+                    columns=("note_id", "tag_id", "created_at", "updated_at"),
+                )
+
+    _worker.loop.run_until_complete(load())
+    return Counter(
+        notes=count,
+        text_contents=count - len(tables),
+        table_contents=len(tables),
+        table_rows=len(rows),
+        note_tags=len(note_tags),
+    )
+
+
+def _link_block(block: int) -> Counter:
+    """Generate and load the outgoing links of notes ``[block * BLOCK, ...)``."""
+
+    args = _worker.args
+    rng = _rng(args.seed, 2, block)
+    first = block * BLOCK
+    sources = np.arange(first, min(first + BLOCK, args.notes))
+    notes = args.notes
+
+    # Out-degree is Zipf-distributed (most notes link to a few others, some to
+    # hundreds), scaled so the mean is --links-per-note.
+    scale = args.links_per_note / _ZIPF_OUT_MEAN
+    degree = np.floor(
+        (rng.zipf(_ZIPF_OUT, size=sources.size) - 1) * scale + rng.random(sources.size)
+    )
+    repeated = np.repeat(sources, np.minimum(degree, 1000).astype(np.int64))
+    # Target ranks follow P(rank) ~ 1 / (rank + offset), which gives a
+    # power-law in-degree whose top hub still gets only about 1% of links.
+    # A fixed permutation maps ranks onto notes, so the hubs are spread over
+    # the corpus rather than being its first notes.
+    low, high = math.log(_RANK_OFFSET), math.log(notes + _RANK_OFFSET)
+    ranks = np.exp(low + rng.random(repeated.size) * (high - low)).astype(np.int64)
+    ranks = np.minimum(ranks - _RANK_OFFSET, notes - 1)
+    stride = next(p for p in (2_147_483_647, 1_000_003, 7_919, 1) if math.gcd(p, notes) == 1)
+    targets = (ranks * stride + args.seed) % notes
+
+    keep = repeated != targets
+    pairs = np.unique(repeated[keep] * notes + targets[keep])
+    repeated, targets = pairs // notes, pairs % notes
+    inferred = rng.random(pairs.size) < args.inferred_fraction
+    scores = rng.uniform(0.75, 0.99, size=pairs.size)
+
+    source_ids = ids(args.seed, "note", repeated.tolist())
+    target_ids = ids(args.seed, "note", targets.tolist())
+    link_ids = ids(args.seed, "link", pairs.tolist())
+    created, _ = _timestamps(args, rng, (repeated + 1) / notes)
+    records = [
+        (
+            link_ids[i],
+            source_ids[i],
+            target_ids[i],
+            "ai_inferred" if inferred[i] else "explicit",
+            f"{scores[i]:.2f} similar" if inferred[i] else None,
+            created[i],
+            created[i],
+        )
+        for i in range(pairs.size)
+    ]
+
+    async def load() -> None:
+        connection = _worker.connection
+        async with connection.transaction():
+            await connection.copy_records_to_table(
+                "note_links",
+                records=records,
+                columns=(
+                    "id",
+                    "source_id",
+                    "target_id",
+                    "link_type",
+                    "context_excerpt",
+                    "created_at",
+                    "updated_at",
+                ),
+            )
+
+    _worker.loop.run_until_complete(load())
+    return Counter(note_links=len(records))
+
+
+def _draft_block(block: int) -> Counter:
+    """Generate and load drafts ``[block * BLOCK, ...)``."""
+
+    args, corpus = _worker.args, _worker.corpus
+    rng = _rng(args.seed, 3, block)
+    first = block * BLOCK
+    indexes = range(first, min(first + BLOCK, args.drafts))
+    count = len(indexes)
+    draft_ids = ids(args.seed, "draft", indexes)
+    created, updated = _timestamps(args, rng, np.asarray(indexes) / max(args.drafts, 1))
+    untitled = rng.random(count) < 0.2
+    words = np.clip(rng.lognormal(math.log(args.body_words / 2), 1.0, size=count), 1, 5000)
+    offsets = rng.integers(0, corpus.words, size=count)
+    records = [
+        (
+            draft_ids[i],
+            None if untitled[i] else corpus.slice(int(offsets[i]) + 1, 4).capitalize(),
+            corpus.slice(int(offsets[i]), int(words[i])),
+            "{}",
+            "{}",
+            created[i],
+            updated[i],
+        )
+        for i in range(count)
+    ]
+
+    async def load() -> None:
+        await _worker.connection.copy_records_to_table(
+            "drafts",
+            records=records,
+            columns=_DRAFT_COLUMNS,
+        )
+
+    _worker.loop.run_until_complete(load())
+    return Counter(drafts=count)
+
+
+# ------------------------------------------------------------------- main
+
+
+async def _load_tags(args: argparse.Namespace) -> List[uuid.UUID]:
+    """Create the tag vocabulary (reusing existing names) and return ids by rank."""
+
+    rng = _rng(args.seed, 4, 0)
+    corpus_words = Corpus(args.seed, words=10, vocabulary=max(args.tags * 2, 100)).vocabulary
+    picks = rng.integers(0, len(corpus_words), args.tags)
+    names = [f"{corpus_words[int(i)]}-{rank}" for rank, i in enumerate(picks)]
+    connection = await asyncpg.connect(_dsn(args.database_url))
+    try:
+        await connection.execute(
+            "INSERT INTO tags (id, name) SELECT * FROM unnest($1::uuid[], $2::text[])"
+            " ON CONFLICT (name) DO NOTHING",
+            ids(args.seed, "tag", range(args.tags)),
+            names,
+        )
+        rows = await connection.fetch("SELECT name, id FROM tags WHERE name = any($1)", names)
+    finally:
+        await connection.close()
+    by_name = {row["name"]: row["id"] for row in rows}
+    return [by_name[name] for name in names]
+
+
+async def _analyze(args: argparse.Namespace) -> None:
+    connection = await asyncpg.connect(_dsn(args.database_url))
+    try:
+        for name in _TABLES:
+            await connection.execute(f"ANALYZE {name}")
+    finally:
+        await connection.close()
+
+
+def _run_phase(
+    pool: Any, label: str, task: Any, blocks: int, totals: Counter
+) -> None:
+    started = time.perf_counter()
+    done = 0
+    for counts in pool.imap_unordered(task, range(blocks)):
+        totals.update(counts)
+        done += 1
+        print(f"\r{label}: {done}/{blocks} blocks", end="", flush=True)
+    print(f"\r{label}: {blocks} blocks in {time.perf_counter() - started:.1f}s")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--drafts", type=int, default=10_000)
+    parser.add_argument("--tags", type=int, default=2_000)
+    parser.add_argument("--tags-per-note", type=float, default=2.0)
+    parser.add_argument("--links-per-note", type=float, default=4.0)
+    parser.add_argument("--inferred-fraction", type=float, default=0.3, help="AI_INFERRED share")
+    parser.add_argument("--body-words", type=int, default=120, help="median words per body")
+    parser.add_argument("--table-fraction", type=float, default=0.01, help="share of table notes")
+    parser.add_argument("--table-rows", type=int, default=100, help="median rows per table")
+    parser.add_argument("--max-table-rows", type=int, default=100_000)
+    parser.add_argument("--start", default="2023-01-01", help="creation date of the first note")
+    parser.add_argument("--days", type=int, default=730, help="days the notes are spread over")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    tag_ids = asyncio.run(_load_tags(args))
+    totals: Counter = Counter(tags=len(tag_ids))
+    note_blocks = -(-args.notes // BLOCK)
+    draft_blocks = -(-args.drafts // BLOCK)
+    with multiprocessing.Pool(args.workers, _init_worker, (args, tag_ids)) as pool:
+        _run_phase(pool, "notes", _note_block, note_blocks, totals)
+        _run_phase(pool, "links", _link_block, note_blocks, totals)
+        _run_phase(pool, "drafts", _draft_block, draft_blocks, totals)
+    asyncio.run(_analyze(args))
+
+    seconds = time.perf_counter() - started
+    rows = sum(totals.values())
+    for name in _TABLES:
+        print(f"{name:<16}{totals[name]:>14,}")
+    print(f"{rows:,} rows in {seconds:.1f}s ({rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
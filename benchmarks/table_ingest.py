@@ -0,0 +1,92 @@
+"""Measure sustained CSV ingest rate and peak memory for table notes.
+
+Writes a synthetic CSV to a temporary file, loads it into a new table note
+through :class:`TableIngestor`, reports throughput and peak RSS, and deletes
+the note again. Needs a migrated database at ``$DATABASE_URL``. Example::
+
+    python -m benchmarks.table_ingest --rows 500000 --batch-size 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from sqlalchemy import delete
+
+from backend.app.db.models import Note
+from backend.app.db.session import SessionLocal, with_engine
+from backend.app.services.tables import TableIngestor, csv_source
+
+CITIES = ["Paris", "Lyon", "Nice", "Lille", "Nantes", "Rennes", "Bordeaux", "Toulouse"]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _write_csv(path: str, rows: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["id", "city", "population", "ratio", "active", "founded"])
+        for index in range(rows):
+            writer.writerow(
+                [
+                    index,
+                    rng.choice(CITIES),
+                    rng.randint(1_000, 5_000_000),
+                    f"{rng.random():.6f}",
+                    rng.choice(["true", "false"]),
+                    f"{rng.randint(1800, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                ]
+            )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rows.csv")
+        _write_csv(path, args.rows, args.seed)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        baseline = _peak_rss_mb()
+
+        note_id = None
+        try:
+            with open(path, "rb") as handle:
+                async with SessionLocal() as session:
+                    ingestor = TableIngestor(session, batch_size=args.batch_size)
+                    note_id = await ingestor.create_table("bench-table-ingest")
+                    started = time.perf_counter()
+                    report = await ingestor.ingest(note_id, csv_source(handle))
+                    seconds = time.perf_counter() - started
+        finally:
+            if note_id is not None:
+                async with SessionLocal() as session:
+                    await session.execute(delete(Note).where(Note.id == note_id))
+                    await session.commit()
+
+    print(f"rows:     {report.rows:,} in {seconds:.2f}s ({report.rows / seconds:,.0f} rows/s)")
+    print(f"input:    {size_mb:,.1f} MB ({size_mb / seconds:,.1f} MB/s)")
+    print(f"schema:   {report.schema_json}")
+    print(f"peak RSS: {_peak_rss_mb():,.1f} MB (baseline {baseline:,.1f} MB)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(with_engine(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()